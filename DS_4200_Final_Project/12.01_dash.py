@@ -2,21 +2,42 @@ import dash
 from dash import dcc, html, Input, Output, callback
 import plotly.express as px
 import pandas as pd
+import config
+import functools
+from build_artifact import load_combined
+from cleaning import load_source
+from coverage_index import CoverageIndex
+from figure_templates import FigureTemplate
+from instrumentation import instrument_app
+from offline_assets import configure_assets
 
 # Load clean data
-asthma_pop_df = pd.read_csv('clean_population_data.csv')
-coverage_df = pd.read_csv('coverage_df_clean.csv')
-df = pd.read_csv('Asthma RPM State Coverage.csv')
+combined_df = load_combined()
+# Per-state payer coverage bitmasks
+coverage_index = CoverageIndex(combined_df)
+df = load_source('rpm_coverage')
 
 # Generate asthma population chloropleth graph
 def generate_fig(demographic):
+    return population_template(demographic).stamp(dict(locations=combined_df['State Code'].to_numpy(),
+                                                       z=combined_df[demographic].to_numpy(),
+                                                       hovertext=combined_df['State'].to_numpy()))
+
+
+# Styling of the population map per demographic, built once each with plotly express
+@functools.cache
+def population_template(demographic):
+    return FigureTemplate(lambda: px_population(demographic))
+
+
+def px_population(demographic):
     fig = px.choropleth(
-        asthma_pop_df,
+        combined_df,
         locations='State Code',  # State Code as locations
         color=demographic,  # Color scale on population
         locationmode='USA-states',  # Set location mode to US
         scope='usa',  # Set scope to US
-        hover_name='States',  # Hover show state names
+        hover_name='State',  # Hover show state names
         height=600,
         color_continuous_scale='Blues',  # Use selected color scale
         # title='Asthma Prevalence in the United States',
@@ -28,16 +49,11 @@ def generate_fig(demographic):
 
 
 # Initialize the Dash app
-app = dash.Dash(__name__,external_stylesheets=[
-    {
-        'href': 'https://fonts.googleapis.com/css?family=Montserrat',  # Link to custom font
-        'rel': 'stylesheet'
-    },
-    {
-        'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',  # Bootstrap CSS
-        'rel': 'stylesheet'
-    }
-])
+# Bootstrap 4.3.1 and the Montserrat font face are served from assets/ (see offline_assets.py)
+app = dash.Dash(__name__)
+configure_assets(app)
+# Per-callback timings at /metrics (and sampled stacks at /profile), for the callbacks registered below
+instrument_app(app)
 
 
 # Define the demographic options for the dropdown
@@ -118,36 +134,36 @@ def update_graph(demographic):
 )
 def update_choropleth(selected_checkboxes):
     # Filter the DataFrame based on selected checkboxes
-    filtered_df = coverage_df[coverage_df[selected_checkboxes].sum(axis=1) == len(selected_checkboxes)]
-
-    # Manually set colors for each state
-    colors = ['#4575B4' if state_code in filtered_df['State Code'].values else '#FFFFFF' for state_code in coverage_df['State Code']]
-
-    # Create Plotly Express choropleth map
-    fig = px.choropleth(coverage_df,
-                        locations='State Code',
-                        locationmode="USA-states",
-                        color=colors,
-                        hover_name='State',
-                        scope="usa",
-                        # title='Remote Patient Monitoring Coverage, CPT: 99454',
-                        labels={'Sum': 'Selected Columns Sum'},
-                        color_discrete_map={'#4575B4': '#4575B4', '#FFFFFF': '#FFFFFF'},  # Set discrete colors
-                        )
-    # Hide the color legend
-    fig.update_traces(showlegend=False)
+    covered = coverage_index.covered_by_all(selected_checkboxes)
 
-    return fig
+    # Covered states 1, the others 0, stamped into the prebuilt two-colour map
+    return coverage_template.stamp(dict(locations=combined_df['State Code'].to_numpy(),
+                                        z=covered.astype(int),
+                                        hovertext=combined_df['State'].to_numpy()))
+
+
+# Two-colour scale: uncovered states white, covered states blue
+coverage_colorscale = [[0, '#FFFFFF'], [0.5, '#FFFFFF'], [0.5, '#4575B4'], [1, '#4575B4']]
+
+# Styling of the payer map, built once with plotly express; one trace coloured 0/1 instead of a
+# per-state list of hex colours split into one trace per colour
+coverage_template = FigureTemplate(lambda: px.choropleth(combined_df,
+                                                         locations='State Code',
+                                                         locationmode="USA-states",
+                                                         color=coverage_index.covered_by_all([]).astype(int),
+                                                         hover_name='State',
+                                                         scope="usa",
+                                                         # title='Remote Patient Monitoring Coverage, CPT: 99454',
+                                                         color_continuous_scale=coverage_colorscale,
+                                                         range_color=[0, 1],
+                                                         ).update_coloraxes(showscale=False))
 
 
 # Melt the DataFrame to have 'State' as a column and 'Adult' and 'Child' as values
 melted_df = pd.melt(df, id_vars=['US States'],
-                    value_vars=['Adult Asthma Population Number', 'Child Asthma \nPopulation Number'],
+                    value_vars=['Adult Asthma Population Number', 'Child Asthma Population Number'],
                     var_name='Age Group', value_name='Population')
 
-# Remove commas and convert 'Population' to numeric for correct counting
-melted_df['Population'] = pd.to_numeric(melted_df['Population'].str.replace(',', ''), errors='coerce')
-
 # Define callback to update the chart based on the selected top-n value
 @app.callback(
     dash.dependencies.Output('stacked-bar-chart', 'figure'),
@@ -155,16 +171,12 @@ melted_df['Population'] = pd.to_numeric(melted_df['Population'].str.replace(',',
 )
 def update_chart(top_n):
     sorted_df = df.copy()
-    sorted_df['Total Asthma Population'] = sorted_df['Total Asthma Population'].str.replace(',', '').astype(int)
     sorted_df = sorted_df.sort_values(by='Total Asthma Population', ascending=False).head(top_n)
 
     melted_sorted_df = pd.melt(sorted_df, id_vars=['US States'],
-                                value_vars=['Adult Asthma Population Number', 'Child Asthma \nPopulation Number'],
+                                value_vars=['Adult Asthma Population Number', 'Child Asthma Population Number'],
                                 var_name='Age Group', value_name='Population')
 
-    melted_sorted_df['Population'] = pd.to_numeric(melted_sorted_df['Population'].str.replace(',', ''),
-                                                    errors='coerce')
-
     fig = px.bar(
         melted_sorted_df,
         x='US States',
@@ -183,4 +195,4 @@ def update_chart(top_n):
 
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
+    app.run(debug=config.DEBUG)
\ No newline at end of file
@@ -1,29 +1,69 @@
-import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
-import pandas as pd
+import functools
+from types import SimpleNamespace
+
+import config
+from build_artifact import load_combined
+from cleaning import load_source
+from coverage_index import PAYER_COLUMNS, CoverageIndex
+from coverage_tensor import CoverageTensor, parse_coverage_column
+from dashboards import Dashboard
+from figure_cache import FigureCache, shared_backend
+from figure_templates import FigureTemplate
+from instrumentation import phase
+from lazy_imports import lazy_import
+from scoring import AGE_COLUMNS, MarketScores, format_count, random_weights
+
+# Heavy modules load on first use, so importing the dashboard (tooling, test collection) stays cheap;
+# dash is imported by create_app and by the functions that build components
+px = lazy_import('plotly.express')
+pd = lazy_import('pandas')
+
 
 # UPDATED
 # Load clean data
-asthma_pop_df = pd.read_csv('clean_population_data.csv')
-coverage_df = pd.read_csv('coverage_df_clean.csv')
-df = pd.read_csv('Asthma RPM State Coverage.csv')
-
-# merger asthma population and insurance coverage data
-combined_df = asthma_pop_df.merge(coverage_df, left_on='States', right_on='State')
-
-
-# Initialize the Dash app
-app = dash.Dash(__name__,external_stylesheets=[
-    {
-        'href': 'https://fonts.googleapis.com/css?family=Montserrat',  # Link to custom font
-        'rel': 'stylesheet'
-    },
-    {
-        'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',  # Bootstrap CSS
-        'rel': 'stylesheet'
-    }
-], suppress_callback_exceptions=True)
+def load_data():
+    """ Everything the callbacks read, rebuilt together whenever a source CSV changes
+
+    Returns:
+        data (SimpleNamespace): See build_snapshot
+    """
+    # asthma population merged with insurance coverage data
+    return build_snapshot(load_source('rpm_coverage'), load_combined())
+
+
+def build_snapshot(df, combined_df, payers=PAYER_COLUMNS):
+    """ Derive the callbacks' lookup structures from the RPM coverage and merged tables
+
+    Args:
+        df (df): One row per area with 'US States' and the asthma population counts
+        combined_df (df): One row per area with State, State Code, Population and payer columns
+        payers (list): Payer columns indexed for the coverage filters
+    Returns:
+        data (SimpleNamespace): df, combined_df, coverage_index, scores and melted_df
+    """
+    # Melt the DataFrame to have 'State' as a column and 'Adult' and 'Child' as values,
+    # ordered by total asthma population so the top n states are the first 2 * n rows
+    melted_df = pd.melt(df.sort_values(by='Total Asthma Population', ascending=False).reset_index(drop=True),
+                        id_vars=['US States'],
+                        value_vars=['Adult Asthma Population Number', 'Child Asthma Population Number'],
+                        var_name='Age Group', value_name='Population', ignore_index=False)
+    melted_df = melted_df.sort_index(kind='stable').reset_index(drop=True)
+
+    return SimpleNamespace(df=df, combined_df=combined_df, melted_df=melted_df,
+                           # Per-state payer coverage bitmasks
+                           coverage_index=CoverageIndex(combined_df, payers),
+                           # State x payer x CPT code coverage, for the data API
+                           coverage_tensor=CoverageTensor(combined_df),
+                           # Market-entry scores, re-ranked for the weights picked in tab 1
+                           scores=MarketScores(combined_df),
+                           clientside_data=None)
+
+
+# Callbacks read store.current once per request; a refresh swaps in a whole new snapshot.
+# Nothing is loaded until the first access (or store.warm() in wsgi.py), and the app is built by get_app()
+dashboard = Dashboard(__name__, load_data, ['population', 'coverage', 'rpm_coverage'])
+store = dashboard.store
+get_app = dashboard.get_app
 
 # Define text blurbs
 graph_1 = """
@@ -31,15 +71,6 @@ graph_1 = """
     Insurance Coverage of Remote Patient Monitoring(RPM) CPT 994595 also varies across states and public and private payers. 
     Use this interactive choropleth map to explore asthma population and RPM coverage, to help draw conclusions for best initial market entry location.
 """
-analysis_1 = """
-    Basic Analysis: The following states have promising opportunity as a point of entry.
-    In North Carolina the asthma population is 777k and RPM is covered by Medicare, Medicaid, the top private insurer, 
-    and the second private insurer. 
-    In New York the asthma population is 1.8M and RPM is covered by Medicare, Medicaid, and the top private insurer.
-    In Texas the asthma population is 2.15M and RPM is covered by Medicare, the top private insurer, 
-    and the second private insurer. In California the asthma population is 3.3M and RPM is covered by Medicare and Medicaid.
-"""
-
 graph_2 = """
     Asthma affects both adults and children. These population vary across states. Use this interactive bar chart 
     to compare states based on asthma population demographics.
@@ -51,77 +82,153 @@ analysis_2 = """
     followed by California and New York.
 """
 
+graph_3 = """
+    How robust is the ranking? Each scenario draws every payer and age group weight at random between 0 and 1 
+    and ranks the states again. The charts show how often each state comes first, and how its rank is distributed 
+    over all scenarios.
+"""
+
+# Market-entry weight sliders: how much the patients each payer covers, and each age group, count
+weight_labels = {
+    'weight-medicare': 'Medicare',
+    'weight-medicaid': 'Medicaid',
+    'weight-top-private': 'Top Private Insurance',
+    'weight-second-private': 'Second Private Insurance',
+    'weight-adult': 'Adults',
+    'weight-child': 'Children',
+}
+
+
 # Define content for Tab 1
-tab1_layout = html.Div([
-    html.H1("Asthma Prevalence and RPM Insurance Coverage", style={'fontFamily': 'Montserrat', 'fontSize': '36px', 'marginLeft': '20px'}),
-    html.Div([
-        html.P(graph_1, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
-    ]),
-    # html.H2("Asthma Prevalence and RPM Insurance Coverage",  style={'marginLeft': '40px', 'fontFamily': 'Montserrat', 'fontSize': '20px'}),
-    dcc.Checklist(
-        id='checkboxes',
-        options=[
-            {'label': 'Medicare', 'value': '99454 Coverage: Medicare'},
-            {'label': 'Medicaid', 'value': '99454 Coverage: Medicaid'},
-            {'label': 'Top Private Insurance', 'value': '99454 Coverage: Top Private Insurance'},
-            {'label': 'Second Private Insurance', 'value': '99454 Coverage: Second Private Insurance'},
-        ],
-        value=['99454 Coverage: Medicare',
-               '99454 Coverage: Medicaid',
-               '99454 Coverage: Top Private Insurance',
-               '99454 Coverage: Second Private Insurance'
-        ],
-        style={'width': '800px', 'fontFamily': 'Montserrat', 'marginLeft': '40px', 'fontSize': '15px'},
-        inline=True,
-    ),
-    dcc.Graph(
-        id='choropleth-map', style={'width': '100vw', 'height': '65vh'}
-    ),
-    html.Div([
-        html.P(analysis_1, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
-    ]),
-])
+def tab1_layout():
+    from dash import dcc, html
+
+    return html.Div([
+        html.H1("Asthma Prevalence and RPM Insurance Coverage", style={'fontFamily': 'Montserrat', 'fontSize': '36px', 'marginLeft': '20px'}),
+        html.Div([
+            html.P(graph_1, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
+        ]),
+        # html.H2("Asthma Prevalence and RPM Insurance Coverage",  style={'marginLeft': '40px', 'fontFamily': 'Montserrat', 'fontSize': '20px'}),
+        dcc.Checklist(
+            id='checkboxes',
+            options=[{'label': parse_coverage_column(column)[1], 'value': column} for column in PAYER_COLUMNS],
+            value=PAYER_COLUMNS,
+            style={'width': '800px', 'fontFamily': 'Montserrat', 'marginLeft': '40px', 'fontSize': '15px'},
+            inline=True,
+        ),
+        dcc.Graph(
+            id='choropleth-map', style={'width': '100vw', 'height': '65vh'}
+        ),
+        # Market-entry ranking, generated from the scores for the chosen weights
+        html.Div([
+            html.H2("Market Entry Ranking", style={'fontFamily': 'Montserrat', 'fontSize': '20px'}),
+            html.Div([
+                html.Div([
+                    html.Label(label),
+                    dcc.Slider(id=weight_id, min=0, max=1, step=0.1, value=1, marks={0: '0', 0.5: '0.5', 1: '1'}),
+                ], style={'width': '250px', 'display': 'inline-block', 'marginRight': '20px'})
+                for weight_id, label in weight_labels.items()
+            ]),
+            html.Div(id='market-table'),
+            html.P(id='market-analysis'),
+        ], style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
+    ])
+
 
 # Define content for Tab 2
-tab2_layout = html.Div([
-    html.H1("Asthma Population by State", style={'fontFamily': 'Montserrat', 'fontSize': '36px', 'marginLeft': '20px'}),
-    html.Div([
-        html.P(graph_2, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
-    ]),
-    # html.H2("Asthma Population by State",
-    # style={'marginLeft': '40px', 'fontFamily': 'Montserrat', 'fontSize': '20px'}),
-    html.Div([
+def tab2_layout():
+    from dash import dcc, html
+
+    return html.Div([
+        html.H1("Asthma Population by State", style={'fontFamily': 'Montserrat', 'fontSize': '36px', 'marginLeft': '20px'}),
+        html.Div([
+            html.P(graph_2, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
+        ]),
+        # html.H2("Asthma Population by State",
+        # style={'marginLeft': '40px', 'fontFamily': 'Montserrat', 'fontSize': '20px'}),
+        html.Div([
+            dcc.Dropdown(
+                id='top-n-dropdown',
+                options=[
+                    {'label': f'Top {i} States', 'value': i} for i in range(5, store.current.df.shape[0] + 1, 5)
+                ],
+                value=5,
+                multi=False,
+                style={'width': '50%', 'marginLeft': '40px', 'fontFamily': 'Montserrat'}
+            ),
+        ], style={'marginTop': '40px'}),
+        html.Div([
+            dcc.Graph(id='stacked-bar-chart', style={'marginTop': '100px', 'width': '100vw', 'marginLeft': '20px'})
+        ], style={'marginLeft': '20px'}),
+        html.Div([
+            html.P(analysis_2, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
+        ]),
+    ])
+
+
+# Define content for Tab 3
+def tab3_layout():
+    from dash import dcc, html
+
+    return html.Div([
+        html.H1("Scenario Sweep", style={'fontFamily': 'Montserrat', 'fontSize': '36px', 'marginLeft': '20px'}),
+        html.Div([
+            html.P(graph_3, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
+        ]),
         dcc.Dropdown(
-            id='top-n-dropdown',
-            options=[
-                {'label': f'Top {i} States', 'value': i} for i in range(5, df.shape[0] + 1, 5)
-            ],
-            value=5,
-            multi=False,
-            style={'width': '50%', 'marginLeft': '40px', 'fontFamily': 'Montserrat'}
+            id='scenario-count',
+            options=[{'label': f'{n:,} Scenarios', 'value': n} for n in [1_000, 10_000, 100_000]],
+            value=10_000,
+            clearable=False,
+            style={'width': '50%', 'marginLeft': '20px', 'fontFamily': 'Montserrat'}
         ),
-    ], style={'marginTop': '40px'}),
-    html.Div([
-        dcc.Graph(id='stacked-bar-chart', style={'marginTop': '100px', 'width': '100vw', 'marginLeft': '20px'})
-    ], style={'marginLeft': '20px'}),
-    html.Div([
-        html.P(analysis_2, style={'marginLeft': '40px', 'fontFamily': 'Montserrat'}),
-    ]),
-])
+        dcc.Graph(id='win-frequency-chart', style={'marginLeft': '20px'}),
+        dcc.Graph(id='rank-distribution-chart', style={'marginLeft': '20px'}),
+    ])
 
 
 # UPDATED !!!
-@app.callback(
-    Output('choropleth-map', 'figure'),
-    [Input('checkboxes', 'value')]
-)
+# Callback to update choropleth map based on checkbox selection
 def update_choropleth(selected_checkboxes):
-    filtered_df = combined_df[combined_df[selected_checkboxes].sum(axis=1) == len(selected_checkboxes)]
+    from dash import ctx
+
+    # Load the data (which binds the cache to it) before asking the cache, so the first figure is kept
+    store.current
+    # Serve the prebuilt figure for this payer combination
+    fig = choropleth_cache.get(selected_checkboxes)
+
+    # The first render needs the whole figure, later changes only swap the trace data
+    if ctx.triggered_id is None:
+        return fig
+    return patch_choropleth(fig)
+
+
+# Copy only the per-state arrays of a cached figure into a partial update
+def patch_choropleth(fig):
+    from dash import Patch
+
+    patched_fig = Patch()
+    for key in ['locations', 'z', 'hovertext']:
+        patched_fig['data'][0][key] = fig['data'][0][key]
+    return patched_fig
 
-    # Create choropleth map
+
+def build_choropleth(selected_checkboxes, data=None):
+    with phase('filter'):
+        data = data or store.current
+        filtered_df = data.combined_df[data.coverage_index.covered_by_all(selected_checkboxes)]
+
+    with phase('build'):
+        return choropleth_template.stamp(dict(locations=filtered_df['State Code'].to_numpy(),
+                                              z=filtered_df['Population'].to_numpy(),
+                                              hovertext=filtered_df['State'].to_numpy()))
+
+
+# Create choropleth map with plotly express (the template's sample, and the reference for bench_templates.py)
+def px_choropleth(filtered_df):
     fig = px.choropleth(
         filtered_df,
-        locations='State Code_x',
+        locations='State Code',
         locationmode="USA-states",
         color='Population',
         hover_name='State',
@@ -135,32 +242,35 @@ def update_choropleth(selected_checkboxes):
     return fig
 
 
-# Melt the DataFrame to have 'State' as a column and 'Adult' and 'Child' as values
-melted_df = pd.melt(df, id_vars=['US States'],
-                    value_vars=['Adult Asthma Population Number', 'Child Asthma \nPopulation Number'],
-                    var_name='Age Group', value_name='Population')
+# Styling of the map, built once; build_choropleth only stamps in the rows of each selection
+choropleth_template = FigureTemplate(lambda: px_choropleth(store.current.combined_df))
+
 
-# Remove commas and convert 'Population' to numeric for correct counting
-melted_df['Population'] = pd.to_numeric(melted_df['Population'].str.replace(',', ''), errors='coerce')
+# Figures for all 16 payer combinations, built on first use and then served from memory
+# (and from the shared cache when several worker processes serve the app)
+# Each figure depends on the map columns plus the payer columns it filters on; a publish drops the changed ones
+choropleth_cache = dashboard.add_cache(FigureCache(build_choropleth, name='12.02-choropleth', backend=shared_backend(),
+                                                   data_columns=['State', 'State Code', 'Population']))
 
 
-# Define callback to update the chart based on the selected top-n value
-@app.callback(
-    dash.dependencies.Output('stacked-bar-chart', 'figure'),
-    [dash.dependencies.Input('top-n-dropdown', 'value')]
-)
-def update_chart(top_n):
-    sorted_df = df.copy()
-    sorted_df['Total Asthma Population'] = sorted_df['Total Asthma Population'].str.replace(',', '').astype(int)
-    sorted_df = sorted_df.sort_values(by='Total Asthma Population', ascending=False).head(top_n)
 
-    melted_sorted_df = pd.melt(sorted_df, id_vars=['US States'],
-                                value_vars=['Adult Asthma Population Number', 'Child Asthma \nPopulation Number'],
-                                var_name='Age Group', value_name='Population')
+# Callback to update the chart based on the selected top-n value
+def update_chart(top_n, data=None):
+    with phase('filter'):
+        data = data or store.current
+        # A cleared dropdown (None) shows every state
+        melted_sorted_df = data.melted_df.iloc[:None if top_n is None else 2 * top_n]
+        # One stacked trace per age group
+        groups = melted_sorted_df['Age Group'].to_numpy()
+        traces = [melted_sorted_df[groups == name] for name in chart_template.names]
 
-    melted_sorted_df['Population'] = pd.to_numeric(melted_sorted_df['Population'].str.replace(',', ''),
-                                                    errors='coerce')
+    with phase('build'):
+        return chart_template.stamp(*[dict(x=rows['US States'].to_numpy(), y=rows['Population'].to_numpy())
+                                      for rows in traces])
 
+
+# Create the stacked bar chart with plotly express (the template's sample, and the reference for bench_templates.py)
+def px_chart(melted_sorted_df):
     fig = px.bar(
         melted_sorted_df,
         x='US States',
@@ -178,25 +288,208 @@ def update_chart(top_n):
     return fig
 
 
-# Create app layout with tabs
-app.layout = html.Div([
-    dcc.Tabs(id='tabs', value='tab-1', children=[
-        dcc.Tab(label='Asthma Population and Insurance', value='tab-1'),
-        dcc.Tab(label='Asthma Population Demographic by State', value='tab-2'),
-    ]),
-    html.Div(id='tabs-content')
-])
+# Styling of the chart with both age groups, built once; update_chart stamps in the top n states
+chart_template = FigureTemplate(lambda: px_chart(store.current.melted_df))
+
+
+# Callback to re-rank the states when a market-entry weight changes
+def update_ranking(*weights):
+    from dash import html
+
+    with phase('filter'):
+        data = store.current
+        payers = data.scores.payers
+        payer_weights = dict(zip(payers, weights[:len(payers)]))
+        age_weights = dict(zip(AGE_COLUMNS, weights[len(payers):]))
+
+        rows = data.scores.top_table(10, payer_weights, age_weights)
+        narrative = data.scores.narrative(4, payer_weights, age_weights)
+
+    header = ['Rank', 'State', 'Score', 'Asthma Population', 'RPM Covered By']
+    with phase('build'):
+        table = html.Table([
+            html.Thead(html.Tr([html.Th(name) for name in header])),
+            html.Tbody([html.Tr([
+                html.Td(row['Rank']),
+                html.Td(row['State']),
+                html.Td(format_count(row['Score'])),
+                html.Td(format_count(row['Asthma Population'])),
+                html.Td(', '.join(row['RPM Covered By'])),
+            ]) for row in rows]),
+        ], className='table table-sm', style={'width': '900px'})
+
+    return table, narrative
+
+
+# Callback to sweep random weight scenarios and chart the rank distribution of the leading states
+def update_sweep(n_scenarios, top_n=15):
+    with phase('filter'):
+        rank_share = store.current.scores.sweep(random_weights(n_scenarios), chunk_size=50_000)
+        leaders = rank_share.iloc[:top_n]
+
+    with phase('build'):
+        win_fig = px.bar(
+            x=leaders.index,
+            y=leaders[1],
+            labels={'x': 'US States', 'y': 'Win Frequency'},
+            title=f'Share of {n_scenarios:,} Scenarios Ranking Each State First',
+        )
+        win_fig.update_layout(height=450, width=1200, xaxis_tickangle=-45, yaxis_tickformat='.0%')
+
+        rank_fig = px.imshow(
+            leaders.iloc[:, :10],
+            labels={'x': 'Rank', 'y': 'State', 'color': 'Share of Scenarios'},
+            color_continuous_scale='Reds',
+            aspect='auto',
+            title='Rank Distribution',
+        )
+        rank_fig.update_layout(height=600, width=1200)
+        rank_fig.update_xaxes(dtick=1)
+
+    return win_fig, rank_fig
+
+
+def clientside_data(data):
+    """ Coverage bitmasks and full 50-state figure templates for the clientside callbacks
+
+    Args:
+        data (SimpleNamespace): Data snapshot from load_data
+    Returns:
+        data (dict): Plain lists only, so the browser can filter and slice the
+            trace arrays without decoding plotly's binary array encoding
+    """
+    choropleth = build_choropleth([], data).to_dict()
+    choropleth['data'][0].update(
+        locations=data.combined_df['State Code'].tolist(),
+        z=data.combined_df['Population'].tolist(),
+        hovertext=data.combined_df['State'].tolist(),
+    )
+
+    bar = update_chart(len(data.df), data).to_dict()
+    for trace in bar['data']:
+        rows = data.melted_df[data.melted_df['Age Group'] == trace['name']]
+        trace.update(x=rows['US States'].tolist(), y=rows['Population'].tolist())
+
+    return {
+        'columns': data.coverage_index.columns,
+        'masks': data.coverage_index.masks[:, 0].tolist(),
+        'choropleth': choropleth,
+        'bar': bar,
+    }
+
+
+# Layout builder of each tab
+tab_builders = {'tab-1': tab1_layout, 'tab-2': tab2_layout, 'tab-3': tab3_layout}
+
+
+# Tab layouts are built once, on first visit, and shared by every session
+@functools.cache
+def tab_layout(tab):
+    return tab_builders[tab]()
+
+
+# The tab layouts carry the snapshot's dropdown options and defaults, so a new snapshot rebuilds them
+dashboard.on_publish.append(tab_layout.cache_clear)
+
+
+# Create app layout with tabs, evaluated on every page load so it carries the current snapshot
+def serve_layout():
+    from dash import dcc, html
+
+    data = store.current
+    if config.CLIENTSIDE_CALLBACKS and data.clientside_data is None:
+        data.clientside_data = clientside_data(data)
+
+    return html.Div([
+        dcc.Tabs(id='tabs', value='tab-1', children=[
+            dcc.Tab(label='Asthma Population and Insurance', value='tab-1'),
+            dcc.Tab(label='Asthma Population Demographic by State', value='tab-2'),
+            dcc.Tab(label='Market Entry Scenarios', value='tab-3'),
+        ]),
+        # Each tab is rendered into its own container on first visit and only hidden afterwards,
+        # so its graphs keep their figures in the browser instead of being rebuilt on every switch
+        html.Div(id='tabs-content', children=[html.Div(id=f'{tab}-content') for tab in tab_builders]),
+        dcc.Store(id='rendered-tabs', data=[]),
+        dcc.Store(id='dashboard-data', data=data.clientside_data),
+    ])
+
+
+# Callback to update tab content
+def render_content(tab, rendered_tabs):
+    from dash import no_update
+
+    rendered_tabs = rendered_tabs or []
+
+    # Send a tab's layout only on its first visit, later visits just toggle visibility
+    with phase('build'):
+        children = [tab_layout(name) if name == tab and name not in rendered_tabs else no_update
+                    for name in tab_builders]
+    styles = [{'display': 'block' if name == tab else 'none'} for name in tab_builders]
+    if tab not in rendered_tabs:
+        rendered_tabs = rendered_tabs + [tab]
+
+    return children + styles + [rendered_tabs]
+
+
+@dashboard.app_factory
+def create_app():
+    """ Build the Dash app with its routes and callbacks
+
+    Imports dash, flask and pyarrow and registers everything, but reads no
+    data: that happens on the first request or in store.warm().
+
+    Returns:
+        app (Dash): A new app; the module's shared one is get_app()
+    """
+    from dash import Input, Output, State, ClientsideFunction
+
+    # These callbacks only depend on their inputs and the data snapshot
+    app = dashboard.new_app(deterministic=[
+        'choropleth-map.figure',
+        'stacked-bar-chart.figure',
+        '..market-table.children...market-analysis.children..',
+        '..win-frequency-chart.figure...rank-distribution-chart.figure..',
+    ], suppress_callback_exceptions=True)
+
+    app.layout = serve_layout
+
+    # Register the checklist and top-n callbacks either in the browser (assets/clientside.js) or on the server
+    if config.CLIENTSIDE_CALLBACKS:
+        app.clientside_callback(
+            ClientsideFunction(namespace='asthma', function_name='choropleth'),
+            Output('choropleth-map', 'figure'),
+            [Input('checkboxes', 'value')],
+            [State('dashboard-data', 'data')]
+        )
+        app.clientside_callback(
+            ClientsideFunction(namespace='asthma', function_name='topN'),
+            Output('stacked-bar-chart', 'figure'),
+            [Input('top-n-dropdown', 'value')],
+            [State('dashboard-data', 'data')]
+        )
+    else:
+        app.callback(Output('choropleth-map', 'figure'), [Input('checkboxes', 'value')])(update_choropleth)
+        app.callback(Output('stacked-bar-chart', 'figure'), [Input('top-n-dropdown', 'value')])(update_chart)
 
+    app.callback(
+        [Output('market-table', 'children'), Output('market-analysis', 'children')],
+        [Input(weight_id, 'value') for weight_id in weight_labels]
+    )(update_ranking)
+    app.callback(
+        [Output('win-frequency-chart', 'figure'), Output('rank-distribution-chart', 'figure')],
+        [Input('scenario-count', 'value')]
+    )(update_sweep)
+    app.callback(
+        [Output(f'{tab}-content', 'children') for tab in tab_builders]
+        + [Output(f'{tab}-content', 'style') for tab in tab_builders]
+        + [Output('rendered-tabs', 'data')],
+        [Input('tabs', 'value')],
+        [State('rendered-tabs', 'data')]
+    )(render_content)
 
-# Define callback to update tab content
-@app.callback(Output('tabs-content', 'children'), [Input('tabs', 'value')])
-def render_content(tab):
-    if tab == 'tab-1':
-        return tab1_layout
-    elif tab == 'tab-2':
-        return tab2_layout
+    return app
 
 
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
+    dashboard.run()
\ No newline at end of file
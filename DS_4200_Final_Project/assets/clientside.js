@@ -0,0 +1,36 @@
+// Clientside versions of the 12.02_dash.py interaction callbacks (enabled by ASTHMA_CLIENTSIDE_CALLBACKS=1).
+// Both work from the dashboard-data store, which holds the per-state coverage bitmasks and
+// full 50-state figure templates built once by the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    asthma: {
+        // Keep only the states covered by every selected payer
+        choropleth: function (selected, data) {
+            var mask = 0;
+            (selected || []).forEach(function (column) {
+                mask |= 1 << data.columns.indexOf(column);
+            });
+            var template = data.choropleth.data[0];
+            var pick = function (values) {
+                return values.filter(function (value, i) {
+                    return (data.masks[i] & mask) === mask;
+                });
+            };
+            var trace = Object.assign({}, template, {
+                locations: pick(template.locations),
+                z: pick(template.z),
+                hovertext: pick(template.hovertext)
+            });
+            return {data: [trace], layout: data.choropleth.layout};
+        },
+
+        // Bars are stored largest state first, so the top n states are a prefix of every trace;
+        // a cleared dropdown (null) shows every state
+        topN: function (topN, data) {
+            var end = topN == null ? undefined : topN;
+            var traces = data.bar.data.map(function (trace) {
+                return Object.assign({}, trace, {x: trace.x.slice(0, end), y: trace.y.slice(0, end)});
+            });
+            return {data: traces, layout: data.bar.layout};
+        }
+    }
+});
@@ -0,0 +1,37 @@
+import gzip
+
+from plotly.io.json import to_json_plotly
+
+from dashboards import load_dashboard
+from figure_cache import mask_columns
+from http_cache import ENCODINGS
+
+# Columns a client needs to draw the choropleth itself
+MAP_COLUMNS = 'State,State Code,Population'
+
+
+def api_size(client, query, encoding):
+    """ Bytes on the wire of one data API response """
+    response = client.get(f'/api/coverage?{query}', headers={'Accept-Encoding': encoding})
+    assert response.status_code == 200, response.status
+    return len(response.data)
+
+
+if __name__ == '__main__':
+    dash_12_02 = load_dashboard('12.02_dash.py')
+    client = dash_12_02.get_app().server.test_client()
+    encodings = ['identity'] + ENCODINGS[::-1]
+
+    print(f'{"checklist":<10} {"figure JSON":>12} {"gzip":>7} {"Arrow (map cols)":>17} '
+          + ' '.join(f'{e:>7}' for e in encodings[1:]) + f' {"Arrow (all cols)":>17} {"JSON (all cols)":>16}')
+    for mask in range(16):
+        figure = to_json_plotly(dash_12_02.choropleth_cache.get(mask_columns(mask))).encode()
+        arrow = [api_size(client, f'payers={mask}&columns={MAP_COLUMNS}', e) for e in encodings]
+        arrow_all = api_size(client, f'payers={mask}', 'gzip')
+        json_all = api_size(client, f'payers={mask}&format=json', 'gzip')
+        print(f'{mask:04b}       {len(figure):>12,} {len(gzip.compress(figure)):>7,} {arrow[0]:>17,} '
+              + ' '.join(f'{size:>7,}' for size in arrow[1:]) + f' {arrow_all:>17,} {json_all:>16,}')
+
+    etag = client.get(f'/api/coverage?payers=15&columns={MAP_COLUMNS}').headers['ETag']
+    revalidated = client.get(f'/api/coverage?payers=15&columns={MAP_COLUMNS}', headers={'If-None-Match': etag})
+    print(f'revalidation with If-None-Match: HTTP {revalidated.status_code}, {len(revalidated.data)} body bytes')
@@ -0,0 +1,65 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from cleaning import state_name_to_code
+from fetch_sources import SourceFetcher
+from source_server import start_server
+
+PAYERS = ['medicare', 'medicaid', 'top_private', 'second_private']
+
+
+def write_files(directory, rows, seed=0):
+    """ One county-level CSV per state and payer (50 x 4 = 200 files) """
+    rng = np.random.default_rng(seed)
+    names = []
+    for state in state_name_to_code.values():
+        for payer in PAYERS:
+            name = f'{state}_{payer}.csv'
+            lines = ['County FIPS,Population,Covered'] + [
+                f'{county:05d},"{population:,}",{"Yes" if covered else "No"}' for county, population, covered
+                in zip(rng.integers(1000, 57000, rows), rng.integers(100, 500_000, rows), rng.random(rows) < 0.7)]
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            names.append(name)
+    return names
+
+
+def timed_fetch(base_url, names, out_dir, concurrency, manifest_path):
+    fetcher = SourceFetcher(concurrency, manifest_path=manifest_path)
+    files = {os.path.join(out_dir, name): f'{base_url}/{name}' for name in names}
+    start = time.perf_counter()
+    statuses = fetcher.fetch_all_sync(files)
+    return time.perf_counter() - start, fetcher.pool.opened, statuses
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent vs sequential fetch of 200 source files')
+    parser.add_argument('--rows', type=int, default=2_000, help='rows per file')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the stand-in server adds per request')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--fail-every', type=int, default=0, help='make the server answer every n-th request with 503')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        served, out_dir = os.path.join(tmp, 'served'), os.path.join(tmp, 'out')
+        os.makedirs(served)
+        os.makedirs(out_dir)
+        names = write_files(served, args.rows)
+        size_mb = sum(os.path.getsize(os.path.join(served, name)) for name in names) / 2 ** 20
+        server = start_server(served, latency=args.latency, fail_every=args.fail_every)
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        print(f'{len(names)} files, {size_mb:.1f} MB, {args.latency * 1000:.0f} ms server latency')
+
+        print(f'{"run":<24} {"seconds":>8} {"connections":>12} {"fetched":>8} {"304":>5}')
+        runs = [('sequential', 1, 'seq'), (f'concurrent ({args.concurrency})', args.concurrency, 'con'),
+                ('concurrent, unchanged', args.concurrency, 'con')]
+        for label, concurrency, manifest in runs:
+            seconds, opened, statuses = timed_fetch(base_url, names, out_dir, concurrency,
+                                                    os.path.join(tmp, f'{manifest}.json'))
+            fetched = sum(status == 'fetched' for status in statuses.values())
+            print(f'{label:<24} {seconds:>8.2f} {opened:>12} {fetched:>8} {len(statuses) - fetched:>5}')
+        server.shutdown()
@@ -0,0 +1,61 @@
+import logging
+import re
+import threading
+import time
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from dashboards import load_dashboard
+
+# Stylesheets the dashboards used to link from CDNs
+CDN_STYLESHEETS = [
+    'https://fonts.googleapis.com/css?family=Montserrat',
+    'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',
+]
+
+
+def fetch(url, timeout=10):
+    """ Download a URL, return (seconds, bytes on the wire) or (seconds, None) if it failed """
+    start = time.perf_counter()
+    request = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            size = len(response.read())
+    except OSError:
+        size = None
+    return time.perf_counter() - start, size
+
+
+def blocking_time(base_url, stylesheets):
+    """ Time until the page HTML and every render-blocking stylesheet are loaded
+
+    Browsers do not paint before the stylesheets in <head> arrive, so this is
+    the server/network share of time-to-first-paint (layout and paint in the
+    browser itself are not included).
+    """
+    html_seconds, _ = fetch(base_url)
+    results = [fetch(url) for url in stylesheets]
+    failed = [url for url, (_, size) in zip(stylesheets, results) if size is None]
+    total_bytes = sum(size for _, size in results if size)
+    return html_seconds + max((seconds for seconds, _ in results), default=0), total_bytes, failed
+
+
+if __name__ == '__main__':
+    final_dash = load_dashboard('final_dash.py')
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 8072, final_dash.get_app().server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:8072/'
+
+    with urllib.request.urlopen(base_url) as response:
+        page = response.read().decode()
+    local_stylesheets = [base_url + href.lstrip('/') for href in re.findall(r'<link rel="stylesheet" href="([^"]+)"', page)]
+
+    for name, stylesheets in [('CDN stylesheets', CDN_STYLESHEETS), ('local assets/', local_stylesheets)]:
+        seconds, size, failed = blocking_time(base_url, stylesheets)
+        status = f', unreachable: {", ".join(failed)}' if failed else ''
+        print(f'{name:<16} {seconds * 1000:8.1f} ms until first paint can start, {size:,} bytes{status}')
+
+    server.shutdown()
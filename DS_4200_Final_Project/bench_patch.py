@@ -0,0 +1,43 @@
+import statistics
+import timeit
+
+from plotly.io.json import to_json_plotly
+
+from dashboards import load_dashboard
+from figure_cache import mask_columns
+
+
+def measure(build, repeat=20):
+    """ Median build + serialize time (ms) and serialized size (bytes) of a callback response """
+    payload = to_json_plotly(build())
+    seconds = statistics.median(timeit.repeat(lambda: to_json_plotly(build()), number=1, repeat=repeat))
+    return seconds * 1000, len(payload)
+
+
+def report(label, full, patch):
+    (full_ms, full_bytes), (patch_ms, patch_bytes) = full, patch
+    print(f'{label:<42} {full_bytes:>9,} B {full_ms:>7.2f} ms {patch_bytes:>9,} B {patch_ms:>7.2f} ms')
+
+
+if __name__ == '__main__':
+    final_dash = load_dashboard('final_dash.py')
+    dash_12_02 = load_dashboard('12.02_dash.py')
+
+    print(f'{"":<42} {"full figure":>22} {"patch":>22}')
+    for demographic in final_dash.populations:
+        report(f'final_dash demographic: {demographic}',
+               measure(lambda: final_dash.generate_fig(demographic)),
+               measure(lambda: final_dash.patch_demographic(demographic)))
+
+    for mask in range(16):
+        selected = mask_columns(mask)
+        covered = final_dash.store.current.coverage_index.covered_by_all(selected)
+        report(f'final_dash checklist: mask {mask:04b}',
+               measure(lambda: final_dash.generate_coverage_fig(covered)),
+               measure(lambda: final_dash.patch_coverage(final_dash.store.current.coverage_index.covered_by_all(selected))))
+
+    for mask in range(16):
+        selected = mask_columns(mask)
+        report(f'12.02_dash checklist: mask {mask:04b}',
+               measure(lambda: dash_12_02.build_choropleth(selected)),
+               measure(lambda: dash_12_02.patch_choropleth(dash_12_02.choropleth_cache.get(selected))))
@@ -0,0 +1,25 @@
+import timeit
+
+import pandas as pd
+
+from build_artifact import ARTIFACT_PATH
+
+
+# Previous startup path: parse both clean CSVs and merge them at import
+def load_from_csv():
+    asthma_pop_df = pd.read_csv('clean_population_data.csv')
+    coverage_df = pd.read_csv('coverage_df_clean.csv')
+    return asthma_pop_df.merge(coverage_df, left_on='States', right_on='State')
+
+
+# Current startup path: read the typed, pre-joined artifact
+def load_from_artifact():
+    return pd.read_parquet(ARTIFACT_PATH)
+
+
+if __name__ == '__main__':
+    repeats = 200
+    for name, load in [('csv + merge', load_from_csv), ('parquet artifact', load_from_artifact)]:
+        load()  # warm up
+        seconds = min(timeit.repeat(load, number=1, repeat=repeats))
+        print(f'{name:>18}: {seconds * 1000:.2f} ms (best of {repeats})')
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from cleaning import clean_csv
+from geo_ingest import ingest_geo, write_synthetic
+
+
+def run_child(mode, path, chunksize):
+    """ Ingest in this process and print elapsed seconds and peak RSS as JSON """
+    start = time.perf_counter()
+    if mode == 'stream':
+        rollups = ingest_geo(path, chunksize=chunksize)
+    else:
+        # Previous approach: read and clean the whole file, then group
+        df = clean_csv(path, state_column='States')
+        rollups = {'county': df.groupby(['States', 'County FIPS']).sum(numeric_only=True)}
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'seconds': seconds, 'peak_mb': peak_mb, 'counties': len(rollups['county'])}))
+
+
+def measure(mode, path, chunksize):
+    # A fresh process per run, so each peak RSS only covers its own ingestion
+    output = subprocess.run([sys.executable, __file__, '--child', mode, '--path', path,
+                             '--chunksize', str(chunksize)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Peak memory of streaming vs whole-file ingestion of ZIP-level data')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='rows of the synthetic input')
+    parser.add_argument('--path', default='synthetic_zip.csv', help='synthetic input, generated if missing')
+    parser.add_argument('--chunksize', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--whole-file', action='store_true',
+                        help='also time reading the whole file at once (needs several GB at 10M rows)')
+    parser.add_argument('--child', choices=['generate', 'stream', 'whole'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'generate':
+        write_synthetic(args.path, args.rows)
+        sys.exit()
+    if args.child:
+        run_child(args.child, args.path, args.chunksize[0])
+        sys.exit()
+
+    if not os.path.exists(args.path):
+        print(f'writing {args.rows:,} synthetic rows to {args.path}')
+        # In a separate process too: Linux carries a process's peak RSS over to the children it starts
+        subprocess.run([sys.executable, __file__, '--child', 'generate', '--path', args.path,
+                        '--rows', str(args.rows)], check=True)
+    print(f'input: {os.path.getsize(args.path) / 2 ** 20:,.0f} MB')
+
+    runs = [('stream', chunksize) for chunksize in args.chunksize]
+    if args.whole_file:
+        runs.append(('whole', 0))
+
+    print(f'{"mode":<8} {"chunksize":>10} {"seconds":>8} {"peak RSS (MB)":>14}')
+    for mode, chunksize in runs:
+        result = measure(mode, args.path, chunksize)
+        print(f'{mode:<8} {chunksize or "-":>10} {result["seconds"]:>8.1f} {result["peak_mb"]:>14,.0f}')
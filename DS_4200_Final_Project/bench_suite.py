@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import config
+from cleaning import state_name_to_code
+from coverage_index import PAYER_COLUMNS
+from dashboards import load_dashboard
+from geo_ingest import GEO_KEYS, ingest_geo, write_synthetic
+from lazy_imports import lazy_import
+from load_test import TAB_OUTPUTS, callback_body
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+plotly_json = lazy_import('plotly.io.json')
+
+# Latest results, committed so a regression between two commits shows up in `git diff bench_results.json`
+RESULTS_PATH = 'bench_results.json'
+
+# Synthetic ZIP-level source the county and ZIP scales are rolled up from (~10 rows per ZIP)
+SYNTHETIC_PATH = 'synthetic_bench_zip.csv'
+SYNTHETIC_ROWS = 400_000
+
+# Data scales: the geo_ingest level the areas come from (None for the real 50-state data)
+# and the timed runs per benchmark
+SCALES = {
+    'states': {'level': None, 'repeat': 20},
+    'counties': {'level': 'county', 'repeat': 5},
+    'zips': {'level': 'zip', 'repeat': 3},
+}
+
+# Payer columns of the synthetic data: the four real ones plus random flags, more than the checklist offers
+SYNTHETIC_PAYERS = PAYER_COLUMNS + [f'99454 Coverage: Payer {i}' for i in range(len(PAYER_COLUMNS) + 1, 17)]
+
+DASHBOARDS = ['12.01_dash.py', '12.02_dash.py', 'final_dash.py', 'test_merge_graph.py']
+
+
+def synthetic_rollups():
+    """ Zip, county and state rollups of the synthetic source, which is written on first use """
+    if not os.path.exists(SYNTHETIC_PATH):
+        write_synthetic(SYNTHETIC_PATH, SYNTHETIC_ROWS)
+    return ingest_geo(SYNTHETIC_PATH)
+
+
+def synthetic_frames(rollups, level, payers=SYNTHETIC_PAYERS, seed=0):
+    """ Merged and RPM coverage tables with one row per county or ZIP
+
+    Args:
+        rollups (dict): geo_ingest.ingest_geo output of a synthetic source
+        level (str): 'county' or 'zip'
+        payers (list): Payer columns; the ones missing from the rollups are random flags
+    Returns:
+        combined_df (df): State, State Code, populations, attack rates and payer columns, like load_combined
+        df (df): 'US States' (the area name) and asthma population counts, like load_source('rpm_coverage')
+    """
+    rng = np.random.default_rng(seed)
+    combined_df = rollups[level].rename(columns={'States': 'State'})
+    n = len(combined_df)
+    combined_df.insert(1, 'State Code', combined_df['State'].map(state_name_to_code).astype('category'))
+    combined_df['Total Asthma Attacks Percent'] = rng.uniform(30, 60, n).round(1)
+    combined_df['Asthma Patients with Medicare Number'] = (combined_df['Adult Number']
+                                                           * rng.uniform(0.1, 0.3, n)).astype('int64')
+    for payer in payers:
+        if payer not in combined_df:
+            combined_df[payer] = rng.random(n) < 0.5
+
+    df = pd.DataFrame({
+        'US States': combined_df['State'] + ' ' + combined_df[GEO_KEYS[level][-1]],
+        'Total Asthma Population': combined_df['Population'],
+        'Adult Asthma Population Number': combined_df['Adult Number'],
+        'Child Asthma Population Number': combined_df['Child Number'],
+    })
+    return combined_df, df
+
+
+def use_data(modules, combined_df=None, df=None, payers=SYNTHETIC_PAYERS):
+    """ Point every dashboard at the given tables, or back at the real data when None """
+    dash_12_01, dash_12_02, final_dash, merge_graph = (modules[path] for path in DASHBOARDS)
+    if combined_df is None:
+        snapshots = [module.load_data() for module in (dash_12_02, final_dash, merge_graph)]
+        combined_df, df, payers = snapshots[0].combined_df, snapshots[0].df, PAYER_COLUMNS
+    else:
+        snapshots = [dash_12_02.build_snapshot(df, combined_df, payers),
+                     final_dash.build_snapshot(combined_df, combined_df, payers),
+                     merge_graph.build_snapshot(combined_df, payers)]
+
+    # 12.01_dash.py reads module globals
+    dash_12_01.combined_df, dash_12_01.df = combined_df, df
+    dash_12_01.coverage_index = snapshots[0].coverage_index
+
+    for module, snapshot in zip((dash_12_02, final_dash, merge_graph), snapshots):
+        # Publishing also drops the tab layouts built from the previous data
+        module.store.publish(snapshot)
+        # Start the figure caches cold, the shared backend included
+        if hasattr(module, 'choropleth_cache'):
+            module.choropleth_cache.clear()
+
+
+def post(client, body):
+    """ A callback request through the app's full dispatch, so ctx.triggered_id and serialization apply """
+    def request():
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code in (200, 204), response.status
+        return response
+    return request
+
+
+def benchmarks(modules):
+    """ Zero-argument call of every figure builder and callback, by name
+
+    Builders are called directly; callbacks that read ctx.triggered_id go
+    through the Flask test client and are measured as served, with the
+    figure caches warm.
+    """
+    dash_12_01, dash_12_02, final_dash, merge_graph = (modules[path] for path in DASHBOARDS)
+    clients = {path: modules[path].get_app().server.test_client() for path in DASHBOARDS[1:]}
+    covered = final_dash.store.current.coverage_index.covered_by_all(PAYER_COLUMNS)
+    n_areas = len(dash_12_02.store.current.df)
+
+    def load(body):
+        # Initial render: nothing triggered
+        return dict(body, changedPropIds=[])
+
+    choropleth = callback_body('choropleth-map.figure', [('checkboxes.value', PAYER_COLUMNS)])
+    toggle = callback_body('choropleth-map.figure', [('checkboxes.value', PAYER_COLUMNS[:2])])
+    # final_dash filters by payer name and CPT code
+    payers = final_dash.store.current.coverage_tensor.payers
+    coverage_inputs = [('checkboxes.value', payers), ('cpt-codes.value', ['99454']), ('code-match.value', 'all')]
+    coverage = callback_body('choropleth-map.figure', coverage_inputs)
+    coverage_toggle = dict(callback_body('choropleth-map.figure', [('checkboxes.value', payers[:2])] + coverage_inputs[1:]),
+                           changedPropIds=['checkboxes.value'])
+    demographic = dict(callback_body('population-choropleth-graph.figure',
+                                     [('demographic-dropdown.value', 'Adult Number'), ('geo-focus.data', None)],
+                                     [('geo-level.value', 'state')]), changedPropIds=['demographic-dropdown.value'])
+
+    return {
+        '12.01 generate_fig': lambda: dash_12_01.generate_fig('Population'),
+        '12.01 update_choropleth': lambda: dash_12_01.update_choropleth(PAYER_COLUMNS),
+        '12.01 update_chart (top 10)': lambda: dash_12_01.update_chart(10),
+        '12.02 build_choropleth': lambda: dash_12_02.build_choropleth(PAYER_COLUMNS),
+        '12.02 update_choropleth (load)': post(clients['12.02_dash.py'], load(choropleth)),
+        '12.02 update_choropleth (toggle)': post(clients['12.02_dash.py'], toggle),
+        '12.02 update_chart (top 10)': lambda: dash_12_02.update_chart(10),
+        '12.02 update_chart (all)': lambda: dash_12_02.update_chart(n_areas),
+        '12.02 render_content (first visit)': post(clients['12.02_dash.py'], callback_body(
+            TAB_OUTPUTS, [('tabs.value', 'tab-2')], [('rendered-tabs.data', ['tab-1'])])),
+        '12.02 render_content (revisit)': post(clients['12.02_dash.py'], callback_body(
+            TAB_OUTPUTS, [('tabs.value', 'tab-2')], [('rendered-tabs.data', ['tab-1', 'tab-2'])])),
+        'final generate_fig (region)': lambda: final_dash.generate_fig('Population', 'region'),
+        'final generate_fig (state)': lambda: final_dash.generate_fig('Population', 'state'),
+        'final update_graph (demographic)': post(clients['final_dash.py'], demographic),
+        'final generate_coverage_fig': lambda: final_dash.generate_coverage_fig(covered),
+        'final update_choropleth (load)': post(clients['final_dash.py'], load(coverage)),
+        'final update_choropleth (toggle)': post(clients['final_dash.py'], coverage_toggle),
+        'merge build_choropleth': lambda: merge_graph.build_choropleth(PAYER_COLUMNS),
+        'merge update_choropleth': post(clients['test_merge_graph.py'], load(choropleth)),
+    }
+
+
+def payload_size(result):
+    """ Bytes of a callback response, or of a figure serialized the way Dash sends it """
+    if hasattr(result, 'status_code'):
+        return len(result.data)
+    return len(plotly_json.to_json_plotly(result))
+
+
+def measure(call, repeat):
+    """ Median latency (ms), peak traced memory (KiB) and payload size (bytes) of one benchmark
+
+    The first call is a warm-up (lazy imports, cache fill) and is not timed;
+    peak memory comes from a separate traced call, since tracing slows every
+    allocation down.
+    """
+    call()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ms': round(statistics.median(times) * 1000, 1), 'peak_kib': round(peak / 1024),
+            'bytes': payload_size(result)}
+
+
+def run(modules, scales, repeat=None):
+    """ Results {scale: {benchmark: measurements}} of every benchmark at every scale """
+    results = {}
+    rollups = None
+    for scale in scales:
+        level = SCALES[scale]['level']
+        if level is None:
+            use_data(modules)
+        else:
+            rollups = rollups or synthetic_rollups()
+            use_data(modules, *synthetic_frames(rollups, level))
+
+        n_areas = len(modules['12.02_dash.py'].store.current.combined_df)
+        print(f'{scale} ({n_areas:,} areas, {len(modules["12.02_dash.py"].store.current.coverage_index.columns)} payers)')
+        results[scale] = {}
+        for name, call in benchmarks(modules).items():
+            results[scale][name] = measure(call, repeat or SCALES[scale]['repeat'])
+            print(f'  {name:<36} {results[scale][name]["ms"]:>9,.1f} ms {results[scale][name]["peak_kib"]:>9,} KiB '
+                  f'{results[scale][name]["bytes"]:>11,} B')
+    use_data(modules)
+    return results
+
+
+def load_results(rev=None):
+    """ Stored results, from the working tree or as committed at a git revision; {} if there are none """
+    if rev is None:
+        if not os.path.exists(RESULTS_PATH):
+            return {}
+        with open(RESULTS_PATH) as f:
+            return json.load(f)
+    shown = subprocess.run(['git', 'show', f'{rev}:./{RESULTS_PATH}'], capture_output=True, text=True)
+    return json.loads(shown.stdout) if shown.returncode == 0 else {}
+
+
+def compare(previous, results, threshold=0.5):
+    """ Print the change of every measurement against previous results
+
+    Args:
+        previous (dict): Results of an earlier run
+        results (dict): This run's results
+        threshold (float): Relative latency or memory increase reported as a regression;
+            any growth of the payload is one, since sizes are deterministic
+    Returns:
+        regressions (list): (scale, benchmark, metric) of every regression
+    """
+    regressions = []
+    for scale, measurements in results.items():
+        for name, new in measurements.items():
+            old = previous.get(scale, {}).get(name)
+            if old is None:
+                continue
+            changes = []
+            for metric, limit in [('ms', threshold), ('peak_kib', threshold), ('bytes', 0)]:
+                if not old[metric]:
+                    continue
+                change = new[metric] / old[metric] - 1
+                if change > limit:
+                    regressions.append((scale, name, metric))
+                if abs(change) > limit or (metric == 'bytes' and change):
+                    changes.append(f'{metric} {old[metric]:,} -> {new[metric]:,} ({change:+.0%})')
+            if changes:
+                print(f'{scale:<9} {name:<36} ' + ', '.join(changes))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latency, peak memory and payload size of every figure builder '
+                                                 'and callback at the real and synthetic data scales')
+    parser.add_argument('scales', nargs='*', default=list(SCALES), help=f'scales to run: {", ".join(SCALES)}')
+    parser.add_argument('--repeat', type=int, help='timed runs per benchmark, per scale by default')
+    parser.add_argument('--compare', metavar='REV',
+                        help='git revision whose committed results to compare with, the results file by default')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='relative latency/memory increase reported as a regression')
+    parser.add_argument('--no-save', action='store_true', help='do not overwrite the results file')
+    parser.add_argument('--check', action='store_true', help='exit non-zero when anything regressed')
+    args = parser.parse_args()
+    if set(args.scales) - set(SCALES):
+        parser.error(f'unknown scales: {", ".join(sorted(set(args.scales) - set(SCALES)))}')
+
+    # Measure the server-side callbacks on uncompressed responses, without the response cache
+    config.CLIENTSIDE_CALLBACKS = False
+    config.COMPRESS_RESPONSES = False
+    modules = {path: load_dashboard(path) for path in DASHBOARDS}
+
+    previous = load_results(args.compare)
+    results = run(modules, args.scales, args.repeat)
+    regressions = compare(previous, results, args.threshold)
+
+    if not args.no_save:
+        # Keep the scales that were not run this time
+        merged = dict(load_results(), **results)
+        with open(RESULTS_PATH, 'w') as f:
+            json.dump(merged, f, indent=1)
+            f.write('\n')
+    if args.check and regressions:
+        sys.exit(f'{len(regressions)} regressions: '
+                 + '; '.join(f'{scale} {name} {metric}' for scale, name, metric in regressions))
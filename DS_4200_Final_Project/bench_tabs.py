@@ -0,0 +1,72 @@
+import time
+
+from plotly.io.json import to_json_plotly
+
+from coverage_index import PAYER_COLUMNS
+from dashboards import load_dashboard
+
+dash_12_02 = load_dashboard('12.02_dash.py')
+
+client = dash_12_02.get_app().server.test_client()
+
+# Callbacks that fire when a tab's graphs are mounted, with their default inputs
+tab_callbacks = {
+    'tab-1': [('choropleth-map', 'checkboxes', PAYER_COLUMNS)],
+    'tab-2': [('stacked-bar-chart', 'top-n-dropdown', 5)],
+}
+
+
+def post(body):
+    response = client.post('/_dash-update-component', json=body)
+    assert response.status_code in (200, 204), response.status_code
+
+
+def mount_graphs(tab):
+    # Initial calls of a freshly mounted graph carry no changed inputs
+    for graph, control, value in tab_callbacks[tab]:
+        post({
+            'output': f'{graph}.figure',
+            'outputs': {'id': graph, 'property': 'figure'},
+            'inputs': [{'id': control, 'property': 'value', 'value': value}],
+            'changedPropIds': [],
+        })
+
+
+# Previous flow: render_content returned the whole tab tree, which remounted and rebuilt its graphs
+def switch_before(tab, rendered_tabs):
+    to_json_plotly(dash_12_02.tab_layout(tab))
+    mount_graphs(tab)
+    return rendered_tabs
+
+
+# Current flow: render each tab once, later switches only toggle visibility
+def switch_after(tab, rendered_tabs):
+    outputs = ([f'{name}-content.children' for name in dash_12_02.tab_builders]
+               + [f'{name}-content.style' for name in dash_12_02.tab_builders] + ['rendered-tabs.data'])
+    post({
+        'output': '..' + '...'.join(outputs) + '..',
+        'outputs': [{'id': output.split('.')[0], 'property': output.split('.')[1]} for output in outputs],
+        'inputs': [{'id': 'tabs', 'property': 'value', 'value': tab}],
+        'changedPropIds': ['tabs.value'],
+        'state': [{'id': 'rendered-tabs', 'property': 'data', 'value': rendered_tabs}],
+    })
+    if tab not in rendered_tabs:
+        mount_graphs(tab)
+        rendered_tabs = rendered_tabs + [tab]
+    return rendered_tabs
+
+
+if __name__ == '__main__':
+    # Keep the choropleth cache from favouring whichever flow runs second
+    dash_12_02.choropleth_cache.warm()
+
+    switches = ['tab-1', 'tab-2'] * 5
+    for name, switch in [('re-render every switch', switch_before), ('render once, then toggle', switch_after)]:
+        rendered_tabs = []
+        timings = []
+        for tab in switches:
+            start = time.perf_counter()
+            rendered_tabs = switch(tab, rendered_tabs)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f'{name}: first visits {timings[0]:.1f} / {timings[1]:.1f} ms, '
+              f'later switches median {sorted(timings[2:])[len(timings[2:]) // 2]:.1f} ms')
@@ -0,0 +1,78 @@
+import argparse
+import json
+import statistics
+import time
+
+import config
+from bench_suite import DASHBOARDS, SCALES, synthetic_frames, synthetic_rollups, use_data
+from coverage_index import PAYER_COLUMNS
+from dashboards import load_dashboard
+from lazy_imports import lazy_import
+
+plotly_json = lazy_import('plotly.io.json')
+
+
+def median_ms(call, repeat):
+    """ Median milliseconds of a call, after one untimed warm-up """
+    call()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def pairs(modules):
+    """ Each chart built with plotly express and stamped from its template, by name
+
+    The px calls get their rows already filtered; the template calls are the
+    dashboards' own builders, filtering included.
+    """
+    dash_12_02, final_dash, merge_graph = (modules[path] for path in DASHBOARDS[1:])
+    data_12_02, data_final = dash_12_02.store.current, final_dash.store.current
+    selected = PAYER_COLUMNS[:2]
+    filtered = data_12_02.combined_df[data_12_02.coverage_index.covered_by_all(selected)]
+    covered = data_final.coverage_index.covered_by_all(selected)
+    n_areas = len(data_12_02.df)
+    return {
+        '12.02 choropleth': (lambda: dash_12_02.px_choropleth(filtered),
+                             lambda: dash_12_02.build_choropleth(selected)),
+        '12.02 bar (top 10)': (lambda: dash_12_02.px_chart(data_12_02.melted_df.iloc[:20]),
+                               lambda: dash_12_02.update_chart(10)),
+        '12.02 bar (all)': (lambda: dash_12_02.px_chart(data_12_02.melted_df.iloc[:2 * n_areas]),
+                            lambda: dash_12_02.update_chart(n_areas)),
+        'final population (state)': (
+            lambda: final_dash.px_population(final_dash.area_values('Population'), 'Population'),
+            lambda: final_dash.generate_fig('Population')),
+        'final coverage': (lambda: final_dash.px_coverage(covered),
+                           lambda: final_dash.generate_coverage_fig(covered)),
+        'merge choropleth': (lambda: merge_graph.px_choropleth(filtered),
+                             lambda: merge_graph.build_choropleth(selected)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Figure construction time of plotly express vs the figure templates')
+    parser.add_argument('scales', nargs='*', default=list(SCALES), help=f'scales to run: {", ".join(SCALES)}')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    config.CLIENTSIDE_CALLBACKS = False
+    modules = {path: load_dashboard(path) for path in DASHBOARDS}
+    rollups = None
+    for scale in args.scales:
+        level = SCALES[scale]['level']
+        if level is None:
+            use_data(modules)
+        else:
+            rollups = rollups or synthetic_rollups()
+            use_data(modules, *synthetic_frames(rollups, level))
+
+        print(f'{scale} ({len(modules["12.02_dash.py"].store.current.combined_df):,} areas)')
+        print(f'  {"chart":<26} {"px (ms)":>9} {"template (ms)":>14} {"speedup":>8} {"same figure":>12}')
+        for name, (px_call, template_call) in pairs(modules).items():
+            px_ms, template_ms = median_ms(px_call, args.repeat), median_ms(template_call, args.repeat)
+            # Compared parsed: only the order of the layout keys differs
+            same = json.loads(plotly_json.to_json_plotly(px_call())) == json.loads(plotly_json.to_json_plotly(template_call()))
+            print(f'  {name:<26} {px_ms:>9.2f} {template_ms:>14.2f} {px_ms / template_ms:>7.0f}x {str(same):>12}')
@@ -0,0 +1,50 @@
+import statistics
+import timeit
+
+import pandas as pd
+import plotly.express as px
+
+from dashboards import load_dashboard
+
+dash_12_02 = load_dashboard('12.02_dash.py')
+
+raw_df = pd.read_csv('Asthma RPM State Coverage.csv')
+
+
+# Previous update_chart: copy, parse, sort and melt the raw table on every request
+def update_chart_before(top_n):
+    sorted_df = raw_df.copy()
+    sorted_df['Total Asthma Population'] = sorted_df['Total Asthma Population'].str.replace(',', '').astype(int)
+    sorted_df = sorted_df.sort_values(by='Total Asthma Population', ascending=False).head(top_n)
+
+    melted_sorted_df = pd.melt(sorted_df, id_vars=['US States'],
+                               value_vars=['Adult Asthma Population Number', 'Child Asthma \nPopulation Number'],
+                               var_name='Age Group', value_name='Population')
+
+    melted_sorted_df['Population'] = pd.to_numeric(melted_sorted_df['Population'].str.replace(',', ''),
+                                                   errors='coerce')
+
+    fig = px.bar(
+        melted_sorted_df,
+        x='US States',
+        y='Population',
+        color='Age Group',
+        labels={'Population': 'Population'},
+        color_discrete_map={'Adult Asthma Population Number': 'blue', 'Child Asthma Population Number': 'purple'},
+        barmode='stack'
+    )
+    fig.update_layout(height=600, width=1200, xaxis_tickangle=-45)
+    return fig
+
+
+def median_ms(callback, top_n, repeat=30):
+    callback(top_n)  # warm up
+    return statistics.median(timeit.repeat(lambda: callback(top_n), number=1, repeat=repeat)) * 1000
+
+
+if __name__ == '__main__':
+    print(f'{"top_n":>5} {"before (ms)":>12} {"after (ms)":>11}')
+    for top_n in range(5, len(dash_12_02.store.current.df) + 1, 5):
+        before = median_ms(update_chart_before, top_n)
+        after = median_ms(dash_12_02.update_chart, top_n)
+        print(f'{top_n:>5} {before:>12.2f} {after:>11.2f}')
@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from dashboards import load_dashboard
+from figure_cache import mask_columns
+from load_test import callback_body
+
+# One interaction per checklist state and dropdown value of 12.02_dash.py
+INTERACTIONS = {
+    'checklist': [callback_body('choropleth-map.figure', [('checkboxes.value', mask_columns(mask))])
+                  for mask in range(16)],
+    'dropdown': [callback_body('stacked-bar-chart.figure', [('top-n-dropdown.value', top_n)])
+                 for top_n in range(5, 55, 5)],
+    # Initial render of the map: nothing triggered, so the full figure instead of a patch
+    'map (load)': [dict(callback_body('choropleth-map.figure', [('checkboxes.value', mask_columns(mask))]),
+                        changedPropIds=[]) for mask in range(16)],
+}
+
+
+def post(client, body, encoding):
+    """ Bytes on the wire, milliseconds and cache status of one callback request """
+    start = time.perf_counter()
+    response = client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': encoding})
+    ms = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.status
+    return len(response.data), ms, response.headers.get('X-Cache')
+
+
+if __name__ == '__main__':
+    dash_12_02 = load_dashboard('12.02_dash.py')
+    client = dash_12_02.get_app().server.test_client()
+
+    print(f'{"interaction":<12} {"identity (B)":>13} {"gzip (B)":>9} {"first (ms)":>11} {"repeat (ms)":>12} '
+          f'{"repeat cache":>13}')
+    for name, bodies in INTERACTIONS.items():
+        identity = [post(client, body, 'identity')[0] for body in bodies]
+        first = [post(client, body, 'gzip') for body in bodies]
+        repeat = [post(client, body, 'gzip') for body in bodies]
+        print(f'{name:<12} {statistics.mean(identity):>13,.0f} {statistics.mean(size for size, _, _ in first):>9,.0f} '
+              f'{statistics.median(ms for _, ms, _ in first):>11.2f} {statistics.median(ms for _, ms, _ in repeat):>12.2f} '
+              f'{repeat[0][2]:>13}')
+
+    layout = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'})
+    identity = client.get('/_dash-layout', headers={'Accept-Encoding': 'identity'})
+    revalidated = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip', 'If-None-Match': layout.headers['ETag']})
+    print(f'layout: {len(identity.data):,} B, {len(layout.data):,} B gzipped, '
+          f'revalidated: HTTP {revalidated.status_code} with {len(revalidated.data)} B')
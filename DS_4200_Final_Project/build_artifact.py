@@ -0,0 +1,53 @@
+import os
+
+from cleaning import load_source, state_name_to_code
+from coverage_index import PAYER_COLUMNS
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+
+# Pre-joined, typed asthma population + coverage table loaded by the dashboards
+ARTIFACT_PATH = 'asthma_coverage.parquet'
+
+# coverage.csv columns the market-entry scores use (see scoring.py)
+MARKET_COLUMNS = [
+    'Total Asthma Attacks Number',
+    'Total Asthma Attacks Percent',
+    'Asthma Patients with Medicare Number',
+]
+
+
+def build_combined():
+    """ Merge the cleaned population and coverage sources into one typed frame
+
+    Returns:
+        combined_df (df): One row per state with integer populations and attack
+            counts, float percents, a categorical state code and boolean coverage flags
+    """
+    asthma_pop_df = load_source('population')
+    coverage_df = load_source('coverage')
+
+    combined_df = asthma_pop_df.rename(columns={'States': 'State'}).merge(
+        coverage_df[['State'] + MARKET_COLUMNS + PAYER_COLUMNS], on='State')
+    combined_df.insert(1, 'State Code', combined_df['State'].map(state_name_to_code).astype('category'))
+    combined_df['State'] = combined_df['State'].astype(str)
+
+    return combined_df
+
+
+def build_artifact(path=ARTIFACT_PATH):
+    """ Write the combined frame to a Parquet file """
+    combined_df = build_combined()
+    combined_df.to_parquet(path, index=False)
+    return combined_df
+
+
+def load_combined(path=ARTIFACT_PATH):
+    """ Load the combined frame, building the artifact first if it does not exist yet """
+    if not os.path.exists(path):
+        return build_artifact(path)
+    return pd.read_parquet(path)
+
+
+if __name__ == '__main__':
+    print(build_artifact().dtypes)
@@ -0,0 +1,71 @@
+import argparse
+import gzip
+import hashlib
+import os
+import shutil
+
+ASSETS_FOLDER = 'assets'
+
+# Third-party assets served from assets/ instead of a CDN, pinned by content hash
+PINNED_ASSETS = {
+    # Bootstrap v4.3.1 (MIT), same release the dashboards used to load from stackpath
+    'bootstrap.min.css': 'ae576713bc196098f7438dede6ff1f835a23291c32b745ad7e6fb6db809a719b',
+}
+
+FONT_PATH = os.path.join('fonts', 'montserrat-regular.woff2')
+
+
+def sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def verify_pinned(folder=ASSETS_FOLDER):
+    """ Fail if a pinned asset is missing or differs from its recorded hash """
+    for name, digest in PINNED_ASSETS.items():
+        path = os.path.join(folder, name)
+        if sha256(path) != digest:
+            raise ValueError(f'{path} does not match its pinned sha256 {digest}')
+
+
+def add_font(font_file, folder=ASSETS_FOLDER):
+    """ Copy a Montserrat woff2 file into assets/ and point the font face at it """
+    target = os.path.join(folder, FONT_PATH)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(font_file, target)
+
+    css_path = os.path.join(folder, 'fonts.css')
+    with open(css_path) as f:
+        css = f.read()
+    url = FONT_PATH.replace(os.sep, '/')
+    if url not in css:
+        css = css.replace("local('Montserrat-Regular');", f"local('Montserrat-Regular'), url('{url}') format('woff2');")
+        with open(css_path, 'w') as f:
+            f.write(css)
+    print(f'{target}: sha256 {sha256(target)}')
+
+
+def compress_assets(folder=ASSETS_FOLDER):
+    """ Write a .gz copy next to every stylesheet and script for offline_assets.configure_assets """
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(('.css', '.js')):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            # mtime=0 keeps the output identical between builds
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            print(f'{path}: {len(data):,} -> {os.path.getsize(path + ".gz"):,} bytes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify, complete and precompress the offline dashboard assets')
+    parser.add_argument('--font', help='Montserrat Regular .woff2 file to bundle')
+    args = parser.parse_args()
+
+    verify_pinned()
+    if args.font:
+        add_font(args.font)
+    compress_assets()
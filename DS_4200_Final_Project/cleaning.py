@@ -0,0 +1,189 @@
+import re
+
+import config
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+
+# Column kinds understood by the cleaning engine
+INT = 'int'  # thousands separated counts, e.g. "3,313,415"
+PERCENT = 'percent'  # "9.3%" -> 9.3, anything unparseable ("Unavailable") -> NaN
+FLAG = 'flag'  # coverage cells such as "Yes (21)" or "BCBS (TX): Yes" -> True, everything else -> False
+TEXT = 'text'  # stripped strings
+
+# Column kind rules shared by every asthma/coverage source, matched against the normalized column name
+COLUMN_RULES = [
+    (r'States?|US States', TEXT),
+    (r'.*(Population|Number|Beneficiaries)', INT),
+    (r'.*(Percent|Market Share)', PERCENT),
+    (r'(Medicaid|\d{5}) Coverage:? .*', FLAG),
+    (r'.*', TEXT),
+]
+
+# Declarative schema for each raw source: where the header is and which column holds the state name
+SOURCES = {
+    'population': {
+        'path': 'population_data_1.csv',
+        'skiprows': 2,
+        'header_rows': 1,
+        'state_column': 'States',
+    },
+    'coverage': {
+        'path': 'coverage.csv',
+        'skiprows': 1,
+        'header_rows': 1,
+        'state_column': 'State',
+    },
+    'rpm_coverage': {
+        'path': 'Asthma RPM State Coverage.csv',
+        'skiprows': 0,
+        'header_rows': 1,
+        'state_column': 'US States',
+    },
+    'cross_analysis': {
+        'path': 'Asthma_Coverage_Cross_Analysis.csv',
+        'skiprows': 1,
+        'header_rows': 2,  # group header ("99454 Coverage") above the field header ("Medicare")
+        'state_column': 'States',
+    },
+    # County/ZIP-level rows (millions), only ever streamed in chunks by geo_ingest.py
+    'geo': {
+        'path': config.GEO_SOURCE or 'asthma_zip.csv',
+        'skiprows': 0,
+        'header_rows': 1,
+        'state_column': 'States',
+    },
+}
+
+state_name_to_code = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
+    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'Florida': 'FL', 'Georgia': 'GA',
+    'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA',
+    'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS', 'Missouri': 'MO',
+    'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV', 'New Hampshire': 'NH', 'New Jersey': 'NJ',
+    'New Mexico': 'NM', 'New York': 'NY', 'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH',
+    'Oklahoma': 'OK', 'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
+    'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY',
+}
+
+
+# Two-digit state FIPS codes, the prefix of every county FIPS code
+state_name_to_fips = {
+    'Alabama': '01', 'Alaska': '02', 'Arizona': '04', 'Arkansas': '05', 'California': '06',
+    'Colorado': '08', 'Connecticut': '09', 'Delaware': '10', 'Florida': '12', 'Georgia': '13',
+    'Hawaii': '15', 'Idaho': '16', 'Illinois': '17', 'Indiana': '18', 'Iowa': '19',
+    'Kansas': '20', 'Kentucky': '21', 'Louisiana': '22', 'Maine': '23', 'Maryland': '24',
+    'Massachusetts': '25', 'Michigan': '26', 'Minnesota': '27', 'Mississippi': '28', 'Missouri': '29',
+    'Montana': '30', 'Nebraska': '31', 'Nevada': '32', 'New Hampshire': '33', 'New Jersey': '34',
+    'New Mexico': '35', 'New York': '36', 'North Carolina': '37', 'North Dakota': '38', 'Ohio': '39',
+    'Oklahoma': '40', 'Oregon': '41', 'Pennsylvania': '42', 'Rhode Island': '44', 'South Carolina': '45',
+    'South Dakota': '46', 'Tennessee': '47', 'Texas': '48', 'Utah': '49', 'Vermont': '50',
+    'Virginia': '51', 'Washington': '53', 'West Virginia': '54', 'Wisconsin': '55', 'Wyoming': '56',
+}
+
+def normalize_name(name):
+    """ Collapse the embedded newlines and stray spaces in spreadsheet headers """
+    if pd.isna(name) or str(name).startswith('Unnamed:'):
+        return ''
+    return ' '.join(str(name).split())
+
+
+def column_kind(name):
+    """ Look up the kind of a normalized column name in COLUMN_RULES """
+    for pattern, kind in COLUMN_RULES:
+        if re.fullmatch(pattern, name):
+            return kind
+
+
+def read_header(path, skiprows, header_rows):
+    """ Read and normalize the header, joining a group header row onto the field row below it
+
+    Args:
+        path (str): CSV file
+        skiprows (int): Blank/title rows above the header
+        header_rows (int): 1 for a plain header, 2 for a group row above a field row
+    Returns:
+        names (list): Normalized column names, '' for unnamed columns
+    """
+    header = pd.read_csv(path, skiprows=skiprows, nrows=header_rows, header=None, dtype=str)
+    fields = [normalize_name(name) for name in header.iloc[-1]]
+    if header_rows == 1:
+        return fields
+
+    # Spreadsheet group headers only fill their first cell, so carry them across the group
+    groups = [normalize_name(name) for name in header.iloc[0].ffill()]
+    names = []
+    for group, field in zip(groups, fields):
+        if group in ('', 'US') or not field:
+            names.append(field)
+        elif group.endswith('Coverage'):
+            names.append(f'{group}: {field}')
+        else:
+            names.append(f'{group} {field}')
+    return names
+
+
+def _read_options(path, skiprows, header_rows):
+    # pd.read_csv arguments shared by the whole-file and the chunked reader
+    names = read_header(path, skiprows, header_rows)
+    kinds = {name: column_kind(name) for name in names if name}
+    usecols = [i for i, name in enumerate(names) if name]
+    return kinds, dict(
+        skiprows=skiprows + header_rows,
+        header=None,
+        usecols=usecols,
+        names=[names[i] for i in usecols],
+        thousands=',',
+        dtype={name: 'int64' if kind == INT else str for name, kind in kinds.items()},
+    )
+
+
+def _clean_frame(df, kinds, state_column):
+    # Drop rows without a state and convert percents, flags and text column-wise
+    df = df.dropna(subset=[state_column]).reset_index(drop=True)
+
+    for name, kind in kinds.items():
+        if kind == PERCENT:
+            df[name] = pd.to_numeric(df[name].str.strip().str.rstrip('%'), errors='coerce').astype('float64')
+        elif kind == FLAG:
+            df[name] = df[name].str.contains('Yes', regex=False).fillna(False).astype(bool)
+        elif kind == TEXT:
+            df[name] = df[name].str.strip()
+    return df
+
+
+def clean_csv(path, skiprows=0, header_rows=1, state_column='State'):
+    """ Read a raw asthma/coverage CSV into typed columns
+
+    Counts are parsed by the CSV reader itself (thousands=','), percents and
+    coverage flags are converted column-wise with vectorized string methods.
+
+    Args:
+        path (str): CSV file
+        skiprows (int): Blank/title rows above the header
+        header_rows (int): Number of header rows (see read_header)
+        state_column (str): Column holding the state name, rows without it are dropped
+    Returns:
+        df (df): Cleaned data with normalized column names
+    """
+    kinds, options = _read_options(path, skiprows, header_rows)
+    return _clean_frame(pd.read_csv(path, **options), kinds, state_column)
+
+
+def iter_clean_csv(path, skiprows=0, header_rows=1, state_column='State', chunksize=200_000):
+    """ Read a raw CSV like clean_csv, but as a stream of cleaned chunks of at most chunksize rows
+
+    Yields:
+        df (df): Cleaned chunk with normalized column names
+    """
+    kinds, options = _read_options(path, skiprows, header_rows)
+    with pd.read_csv(path, chunksize=chunksize, **options) as reader:
+        for chunk in reader:
+            yield _clean_frame(chunk, kinds, state_column)
+
+
+def load_source(source):
+    """ Clean one of the raw sources declared in SOURCES """
+    return clean_csv(**SOURCES[source])
@@ -0,0 +1,37 @@
+import os
+
+# Dashboard settings, overridable through environment variables
+
+# Run the payer checklist and top-N dropdown callbacks in the browser instead of on the server
+CLIENTSIDE_CALLBACKS = os.environ.get('ASTHMA_CLIENTSIDE_CALLBACKS', '0') == '1'
+
+# Run the Dash/Flask dev server with debug tooling and the reloader (python <dashboard>.py only)
+DEBUG = os.environ.get('ASTHMA_DEBUG', '1') == '1'
+
+# Dashboard module served by wsgi.py
+DASHBOARD = os.environ.get('ASTHMA_DASHBOARD', '12.02_dash.py')
+
+# Figure cache shared between worker processes: 'memory' (per process), 'filesystem' or a redis:// URL
+FIGURE_CACHE = os.environ.get('ASTHMA_FIGURE_CACHE', 'memory')
+FIGURE_CACHE_DIR = os.environ.get('ASTHMA_FIGURE_CACHE_DIR', '.figure_cache')
+
+# Seconds between checks of the source CSVs for changes (0 = never); changed data is hot-swapped in
+REFRESH_INTERVAL = float(os.environ.get('ASTHMA_REFRESH_INTERVAL', '0'))
+
+# Directory URL the raw source CSVs are pulled from by fetch_sources.py
+SOURCE_URL = os.environ.get('ASTHMA_SOURCE_URL', '')
+
+# County/ZIP-level source CSV (see geo_ingest.py); when set, final_dash.py maps its state rollup
+GEO_SOURCE = os.environ.get('ASTHMA_GEO_SOURCE', '')
+
+# GeoJSON of US counties with FIPS codes as feature ids, enables the county level of final_dash.py
+COUNTY_GEOJSON = os.environ.get('ASTHMA_COUNTY_GEOJSON', '')
+
+# Compress layout/callback responses and cache deterministic callbacks in the app (0 when a proxy compresses)
+COMPRESS_RESPONSES = os.environ.get('ASTHMA_COMPRESS_RESPONSES', '1') == '1'
+
+# Inline critical.css into the page head (stylesheets from assets/ are still linked)
+INLINE_CRITICAL_CSS = os.environ.get('ASTHMA_INLINE_CRITICAL_CSS', '0') == '1'
+
+# Milliseconds between samples of the callback profiler served at /profile (0 = off); see instrumentation.py
+PROFILE_INTERVAL = float(os.environ.get('ASTHMA_PROFILE_INTERVAL', '0'))
@@ -0,0 +1,61 @@
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+# Payer columns offered by the coverage checklist, in bit order
+PAYER_COLUMNS = [
+    '99454 Coverage: Medicare',
+    '99454 Coverage: Medicaid',
+    '99454 Coverage: Top Private Insurance',
+    '99454 Coverage: Second Private Insurance',
+]
+
+WORD_BITS = 64
+
+
+class CoverageIndex:
+    """ Per-row coverage bitmasks for a set of 0/1 coverage columns
+
+    Bit i of a row's mask is set when the row is covered by columns[i]. Masks
+    are stored as an (n_rows, n_words) uint64 array, so any number of payer or
+    CPT columns fits and every query is one vectorized AND/compare.
+    """
+
+    def __init__(self, frame, columns=PAYER_COLUMNS):
+        self.columns = list(columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.n_words = max(1, -(-len(self.columns) // WORD_BITS))
+
+        # Missing values count as not covered, as in the original sum(axis=1) == len(selected) filter
+        flags = frame[self.columns].fillna(0).to_numpy().astype(bool)
+        self.masks = np.zeros((len(frame), self.n_words), dtype=np.uint64)
+        for word in range(self.n_words):
+            block = flags[:, word * WORD_BITS:(word + 1) * WORD_BITS].astype(np.uint64)
+            shifts = np.arange(block.shape[1], dtype=np.uint64)
+            self.masks[:, word] = np.bitwise_or.reduce(block << shifts, axis=1)
+
+    def mask_of(self, selected):
+        """ Encode selected column names as a Python int bitmask """
+        mask = 0
+        for column in selected or []:
+            mask |= 1 << self.positions[column]
+        return mask
+
+    def _words(self, selected):
+        # Split the selection bitmask into uint64 words matching self.masks
+        mask = self.mask_of(selected)
+        return np.array([(mask >> (word * WORD_BITS)) & (2 ** WORD_BITS - 1) for word in range(self.n_words)],
+                        dtype=np.uint64)
+
+    def covered_by_all(self, selected):
+        """ Boolean row mask of rows covered by every selected column """
+        words = self._words(selected)
+        return ((self.masks & words) == words).all(axis=1)
+
+    def covered_by_any(self, selected):
+        """ Boolean row mask of rows covered by at least one selected column """
+        return (self.masks & self._words(selected)).any(axis=1)
+
+    def covered_by_none(self, selected):
+        """ Boolean row mask of rows covered by none of the selected columns """
+        return ~self.covered_by_any(selected)
@@ -0,0 +1,122 @@
+from geo_ingest import COVERED_SUFFIX
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+# Remote patient monitoring CPT codes: device setup, device supply (16+ days a month),
+# the first 20 minutes of management a month and each additional 20 minutes
+CPT_CODES = ['99453', '99454', '99457', '99458']
+
+# How the selected payers (or codes) must cover an area
+REDUCTIONS = {
+    'all': lambda flags, axis: flags.all(axis=axis),
+    'any': lambda flags, axis: flags.any(axis=axis),
+    'none': lambda flags, axis: ~flags.any(axis=axis),
+}
+
+
+def coverage_column(code, payer):
+    """ Name of the 0/1 column of one CPT code and payer, e.g. '99454 Coverage: Medicare' """
+    return f'{code} Coverage: {payer}'
+
+
+def parse_coverage_column(column):
+    """ (code, payer) of a coverage column, None for any other column
+
+    geo_ingest's rollups also carry '<code> Coverage: <payer> Covered Population'
+    sums next to each flag; those are not payers.
+    """
+    code, sep, payer = column.partition(' Coverage: ')
+    if not sep or code not in CPT_CODES or not payer or payer.endswith(COVERED_SUFFIX):
+        return None
+    return code, payer
+
+
+class CoverageTensor:
+    """ Coverage of every area by every payer for every CPT code, bit-packed
+
+    The area × payer × code booleans are packed 8 to a byte per area, so 50
+    states with 4 payers and 4 codes take 100 bytes. A query reads only the
+    bits of the selected payers and codes, not the whole tensor, and answers
+    with two vectorized reductions (over codes, then over payers); a new code
+    or payer is a new `<code> Coverage: <payer>` column in the source, not
+    new code here.
+
+    Attributes:
+        payers (list): Payer names, in the order of the source columns
+        codes (list): CPT codes
+        known (array): (n_payers, n_codes) booleans, whether the source has that column;
+            combinations it lacks count as not covered
+        bits (array): (n_areas, ceil(n_payers * n_codes / 8)) uint8, payer-major
+    """
+
+    def __init__(self, frame, codes=CPT_CODES):
+        """
+        Args:
+            frame (df): One row per area with `<code> Coverage: <payer>` 0/1 columns
+            codes (list): CPT codes of the code axis
+        """
+        found = {}
+        for column in frame.columns:
+            parsed = parse_coverage_column(column)
+            if parsed is not None and parsed[0] in codes:
+                found[parsed] = column
+        self.codes = list(codes)
+        self.payers = list(dict.fromkeys(payer for _, payer in found))
+        self.n_areas = len(frame)
+
+        flags = np.zeros((self.n_areas, len(self.payers), len(self.codes)), dtype=bool)
+        self.known = np.zeros((len(self.payers), len(self.codes)), dtype=bool)
+        for (code, payer), column in found.items():
+            p, c = self.payers.index(payer), self.codes.index(code)
+            flags[:, p, c] = frame[column].to_numpy().astype(bool)
+            self.known[p, c] = True
+        self.bits = np.packbits(flags.reshape(self.n_areas, -1), axis=1)
+
+    def unpack(self):
+        """ The (n_areas, n_payers, n_codes) boolean tensor """
+        size = len(self.payers) * len(self.codes)
+        return np.unpackbits(self.bits, axis=1, count=size).reshape(self.n_areas, len(self.payers),
+                                                                      len(self.codes)).astype(bool)
+
+    @property
+    def available_codes(self):
+        """ Codes the source has a column for, for at least one payer """
+        return [code for code, known in zip(self.codes, self.known.any(axis=0)) if known]
+
+    def _select(self, payers, codes):
+        # Sub-tensor of the selected payers and codes (all when None)
+        try:
+            payer_rows = [self.payers.index(p) for p in (self.payers if payers is None else payers)]
+            code_rows = [self.codes.index(c) for c in (self.codes if codes is None else codes)]
+        except ValueError as error:
+            raise KeyError(str(error)) from None
+        # Read only the selected bits: flag (p, c) is bit p * n_codes + c of the row, most significant first
+        positions = (np.asarray(payer_rows, dtype=np.intp)[:, None] * len(self.codes)
+                     + np.asarray(code_rows, dtype=np.intp)[None, :]).ravel()
+        shifts = (7 - positions % 8).astype(np.uint8)
+        flags = (self.bits[:, positions // 8] >> shifts) & 1
+        return flags.astype(bool).reshape(self.n_areas, len(payer_rows), len(code_rows))
+
+    def query(self, payers=None, codes=None, payer_match='all', code_match='all'):
+        """ Boolean area mask for a set of payers and CPT codes
+
+        e.g. query(['Medicare', 'Medicaid'], ['99454', '99457'], 'any', 'all'):
+        areas where Medicare or Medicaid covers both 99454 and 99457.
+        An empty set matches every area with 'all' and none with 'any', like
+        CoverageIndex.
+
+        Args:
+            payers (list): Payer names, all by default
+            codes (list): CPT codes, all by default
+            payer_match (str): Key of REDUCTIONS, over the payers
+            code_match (str): 'all' or 'any', over the codes of one payer
+        Returns:
+            rows (array): n_areas booleans
+        """
+        by_payer = REDUCTIONS[code_match](self._select(payers, codes), axis=2)
+        return REDUCTIONS[payer_match](by_payer, axis=1)
+
+    def count(self, payers=None, codes=None):
+        """ Number of covered (payer, code) pairs of each area among the selected ones """
+        return self._select(payers, codes).sum(axis=(1, 2))
@@ -119,4 +119,5 @@ def scatter_plot(value):
 
 
 # run the server
-app.run_server(debug=True)
+if __name__ == '__main__':
+    app.run(debug=True)
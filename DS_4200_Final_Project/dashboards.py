@@ -0,0 +1,132 @@
+import functools
+import importlib.util
+import os
+import threading
+
+import config
+from instrumentation import instrument_app
+from refresh import DataStore, column_hashes
+
+
+def load_dashboard(path, name=None):
+    """ Import a dashboard script by file path
+
+    Args:
+        path (str): Dashboard file, e.g. '12.02_dash.py' (not a valid module name)
+        name (str): Module name to register, derived from the file name by default
+    Returns:
+        module: The executed dashboard module, with its store, get_app() and callbacks
+    """
+    name = name or 'dash_' + os.path.splitext(os.path.basename(path))[0].replace('.', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Dashboard:
+    """ Data store, figure caches and app of one dashboard script
+
+    Nothing is read or built at construction, so a script creates its
+    Dashboard at import time: the data loads on the first access of
+    store.current (or store.warm()), and the app on the first get_app().
+
+    Attributes:
+        store (DataStore): Snapshots of the script's data; callbacks read store.current once per request
+        caches (list): FigureCaches rebound to every new snapshot (see add_cache)
+        on_publish (list): Callables run after a new snapshot is published, e.g. clearing layout caches
+    """
+
+    def __init__(self, name, load, sources):
+        """
+        Args:
+            name (str): Module name of the script, passed on to dash.Dash
+            load (callable): Builds a snapshot (a SimpleNamespace with at least combined_df)
+            sources (list): cleaning.SOURCES the snapshot is built from, watched for changes
+        """
+        self.name = name
+        self.caches = []
+        self.on_publish = []
+        self.store = DataStore(load, sources, publish=self.publish)
+        self._create_app = None
+        self._app = None
+        self._app_lock = threading.Lock()
+
+    def add_cache(self, cache):
+        """ Rebind a FigureCache on every publish and report it at /cache-stats; returns the cache """
+        self.caches.append(cache)
+        return cache
+
+    def publish(self, data):
+        """ Make a snapshot current, dropping the cached figures built from the columns it changed """
+        publish = functools.partial(self.store.swap, data)
+        if self.caches:
+            hashes = column_hashes(data.combined_df)
+            # Each cache swaps under its own lock, so the snapshot changes together with all of them
+            for cache in self.caches:
+                publish = functools.partial(cache.rebind, hashes, publish)
+        publish()
+        for hook in self.on_publish:
+            hook()
+
+    def cache_stats(self):
+        """ Hit/miss counters of each figure cache, by name """
+        return {cache.name: cache.stats() for cache in self.caches}
+
+    def new_app(self, deterministic=(), data_api=True, **options):
+        """ A Dash app with the routes every dashboard serves, before its own layout and callbacks
+
+        Stylesheets come from assets/ under hashed URLs, callbacks are timed
+        at /metrics and, when the script has figure caches, their counters
+        are at /cache-stats. Imports dash and flask, but reads no data.
+
+        Args:
+            deterministic (list): Callback outputs that only depend on their inputs and the
+                snapshot, served from the response cache (see http_cache.configure_response_caching)
+            data_api (bool): Serve the snapshot's merged table at /api/coverage (see data_api.py)
+            options: Passed on to dash.Dash
+        Returns:
+            app (Dash): A new app
+        """
+        import dash
+
+        from data_api import register_data_api, snapshot_tag
+        from http_cache import configure_response_caching
+        from offline_assets import configure_assets
+
+        # Bootstrap 4.3.1 and the Montserrat font face are served from assets/ (see offline_assets.py)
+        app = dash.Dash(self.name, **options)
+        configure_assets(app)
+        if self.caches:
+            app.server.route('/cache-stats')(self.cache_stats)
+
+        # Merged table filtered by payers and states, as Arrow IPC, for client-side rendering and other tools
+        if data_api:
+            register_data_api(app, self.store)
+
+        # Compressed callback/layout responses, deterministic callbacks answered from memory
+        if config.COMPRESS_RESPONSES:
+            configure_response_caching(app, deterministic=deterministic,
+                                       version=lambda: snapshot_tag(self.store.current))
+
+        # Per-callback timings at /metrics (and sampled stacks at /profile); last, so it sees uncompressed bodies
+        instrument_app(app)
+        return app
+
+    def app_factory(self, create_app):
+        """ Decorator registering the script's create_app, which get_app() calls once """
+        self._create_app = create_app
+        return create_app
+
+    def get_app(self):
+        """ The script's shared app, built by its create_app on the first call """
+        with self._app_lock:
+            if self._app is None:
+                self._app = self._create_app()
+            return self._app
+
+    def run(self):
+        """ Serve a new app with the Dash dev server (python <dashboard>.py), watching the sources if configured """
+        if config.REFRESH_INTERVAL:
+            self.store.watch(config.REFRESH_INTERVAL)
+        self._create_app().run(debug=config.DEBUG)
@@ -0,0 +1,170 @@
+import io
+import threading
+from collections import OrderedDict
+
+import flask
+
+from coverage_tensor import CPT_CODES
+from figure_cache import mask_columns
+from http_cache import choose_encoding, compress, etag_of, if_none_match
+from lazy_imports import lazy_import
+from refresh import column_hashes
+
+pa = lazy_import('pyarrow')
+
+# Wire formats of the data API: Arrow IPC stream by default, JSON records and CSV for quick inspection
+FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+
+# How rows must be covered by the payers in the bitmask (see coverage_tensor.REDUCTIONS)
+MATCHES = ['all', 'any', 'none']
+
+# How each payer must cover the requested CPT codes
+CODE_MATCHES = ['all', 'any']
+
+# Responses are revalidated on every use; an unchanged snapshot answers with a 304
+CACHE_CONTROL = 'no-cache'
+
+
+def snapshot_tag(data):
+    """ Content hash of a snapshot's merged table, computed once per snapshot """
+    tag = getattr(data, 'api_version', None)
+    if tag is None:
+        tag = data.api_version = etag_of(*sorted(column_hashes(data.combined_df).items()))
+    return tag
+
+
+def query_frame(data, payers=0, match='all', states=None, columns=None, codes=('99454',), code_match='all'):
+    """ Rows of the merged asthma/coverage table selected by payers, CPT codes and a state list
+
+    Args:
+        data (SimpleNamespace): Snapshot with combined_df and coverage_tensor
+        payers (int): Bitmask over coverage_tensor.payers, as in the figure cache keys
+        match (str): One of MATCHES, over the payers
+        states (list): State names or two-letter codes, all states when empty
+        columns (list): Columns to return, all by default
+        codes (list): CPT codes the payers must cover
+        code_match (str): One of CODE_MATCHES, over the codes of each payer
+    Returns:
+        df (df): Selected rows and columns
+    """
+    tensor = data.coverage_tensor
+    frame = data.combined_df
+    rows = tensor.query(mask_columns(payers, tensor.payers), list(codes), match, code_match)
+    if states:
+        rows &= frame['State'].isin(states).to_numpy() | frame['State Code'].astype(str).isin(states).to_numpy()
+    return frame.loc[rows, columns or list(frame.columns)].reset_index(drop=True)
+
+
+def encode_frame(frame, fmt='arrow'):
+    """ Serialize a frame in one of FORMATS """
+    if fmt == 'arrow':
+        # The pandas metadata is ~2 KB of JSON per response; dictionary columns stay categorical without it
+        table = pa.Table.from_pandas(frame, preserve_index=False).replace_schema_metadata(None)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if fmt == 'json':
+        return frame.to_json(orient='records').encode()
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def _parse_query(args, data):
+    # Validate the query string into a normalized tuple, so equal queries share an ETag and a cache entry
+    try:
+        payers = int(args.get('payers', '0'))
+    except ValueError:
+        flask.abort(400, 'payers must be an integer bitmask')
+    if not 0 <= payers < 1 << len(data.coverage_tensor.payers):
+        flask.abort(400, f'payers must be a bitmask of {len(data.coverage_tensor.payers)} payers')
+    match = args.get('match', 'all')
+    fmt = args.get('format', 'arrow')
+    if match not in MATCHES or fmt not in FORMATS:
+        flask.abort(400, f'match must be one of {MATCHES} and format one of {list(FORMATS)}')
+    codes = tuple(sorted(set(filter(None, args.get('codes', '99454').split(',')))))
+    code_match = args.get('code_match', 'all')
+    if not set(codes) <= set(CPT_CODES) or code_match not in CODE_MATCHES:
+        flask.abort(400, f'codes must be among {CPT_CODES} and code_match one of {CODE_MATCHES}')
+    states = tuple(sorted(filter(None, args.get('states', '').split(','))))
+    columns = tuple(filter(None, args.get('columns', '').split(',')))
+    unknown = set(columns) - set(data.combined_df.columns)
+    if unknown:
+        flask.abort(400, f'unknown columns: {sorted(unknown)}')
+    return payers, match, states, columns, codes, code_match, fmt
+
+
+def register_data_api(app, store, path='/api/coverage', max_entries=256):
+    """ Serve the current snapshot's merged table from app.server
+
+    GET <path>?payers=<bitmask>&match=all|any|none&codes=99454,99457&code_match=all|any
+        &states=CA,Texas&columns=...&format=arrow|json|csv
+
+    The bitmask is over the snapshot's coverage_tensor.payers, in source
+    column order; codes default to 99454.
+
+    Bodies are compressed with the best coding the client accepts (see
+    http_cache.ENCODINGS) and kept in a small LRU cache per query and coding.
+    The coding is chosen once per request, from the Accept-Encoding header
+    and the size of the uncompressed body (tiny bodies go out as they are);
+    the ETag of the data and the query is then tagged with it. The size is
+    cached with the bodies, so a client revalidating after a refresh that
+    did not change the table still gets a 304 without a body being built.
+
+    Args:
+        app (Dash): Dashboard app
+        store (DataStore): Store whose current snapshot has combined_df and coverage_tensor
+        path (str): URL of the endpoint
+        max_entries (int): Queries whose encoded responses are kept in memory
+    """
+    # Query tag (snapshot and query) -> (uncompressed size, {coding: body})
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    @app.server.route(path)
+    def coverage_data():
+        data = store.current
+        query = _parse_query(flask.request.args, data)
+        payers, match, states, columns, codes, code_match, fmt = query
+        tag = etag_of(snapshot_tag(data), *query)
+
+        def build():
+            return encode_frame(query_frame(data, payers, match, states, list(columns), codes, code_match), fmt)
+
+        with lock:
+            entry = cache.get(tag)
+            if entry is not None:
+                cache.move_to_end(tag)
+        raw = None
+        if entry is None:
+            raw = build()
+            entry = (len(raw), {})
+            with lock:
+                entry = cache.setdefault(tag, entry)
+                if len(cache) > max_entries:
+                    cache.popitem(last=False)
+        size, bodies = entry
+
+        # Each coding is its own representation, with its own ETag and cached body
+        encoding = choose_encoding(flask.request.headers.get('Accept-Encoding'), size)
+        etag = etag_of(tag, encoding)
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if if_none_match(flask.request.headers.get('If-None-Match'), etag):
+            return flask.Response(status=304, headers=headers)
+
+        content = bodies.get(encoding)
+        if content is None:
+            content = compress(build() if raw is None else raw, encoding)
+            with lock:
+                bodies[encoding] = content
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return flask.Response(content, mimetype=FORMATS[fmt], headers=headers)
+
+    return coverage_data
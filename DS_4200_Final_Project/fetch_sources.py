@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urljoin, urlsplit
+
+import config
+from cleaning import SOURCES
+
+logger = logging.getLogger(__name__)
+
+# ETag / Last-Modified of every fetched file, sent back as conditional request headers
+MANIFEST_PATH = '.fetch_manifest.json'
+
+# Responses worth retrying: the server or a proxy in front of it was briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """ A source could not be fetched after all retries """
+
+
+class ConnectionPool:
+    """ Idle keep-alive connections per host, shared by the fetcher's worker threads """
+
+    def __init__(self, timeout=30, max_idle=32):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.opened = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, scheme, netloc):
+        """ An idle connection to the host, or a new one """
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), queue.LifoQueue())
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.opened += 1
+            connection = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            return connection(netloc, timeout=self.timeout)
+
+    def put(self, scheme, netloc, conn):
+        """ Return a connection whose response was read to the end, for reuse """
+        idle = self._idle[(scheme, netloc)]
+        if idle.qsize() < self.max_idle:
+            idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+
+
+def _read_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_atomic(path, data):
+    # Readers (the refresh watcher) see the old or the new file, never half of one
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SourceFetcher:
+    """ Download many source files concurrently, only transferring the ones that changed
+
+    Requests run on a thread pool driven from asyncio, over pooled keep-alive
+    connections. A file fetched before is requested with If-None-Match /
+    If-Modified-Since, so an unchanged file costs one 304 and keeps its
+    content (and its hash, so refresh.py does not rebuild anything).
+    """
+
+    def __init__(self, concurrency=16, retries=3, backoff=0.25, timeout=30, manifest_path=MANIFEST_PATH):
+        """
+        Args:
+            concurrency (int): Requests in flight at once
+            retries (int): Extra attempts after a connection error or a RETRY_STATUSES response
+            backoff (float): Seconds before the first retry, doubled for each further one
+            timeout (float): Socket timeout of each request
+            manifest_path (str): Where the validators of fetched files are kept
+        """
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.manifest_path = manifest_path
+        self.manifest = _read_manifest(manifest_path)
+        self.pool = ConnectionPool(timeout, max_idle=concurrency)
+
+    def _request(self, url, headers):
+        # Blocking GET on a pooled connection; runs in a worker thread
+        parts = urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        conn = self.pool.get(parts.scheme, parts.netloc)
+        try:
+            conn.request('GET', target, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self.pool.put(parts.scheme, parts.netloc, conn)
+        return response.status, response.headers, body
+
+    def _conditional_headers(self, url, path):
+        entry = self.manifest.get(path)
+        if not entry or entry['url'] != url or not os.path.exists(path):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    async def fetch(self, url, path, executor):
+        """ Fetch one file to path unless it is unchanged
+
+        Returns:
+            status (str): 'fetched' or 'not modified'
+        """
+        loop = asyncio.get_running_loop()
+        headers = self._conditional_headers(url, path)
+        for attempt in range(self.retries + 1):
+            try:
+                status, response_headers, body = await loop.run_in_executor(executor, self._request, url, headers)
+            except (OSError, http.client.HTTPException) as e:
+                error = f'{type(e).__name__}: {e}'
+            else:
+                if status == 304:
+                    return 'not modified'
+                if status == 200:
+                    await loop.run_in_executor(executor, _write_atomic, path, body)
+                    self.manifest[path] = {'url': url, 'etag': response_headers.get('ETag'),
+                                           'last_modified': response_headers.get('Last-Modified')}
+                    return 'fetched'
+                if status not in RETRY_STATUSES:
+                    raise FetchError(f'{url}: HTTP {status}')
+                error = f'HTTP {status}'
+            if attempt < self.retries:
+                logger.warning('fetching %s failed (%s), retrying', url, error)
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        raise FetchError(f'{url}: {error} after {self.retries + 1} attempts')
+
+    async def fetch_all(self, files):
+        """ Fetch {path: url} concurrently
+
+        Returns:
+            statuses (dict): 'fetched' or 'not modified' per path; raises FetchError
+                if any file failed, after the others finished and the manifest was saved
+        """
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='fetch') as executor:
+            results = await asyncio.gather(*(self.fetch(url, path, executor) for path, url in files.items()),
+                                           return_exceptions=True)
+        self.pool.close()
+        _write_atomic(self.manifest_path, json.dumps(self.manifest, indent=1).encode())
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise FetchError(f'{len(errors)} of {len(files)} files failed, first: {errors[0]}')
+        return dict(zip(files, results))
+
+    def fetch_all_sync(self, files):
+        """ fetch_all for callers without an event loop """
+        return asyncio.run(self.fetch_all(files))
+
+
+def source_urls(base_url, sources=None):
+    """ Download URL of each raw source in cleaning.SOURCES, by local path
+
+    Args:
+        base_url (str): Directory URL the raw CSVs are published under
+        sources (list): SOURCES names, all by default
+    """
+    base_url = base_url.rstrip('/') + '/'
+    paths = [SOURCES[source]['path'] for source in sources or SOURCES]
+    return {path: urljoin(base_url, quote(os.path.basename(path))) for path in paths}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pull the raw source CSVs and rebuild the derived tables that changed')
+    parser.add_argument('--base-url', default=config.SOURCE_URL, help='directory URL of the raw CSVs')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), help='sources to pull, all by default')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    if not args.base_url:
+        parser.error('--base-url or ASTHMA_SOURCE_URL is required')
+
+    start = time.perf_counter()
+    statuses = SourceFetcher(args.concurrency).fetch_all_sync(source_urls(args.base_url, args.sources))
+    for path, status in statuses.items():
+        print(f'{status:<13} {path}')
+    print(f'{time.perf_counter() - start:.2f} s')
+
+    # Feed the cleaning pipeline: only tables built from a source whose content changed are rebuilt
+    from refresh import refresh_derived
+    rebuilt = refresh_derived()
+    print('rebuilt: ' + ', '.join(rebuilt) if rebuilt else 'derived tables are up to date')
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import config
+from coverage_index import PAYER_COLUMNS
+from lazy_imports import lazy_import
+
+plotly_json = lazy_import('plotly.io.json')
+
+
+def payer_mask(selected, columns=PAYER_COLUMNS):
+    """ Encode a checklist selection as an integer bitmask
+
+    Args:
+        selected (list): Selected payer column names (order does not matter)
+        columns (list): Payer columns, bit i is set when columns[i] is selected
+    Returns:
+        mask (int): Bitmask of the selection
+    """
+    mask = 0
+    for column in selected or []:
+        mask |= 1 << columns.index(column)
+    return mask
+
+
+def mask_columns(mask, columns=PAYER_COLUMNS):
+    """ Decode a bitmask back into the list of selected payer columns """
+    return [column for i, column in enumerate(columns) if mask >> i & 1]
+
+
+class FileSystemBackend:
+    """ Figure JSON shared between worker processes through a directory
+
+    Any object with the same get/set/clear methods can be used instead,
+    e.g. RedisBackend or a local stand-in for it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        # Write to a temporary file and rename it so readers never see a partial figure
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class RedisBackend:
+    """ Figure JSON shared through Redis (or any client exposing get/set/scan_iter/delete) """
+
+    def __init__(self, client, prefix='figure-cache:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+def shared_backend():
+    """ Cross-process figure cache backend selected by config.FIGURE_CACHE, or None for in-process only """
+    if config.FIGURE_CACHE == 'filesystem':
+        return FileSystemBackend(config.FIGURE_CACHE_DIR)
+    if config.FIGURE_CACHE.startswith('redis://'):
+        import redis
+        return RedisBackend(redis.Redis.from_url(config.FIGURE_CACHE))
+    return None
+
+
+class FigureCache:
+    """ Serialized figures for every payer checklist combination
+
+    The checklist only has 2 ** len(columns) possible selections, so each
+    figure is built once (lazily or through warm()) and every later request
+    with the same selection is a dictionary lookup. With a shared backend,
+    a figure built by one worker process is reused by all the others.
+
+    A figure depends on data_columns plus the payer columns it selects. Once
+    the cache is bound to the column hashes of its data (rebind), each entry
+    is keyed by the hash of exactly those columns, so a data refresh only
+    drops the figures whose inputs changed.
+    """
+
+    def __init__(self, build_fig, columns=PAYER_COLUMNS, name='figure', backend=None, data_columns=()):
+        self.build_fig = build_fig
+        self.columns = columns
+        self.name = name
+        self.backend = backend
+        self.data_columns = list(data_columns)
+        self.column_hashes = None
+        self.figures = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        # Guards the dict, counters and binding; never held while a figure is built, since building
+        # reads the data store, whose lock is held while rebind() publishes a snapshot
+        self._lock = threading.Lock()
+        # One lock per selection, so concurrent requests for the same figure build it once
+        self._build_locks = {}
+
+    def get(self, selected):
+        """ Return the figure dict for a checklist selection, building it on first use """
+        mask = payer_mask(selected, self.columns)
+        fig = self.figures.get(mask)
+        if fig is not None:
+            with self._lock:
+                self.hits += 1
+            return fig
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(mask, threading.Lock())
+        with build_lock:
+            with self._lock:
+                # another request may have built it while we waited on the lock
+                fig = self.figures.get(mask)
+                if fig is not None:
+                    self.hits += 1
+                    return fig
+                column_hashes = self.column_hashes
+
+            # Shared entries of a cache that is not bound to its data yet may be from another version
+            bound = column_hashes is not None or not self.data_columns
+            fig_json = self.backend.get(self._key(mask, column_hashes)) if self.backend is not None and bound else None
+            built = fig_json is None
+            fig = self.build_fig(mask_columns(mask, self.columns)).to_dict() if built else json.loads(fig_json)
+
+            with self._lock:
+                if built:
+                    self.misses += 1
+                else:
+                    self.shared_hits += 1
+                # A figure built while rebind() published new data may be from either version: serve it, don't keep it
+                current = self.column_hashes is column_hashes
+                if current:
+                    self.figures[mask] = fig
+            if built and current and self.backend is not None:
+                self.backend.set(self._key(mask, column_hashes), plotly_json.to_json_plotly(fig))
+        return fig
+
+    def _key(self, mask, column_hashes):
+        # Shared backend key, versioned by the content of the columns the figure is built from
+        if column_hashes is None:
+            return f'{self.name}-{mask}'
+        return f'{self.name}-{mask}-{self._entry_hash(mask, column_hashes)}'
+
+    def _entry_hash(self, mask, column_hashes):
+        inputs = self.data_columns + mask_columns(mask, self.columns)
+        return hashlib.sha256(''.join(column_hashes[column] for column in inputs).encode()).hexdigest()[:16]
+
+    def rebind(self, column_hashes, publish=None):
+        """ Point the cache at new data, dropping only the figures whose input columns changed
+
+        Args:
+            column_hashes (dict): Content hash of every column of the new data
+            publish (callable): Makes the new data current; called under the cache lock
+                together with the rebinding, so a figure built meanwhile is not kept
+                under the wrong version. Must not build figures
+        Returns:
+            dropped (list): Masks of the figures that were invalidated
+        """
+        with self._lock:
+            if publish is not None:
+                publish()
+            dropped = [mask for mask in self.figures if self.column_hashes is None
+                       or self._entry_hash(mask, self.column_hashes) != self._entry_hash(mask, column_hashes)]
+            self.figures = {mask: fig for mask, fig in self.figures.items() if mask not in dropped}
+            self.column_hashes = column_hashes
+        return dropped
+
+    def warm(self):
+        """ Build every combination up front, e.g. before serving traffic """
+        for mask in range(2 ** len(self.columns)):
+            if mask not in self.figures:
+                self.get(mask_columns(mask, self.columns))
+
+    def clear(self):
+        """ Drop every figure, here and in the shared backend (shared by all caches using it), and reset the counters """
+        with self._lock:
+            self.figures = {}
+            if self.backend is not None:
+                self.backend.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        """ Hit/miss counters and number of cached figures """
+        return {'hits': self.hits, 'shared_hits': self.shared_hits, 'misses': self.misses,
+                'size': len(self.figures), 'pid': os.getpid()}
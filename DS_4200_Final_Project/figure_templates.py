@@ -0,0 +1,50 @@
+from lazy_imports import lazy_import
+
+go = lazy_import('plotly.graph_objects')
+
+
+class FigureTemplate:
+    """ A chart's styling, built once with plotly express and stamped with new data per request
+
+    px.choropleth and px.bar validate every argument and rebuild the geo
+    layout, colorscale, hover template and plotly theme on each call. A
+    template keeps the result of one such call as plain dicts; stamp() copies
+    the per-request arrays (locations, z, hover text, ...) into its traces
+    and wraps them in a go.Figure without validating them again.
+    """
+
+    def __init__(self, build):
+        """
+        Args:
+            build (callable): Builds a sample of the chart with plotly express, called on
+                first use; its data arrays are always replaced, only the styling is kept
+        """
+        self.build = build
+        self._base = None
+
+    @property
+    def base(self):
+        """ The sample figure as a dict """
+        if self._base is None:
+            self._base = self.build().to_dict()
+        return self._base
+
+    @property
+    def names(self):
+        """ Trace names of the sample, e.g. the color groups of a px.bar chart, in trace order """
+        return [trace.get('name') for trace in self.base['data']]
+
+    def stamp(self, *traces):
+        """ A figure with the template's styling and the given data
+
+        Args:
+            *traces (dict): Arrays of each trace in order, e.g. dict(locations=..., z=...)
+        Returns:
+            fig (go.Figure): Unvalidated figure, one trace per dict
+        """
+        # go.Figure deep-copies every array: element by element for object (string) arrays,
+        # a single memcpy once they are fixed-width unicode
+        data = [dict(trace, **{key: values.astype(str) if getattr(values, 'dtype', None) == object else values
+                               for key, values in arrays.items()})
+                for trace, arrays in zip(self.base['data'], traces)]
+        return go.Figure({'data': data, 'layout': self.base['layout']}, _validate=False)
@@ -1,126 +1,377 @@
-import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
-import pandas as pd
+import functools
+import json
+from types import SimpleNamespace
+
+import config
+from build_artifact import load_combined
+from coverage_index import PAYER_COLUMNS, CoverageIndex
+from coverage_tensor import CPT_CODES, CoverageTensor
+from dashboards import Dashboard
+from figure_templates import FigureTemplate
+from geo_ingest import ingest_geo
+from geo_rollups import GeoRollups, summable_measures
+from instrumentation import phase
+from lazy_imports import lazy_import
+
+# Heavy modules load on first use, so importing the dashboard (tooling, test collection) stays cheap;
+# dash is imported by create_app and by the functions that build components
+px = lazy_import('plotly.express')
+pd = lazy_import('pandas')
+
+
+# Define the demographic options for the dropdown
+populations = {
+    'Population': 'Total Population',
+    'Adult Number': 'Adult Population',
+    'Child Number': 'Child Population',
+}
+
 
 # Load clean data
-asthma_pop_df = pd.read_csv('clean_population_data.csv')
-coverage_df = pd.read_csv('coverage_df_clean.csv')
-combined_df = asthma_pop_df.merge(coverage_df, left_on='States', right_on='State')
-print(coverage_df)
+def load_data():
+    # A county/ZIP-level source (ASTHMA_GEO_SOURCE) is streamed and rolled up to one row per state
+    if config.GEO_SOURCE:
+        geo = ingest_geo()
+        combined_df = geo['state']
+        areas_df = geo['county'].rename(columns={'States': 'State'})
+    else:
+        combined_df = areas_df = load_combined()
+    return build_snapshot(combined_df, areas_df)
+
+
+def build_snapshot(combined_df, areas_df, payers=PAYER_COLUMNS):
+    """ Derive the callbacks' lookup structures from the merged table and the finest areas
+
+    Args:
+        combined_df (df): One row per area of the coverage map, with State, State Code and payer columns
+        areas_df (df): One row per finest area with a 'State' name column, the counts, the
+            payer flags (or covered populations) and, for county data, a 'County FIPS' column
+        payers (list): Payer columns indexed for the coverage filters
+    Returns:
+        data (SimpleNamespace): combined_df, coverage_index, coverage_tensor and rollups
+    """
+    areas_df, measures = summable_measures(areas_df, payers)
+    return SimpleNamespace(combined_df=combined_df,
+                           # Per-state payer coverage bitmasks
+                           coverage_index=CoverageIndex(combined_df, payers),
+                           # State x payer x CPT code coverage, for the payer and code filters
+                           coverage_tensor=CoverageTensor(combined_df),
+                           # Demographics, payer counts and covered populations summed per region, state
+                           # and (with county data) county
+                           rollups=GeoRollups(areas_df, measures))
+
+
+# Callbacks read store.current once per request; a refresh swaps in a whole new snapshot.
+# Nothing is loaded until the first access (or store.warm() in wsgi.py), and the app is built by get_app()
+dashboard = Dashboard(__name__, load_data, ['geo'] if config.GEO_SOURCE else ['population', 'coverage'])
+store = dashboard.store
+get_app = dashboard.get_app
+
+
+# County shapes keyed by FIPS code, read on first use; the county level is only offered when they are configured
+@functools.cache
+def county_geojson():
+    if not config.COUNTY_GEOJSON:
+        return None
+    with open(config.COUNTY_GEOJSON) as f:
+        return json.load(f)
+
+
+# Geography levels of the population map, coarsest first
+def geo_levels(data=None):
+    levels = {'region': 'Region', 'state': 'State', 'county': 'County'}
+    if county_geojson() is None or 'county' not in (data or store.current).rollups.levels:
+        del levels['county']
+    return levels
+
+# Location and hover name columns of each level
+geo_columns = {
+    'region': ('State Code', 'Region'),
+    'state': ('State Code', 'State'),
+    'county': ('County FIPS', 'County'),
+}
+
+
+def area_values(demographic, level='state', focus=None, data=None):
+    """ Look up one demographic for every area drawn at a geography level
+
+    Args:
+        demographic (str): Column of populations
+        level (str): 'region', 'state' or 'county'
+        focus (str): Area one level up to drill into (e.g. a region at state level), None for all
+    Returns:
+        areas (df): Location, demographic and area name columns (see geo_columns)
+    """
+    rollups = (data or store.current).rollups
+    location_column, name_column = geo_columns[level]
+    if level == 'region':
+        # Regions have no shapes of their own: paint every state with its region's total
+        state = rollups.levels['state']
+        return pd.DataFrame({location_column: rollups.locations('state'),
+                             demographic: rollups.column('region', demographic)[state.parent],
+                             name_column: rollups.levels['region'].codes[state.parent]})
+
+    rows = rollups.children(rollups.coarser(level), focus) if focus else slice(None)
+    return pd.DataFrame({location_column: rollups.locations(level, rows),
+                         demographic: rollups.column(level, demographic, rows),
+                         name_column: rollups.levels[level].codes[rows]})
 
 
 # Generate asthma population chloropleth graph
-def generate_fig(demographic):
+def generate_fig(demographic, level='state', focus=None):
+    location_column, name_column = geo_columns[level]
+    with phase('filter'):
+        areas = area_values(demographic, level, focus)
+
+    with phase('build'):
+        fig = population_template(demographic, level).stamp(dict(
+            locations=areas[location_column].to_numpy(),
+            z=areas[demographic].to_numpy(),
+            hovertext=areas[name_column].to_numpy(),
+            customdata=areas[[name_column]].to_numpy(),
+        ))
+        if focus:
+            fig.update_geos(fitbounds='locations')
+
+    return fig
+
+
+# Asthma population chloropleth with plotly express (the templates' sample, and the reference for bench_templates.py)
+def px_population(areas, demographic, level='state', focus=None):
+    location_column, name_column = geo_columns[level]
     fig = px.choropleth(
-        asthma_pop_df,
-        locations='State Code',  # State Code as locations
+        areas,
+        locations=location_column,  # State Code (or county FIPS) as locations
         color=demographic,  # Color scale on population
-        locationmode='USA-states',  # Set location mode to US
+        locationmode='USA-states' if level != 'county' else None,  # Set location mode to US
+        geojson=county_geojson() if level == 'county' else None,
         scope='usa',  # Set scope to US
-        hover_name='States',  # Hover show state names
+        hover_name=name_column,  # Hover show state names
+        custom_data=[name_column],  # Area clicked on, for drilling down
         height=600,
         color_continuous_scale='Blues',  # Use selected color scale
         title='Asthma Prevalence in the United States',
     )
 
     fig.update_coloraxes(colorbar=dict(title='Population Count'))
+    if focus:
+        fig.update_geos(fitbounds='locations')
 
     return fig
 
 
-# Initialize the Dash app
-app = dash.Dash(__name__,external_stylesheets=[
-    {
-        'href': 'https://fonts.googleapis.com/css?family=Montserrat',  # Link to custom font
-        'rel': 'stylesheet'
-    },
-    {
-        'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',  # Bootstrap CSS
-        'rel': 'stylesheet'
-    }
-])
+# Styling of the population map per demographic and level (hover labels, county shapes), built once each
+@functools.cache
+def population_template(demographic, level):
+    return FigureTemplate(lambda: px_population(area_values(demographic, level), demographic, level))
 
 
-# Define the demographic options for the dropdown
-populations = {
-    'Population': 'Total Population',
-    'Adult Number': 'Adult Population',
-    'Child Number': 'Child Population',
-}
+# Define the layout of the app with dropdown and graph, evaluated on every page load
+def serve_layout():
+    data = store.current
+    tensor = data.coverage_tensor
+    return page_layout(geo_levels(data), tensor.payers, tensor.codes, tensor.available_codes)
 
-# Define the layout of the app with dropdown and graph
-app.layout = html.Div([
-    html.H1("Asthma Prevalence Dashboard", style={'fontFamily': 'Montserrat', 'fontSize': '36px'}),
-    dcc.Dropdown(
-        id='demographic-dropdown',
-        options=populations,
-        value='Population',  # Default color scale
-        style={'width': '200px', 'fontFamily': 'Montserrat'}
-    ),
-    dcc.Graph(id='population-choropleth-graph', style={'width': '100vw', 'height': '100vh'}),
-    dcc.Checklist(
-        id='checkboxes',
-        options=[
-            {'label': 'Medicare', 'value': '99454 Coverage: Medicare'},
-            {'label': 'Medicaid', 'value': '99454 Coverage: Medicaid'},
-            {'label': 'Top Private Insurance', 'value': '99454 Coverage: Top Private Insurance'},
-            {'label': 'Second Private Insurance', 'value': '99454 Coverage: Second Private Insurance'},
-        ],
-        value=['99454 Coverage: Medicare',
-               '99454 Coverage: Medicaid',
-               '99454 Coverage: Top Private Insurance',
-               '99454 Coverage: Second Private Insurance'
-        ],
-        style={'width': '150px', 'fontFamily': 'Montserrat'},
-        inline=True,
-    ),
-    dcc.Graph(
-        id='choropleth-map', style={'width': '100vw', 'height': '100vh'}
-    )
-])
-
-
-# Callback to update the graph when the dropdown value changes
-@app.callback(
-    Output('population-choropleth-graph', 'figure'),
-    [Input('demographic-dropdown', 'value')]
-)
-def update_graph(demographic):
-    # Generate the figure with the selected color scale
-    updated_fig = generate_fig(demographic)
-    return updated_fig
-
-
-# Callback to update choropleth map based on checkbox selection
-@app.callback(
-    Output('choropleth-map', 'figure'),
-    [Input('checkboxes', 'value')]
-)
-def update_choropleth(selected_checkboxes):
-    # Filter the DataFrame based on selected checkboxes
-    filtered_df = coverage_df[coverage_df[selected_checkboxes].sum(axis=1) == len(selected_checkboxes)]
-
-    # Manually set colors for each state
-    colors = ['#4575B4' if state_code in filtered_df['State Code'].values else '#FFFFFF' for state_code in coverage_df['State Code']]
-
-    # Create Plotly Express choropleth map
-    fig = px.choropleth(coverage_df,
+
+# The page for the given geography levels, payers and CPT codes (those in available have data)
+def page_layout(levels, payers, codes, available):
+    from dash import dcc, html
+
+    return html.Div([
+        html.H1("Asthma Prevalence Dashboard", style={'fontFamily': 'Montserrat', 'fontSize': '36px'}),
+        dcc.Dropdown(
+            id='demographic-dropdown',
+            options=populations,
+            value='Population',  # Default color scale
+            style={'width': '200px', 'fontFamily': 'Montserrat'}
+        ),
+        # Geography level of the map; clicking an area drills down to the next level inside it
+        dcc.RadioItems(
+            id='geo-level',
+            options=levels,
+            value='state',
+            inline=True,
+            style={'fontFamily': 'Montserrat'},
+        ),
+        dcc.Store(id='geo-focus', data=None),
+        dcc.Graph(id='population-choropleth-graph', style={'width': '100vw', 'height': '100vh'}),
+        dcc.Checklist(
+            id='checkboxes',
+            options=payers,
+            value=payers,
+            style={'width': '150px', 'fontFamily': 'Montserrat'},
+            inline=True,
+        ),
+        # CPT codes the payers must cover; codes missing from the source data are shown but disabled
+        dcc.Checklist(
+            id='cpt-codes',
+            options=[{'label': code if code in available else f'{code} (no data)', 'value': code,
+                      'disabled': code not in available} for code in codes],
+            value=available[:1],
+            style={'fontFamily': 'Montserrat'},
+            inline=True,
+        ),
+        dcc.RadioItems(
+            id='code-match',
+            options=[{'label': 'All selected codes', 'value': 'all'},
+                     {'label': 'Any selected code', 'value': 'any'}],
+            value='all',
+            style={'fontFamily': 'Montserrat'},
+            inline=True,
+        ),
+        dcc.Graph(
+            id='choropleth-map', style={'width': '100vw', 'height': '100vh'}
+        )
+    ])
+
+
+# Callback to pick the geography level, or drill into the area clicked on
+def drill_down(level, click_data):
+    from dash import ctx, no_update
+
+    # Choosing a level shows all of its areas
+    if ctx.triggered_id != 'population-choropleth-graph' or not click_data:
+        return no_update, None
+
+    data = store.current
+    finer = data.rollups.finer(level)
+    if finer is None or finer not in geo_levels(data):
+        return no_update, no_update
+    return finer, click_data['points'][0]['customdata'][0]
+
+
+# Callback to update the graph when the dropdown value or the geography changes
+def update_graph(demographic, focus, level):
+    from dash import ctx
+
+    # A cleared dropdown sends None; show the total population, the dropdown's default
+    demographic = demographic or 'Population'
+    # A new demographic on the same areas only swaps the trace data, anything else needs the whole figure
+    if ctx.triggered_id == 'demographic-dropdown':
+        return patch_demographic(demographic, level, focus)
+    return generate_fig(demographic, level, focus)
+
+
+# Replace only the colour values and hover label of the population map
+def patch_demographic(demographic, level='state', focus=None):
+    from dash import Patch
+
+    location_column, _ = geo_columns[level]
+    patched_fig = Patch()
+    with phase('filter'):
+        patched_fig['data'][0]['z'] = area_values(demographic, level, focus)[demographic].to_numpy()
+    patched_fig['data'][0]['hovertemplate'] = (
+        f'<b>%{{hovertext}}</b><br><br>{location_column}=%{{location}}<br>{demographic}=%{{z}}<extra></extra>')
+    return patched_fig
+
+
+# Two-colour scale: uncovered states white, covered states blue
+coverage_colorscale = [[0, '#FFFFFF'], [0.5, '#FFFFFF'], [0.5, '#4575B4'], [1, '#4575B4']]
+
+
+# Title of the payer map for a set of CPT codes, e.g. 'CPT: 99454 and 99457'
+def coverage_title(codes=('99454',), code_match='all'):
+    joined = f' {"and" if code_match == "all" else "or"} '.join(codes) or 'none'
+    return f'Remote Patient Monitoring Coverage, CPT: {joined}'
+
+
+# Generate payer coverage choropleth graph, one trace coloured 0/1 so later updates only touch z
+def generate_coverage_fig(covered, data=None, title=None):
+    data = data or store.current
+    fig = coverage_template.stamp(dict(locations=data.combined_df['State Code'].to_numpy(),
+                                       z=covered.astype(int),
+                                       hovertext=data.combined_df['State'].to_numpy()))
+    if title is not None:
+        fig.update_layout(title_text=title)
+    return fig
+
+
+# Payer coverage chloropleth with plotly express (the template's sample, and the reference for bench_templates.py)
+def px_coverage(covered, data=None):
+    data = data or store.current
+    fig = px.choropleth(data.combined_df,
                         locations='State Code',
                         locationmode="USA-states",
-                        color=colors,
+                        color=covered.astype(int),
                         hover_name='State',
                         scope="usa",
-                        title='Remote Patient Monitoring Coverage, CPT: 99454',
-                        labels={'Sum': 'Selected Columns Sum'},
-                        color_discrete_map={'#4575B4': '#4575B4', '#FFFFFF': '#FFFFFF'},  # Set discrete colors
+                        title=coverage_title(),
+                        color_continuous_scale=coverage_colorscale,
+                        range_color=[0, 1],
                         )
     # Hide the color legend
-    fig.update_traces(showlegend=False)
+    fig.update_coloraxes(showscale=False)
 
     return fig
 
 
+# Styling of the payer map, built once; generate_coverage_fig stamps in the covered states
+coverage_template = FigureTemplate(lambda: px_coverage(store.current.coverage_index.covered_by_all([])))
+
+
+# Replace only the covered/uncovered values and the title of the payer map
+def patch_coverage(covered, title=None):
+    from dash import Patch
+
+    patched_fig = Patch()
+    patched_fig['data'][0]['z'] = covered.astype(int)
+    if title is not None:
+        patched_fig['layout']['title']['text'] = title
+    return patched_fig
+
+
+# Callback to update choropleth map based on the selected payers and CPT codes
+def update_choropleth(selected_payers, codes, code_match='all'):
+    from dash import ctx
+
+    # States where every selected payer covers all (or any) of the selected codes
+    with phase('filter'):
+        data = store.current
+        covered = data.coverage_tensor.query(selected_payers or [], codes or [], 'all', code_match)
+    title = coverage_title(codes or [], code_match)
+
+    if ctx.triggered_id is None:
+        with phase('build'):
+            return generate_coverage_fig(covered, data, title)
+    # The title only changes with the codes
+    return patch_coverage(covered, None if ctx.triggered_id == 'checkboxes' else title)
+
+
+@dashboard.app_factory
+def create_app():
+    """ Build the Dash app with its routes and callbacks
+
+    Imports dash, flask and pyarrow and registers everything, but reads no
+    data: that happens on the first request or in store.warm().
+
+    Returns:
+        app (Dash): A new app; the module's shared one is get_app()
+    """
+    from dash import Input, Output, State
+
+    # Both maps only depend on their inputs and the data snapshot
+    app = dashboard.new_app(deterministic=['population-choropleth-graph.figure', 'choropleth-map.figure'])
+
+    # Dash checks a function layout by calling it, which would load the data; it checks this data-free page instead
+    app.validation_layout = page_layout({'state': 'State'}, [], CPT_CODES, [])
+    app.layout = serve_layout
+    app.callback(
+        [Output('geo-level', 'value'), Output('geo-focus', 'data')],
+        [Input('geo-level', 'value'), Input('population-choropleth-graph', 'clickData')]
+    )(drill_down)
+    app.callback(
+        Output('population-choropleth-graph', 'figure'),
+        [Input('demographic-dropdown', 'value'), Input('geo-focus', 'data')],
+        [State('geo-level', 'value')]
+    )(update_graph)
+    app.callback(
+        Output('choropleth-map', 'figure'),
+        [Input('checkboxes', 'value'), Input('cpt-codes', 'value'), Input('code-match', 'value')]
+    )(update_choropleth)
+
+    return app
+
+
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    dashboard.run()
@@ -0,0 +1,132 @@
+from cleaning import FLAG, INT, SOURCES, column_kind, iter_clean_csv, state_name_to_code, state_name_to_fips
+from coverage_index import PAYER_COLUMNS
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Geography levels of the rollups, finest first, and the key columns of each
+GEO_KEYS = {
+    'zip': ['States', 'County FIPS', 'ZIP'],
+    'county': ['States', 'County FIPS'],
+    'state': ['States'],
+}
+
+# Suffix of the asthma population living where a payer covers RPM (summable, unlike the flag itself)
+COVERED_SUFFIX = ' Covered Population'
+
+# An area counts as covered by a payer when at least this share of its asthma population is
+COVERED_SHARE = 0.5
+
+
+def _partial_sums(chunk, weight='Population'):
+    # Counts summed per ZIP, each payer flag turned into the covered asthma population
+    counts = [column for column in chunk.columns if column_kind(column) == INT]
+    flags = [column for column in chunk.columns if column_kind(column) == FLAG]
+    values = chunk[counts].copy()
+    for flag in flags:
+        values[flag + COVERED_SUFFIX] = chunk[weight].where(chunk[flag], 0)
+    return values.groupby([chunk[key] for key in GEO_KEYS['zip']], sort=False).sum()
+
+
+def aggregate_stream(chunks, weight='Population'):
+    """ Sum a stream of cleaned ZIP-level chunks into one row per ZIP
+
+    Only the running per-ZIP totals are kept between chunks, so memory is
+    bounded by the number of ZIPs (~40k), not by the number of input rows.
+    Percent columns are dropped: rates cannot be summed.
+
+    Args:
+        chunks (iterable): Cleaned frames, e.g. from cleaning.iter_clean_csv
+        weight (str): Count column used to weight the payer coverage flags
+    Returns:
+        zip_df (df): Summed counts and covered populations indexed by GEO_KEYS['zip']
+    """
+    total = None
+    for chunk in chunks:
+        partial = _partial_sums(chunk, weight)
+        total = partial if total is None else total.add(partial, fill_value=0)
+    # add() upcasts ZIPs missing from one side to float
+    return total.astype('int64')
+
+
+def rollup(zip_df, level, weight='Population'):
+    """ Roll the per-ZIP sums up to a coarser level and derive the payer flags
+
+    Returns:
+        df (df): One row per area with key columns, counts, covered populations
+            and a boolean flag per payer (covered for at least COVERED_SHARE of the population)
+    """
+    df = zip_df.groupby(level=GEO_KEYS[level], sort=True).sum().reset_index()
+    for column in [c for c in df.columns if c.endswith(COVERED_SUFFIX)]:
+        df[column[:-len(COVERED_SUFFIX)]] = df[column] >= COVERED_SHARE * df[weight]
+    return df
+
+
+def ingest_geo(path=None, chunksize=200_000):
+    """ Stream a county/ZIP-level CSV and build the zip, county and state rollups
+
+    Args:
+        path (str): Source CSV, SOURCES['geo'] by default
+        chunksize (int): Rows read and cleaned at a time
+    Returns:
+        rollups (dict): Frame per level in GEO_KEYS; the state frame has the
+            State/State Code/Population/payer columns the dashboards' choropleths use
+    """
+    source = dict(SOURCES['geo'], path=path or SOURCES['geo']['path'])
+    zip_df = aggregate_stream(iter_clean_csv(chunksize=chunksize, **source))
+
+    rollups = {level: rollup(zip_df, level) for level in GEO_KEYS}
+    state_df = rollups['state'].rename(columns={'States': 'State'})
+    state_df.insert(1, 'State Code', state_df['State'].map(state_name_to_code).astype('category'))
+    rollups['state'] = state_df
+    return rollups
+
+
+def write_synthetic(path, n_rows, chunk_rows=1_000_000, seed=0):
+    """ Write a synthetic ZIP-level source in the raw spreadsheet format
+
+    Rows are formatted like the real sources ("3,313,415", "9.3%", "Yes"),
+    so reading them exercises the same cleaning rules. Payer flags follow the
+    real state coverage from coverage.csv with 2% of rows flipped.
+
+    Args:
+        path (str): Output CSV
+        n_rows (int): Number of data rows
+        chunk_rows (int): Rows generated and written at a time
+        seed (int): Random seed
+    """
+    rng = np.random.default_rng(seed)
+    state_coverage = pd.read_csv('coverage_df_clean.csv').set_index('State')[PAYER_COLUMNS].astype(bool)
+    states = np.array(sorted(state_name_to_fips))
+
+    # ~40k ZIPs spread over ~3k counties, as in the US
+    n_zips = 40_000
+    zip_state = rng.integers(0, len(states), n_zips)
+    zip_county = np.array([f'{state_name_to_fips[states[s]]}{c:03d}' for s, c
+                           in zip(zip_state, 2 * rng.integers(0, 60, n_zips) + 1)])
+    zip_codes = np.array([f'{z:05d}' for z in rng.choice(100_000, n_zips, replace=False)])
+
+    columns = (['States', 'County FIPS', 'ZIP', 'Population', 'Adult Number', 'Adult Percent',
+                'Child Number', 'Child Percent'] + PAYER_COLUMNS)
+    pd.DataFrame(columns=columns).to_csv(path, index=False)
+
+    for start in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - start)
+        zips = rng.integers(0, n_zips, n)
+        adults = rng.integers(0, 5_000, n)
+        children = rng.integers(0, 1_500, n)
+        chunk = pd.DataFrame({
+            'States': states[zip_state[zips]],
+            'County FIPS': zip_county[zips],
+            'ZIP': zip_codes[zips],
+            'Population': pd.Series(adults + children).map('{:,}'.format),
+            'Adult Number': pd.Series(adults).map('{:,}'.format),
+            'Adult Percent': pd.Series(rng.uniform(5, 12, n).round(1)).astype(str) + '%',
+            'Child Number': pd.Series(children).map('{:,}'.format),
+            'Child Percent': pd.Series(rng.uniform(3, 9, n).round(1)).astype(str) + '%',
+        })
+        covered = state_coverage.loc[chunk['States']].to_numpy() ^ (rng.random((n, len(PAYER_COLUMNS))) < 0.02)
+        for i, column in enumerate(PAYER_COLUMNS):
+            chunk[column] = np.where(covered[:, i], 'Yes', 'No')
+        chunk.to_csv(path, mode='a', header=False, index=False)
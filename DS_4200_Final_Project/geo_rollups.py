@@ -0,0 +1,136 @@
+from cleaning import INT, column_kind, state_name_to_code
+from geo_ingest import COVERED_SUFFIX
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+# US Census regions, the coarsest rollup level
+STATE_REGIONS = {
+    'Northeast': ['Connecticut', 'Maine', 'Massachusetts', 'New Hampshire', 'New Jersey', 'New York',
+                  'Pennsylvania', 'Rhode Island', 'Vermont'],
+    'Midwest': ['Illinois', 'Indiana', 'Iowa', 'Kansas', 'Michigan', 'Minnesota', 'Missouri', 'Nebraska',
+                'North Dakota', 'Ohio', 'South Dakota', 'Wisconsin'],
+    'South': ['Alabama', 'Arkansas', 'Delaware', 'Florida', 'Georgia', 'Kentucky', 'Louisiana', 'Maryland',
+              'Mississippi', 'North Carolina', 'Oklahoma', 'South Carolina', 'Tennessee', 'Texas', 'Virginia',
+              'West Virginia'],
+    'West': ['Alaska', 'Arizona', 'California', 'Colorado', 'Hawaii', 'Idaho', 'Montana', 'Nevada',
+             'New Mexico', 'Oregon', 'Utah', 'Washington', 'Wyoming'],
+}
+state_name_to_region = {state: region for region, states in STATE_REGIONS.items() for state in states}
+
+
+def summable_measures(frame, payers, weight='Population'):
+    """ Add each payer's covered population where the frame only has its flag, and list the summable columns
+
+    County rollups from geo_ingest.py already carry '<payer> Covered Population';
+    for state rows it is the state's population when the payer covers it, else 0.
+
+    Args:
+        frame (df): One row per finest area
+        payers (list): Boolean payer coverage columns
+        weight (str): Count column a covering payer reaches
+    Returns:
+        frame (df): The frame with a covered population column per payer
+        measures (list): Its count columns (populations, payer counts, covered populations)
+    """
+    covered = {payer + COVERED_SUFFIX: frame[weight].where(frame[payer], 0)
+               for payer in payers if payer in frame and payer + COVERED_SUFFIX not in frame}
+    if covered:
+        frame = frame.assign(**covered)
+    return frame, [column for column in frame.columns if column_kind(column) == INT]
+
+
+class GeoLevel:
+    """ Aggregates of one geography level as arrays, row i describing area codes[i]
+
+    Attributes:
+        codes (array): Area identifiers (region name, state name or county FIPS)
+        rows (dict): Row of each code
+        values (array): (n_areas, n_measures) sums
+        parent (array): Row of each area in the next coarser level, None at the top
+        child_rows, child_offsets (array): Rows of the next finer level grouped by
+            parent; area i's children are child_rows[child_offsets[i]:child_offsets[i + 1]]
+    """
+
+    def __init__(self, codes, values):
+        self.codes = np.asarray(codes)
+        self.rows = {code: i for i, code in enumerate(self.codes)}
+        self.values = values
+        self.parent = None
+        self.child_rows = None
+        self.child_offsets = None
+
+
+class GeoRollups:
+    """ Population and coverage sums precomputed at every geography level
+
+    Built once per data snapshot; after that a drill-down is a slice of the
+    child index and a roll-up an array lookup, no groupby per request.
+    """
+
+    def __init__(self, frame, measures):
+        """
+        Args:
+            frame (df): One row per finest area, with a 'State' name column and,
+                for county-level data, a 'County FIPS' column
+            measures (list): Summable columns to roll up (counts, covered populations)
+        """
+        self.measures = list(measures)
+        self.columns = {measure: i for i, measure in enumerate(self.measures)}
+        self.levels = {}
+
+        values = frame[self.measures].to_numpy(dtype=np.int64)
+        states = frame['State'].to_numpy(dtype=str)
+        if 'County FIPS' in frame:
+            self.levels['county'] = GeoLevel(frame['County FIPS'].to_numpy(dtype=str), values)
+            self._add_parent_level('state', 'county', states)
+        else:
+            self.levels['state'] = GeoLevel(states, values)
+        regions = [state_name_to_region[state] for state in self.levels['state'].codes]
+        self._add_parent_level('region', 'state', regions)
+
+        # Level names ordered finest first
+        self.order = list(self.levels)
+
+    def _add_parent_level(self, name, child_name, child_keys):
+        # Sum the child level's rows per key once, and index the children of every new area
+        child = self.levels[child_name]
+        codes, parent = np.unique(np.asarray(child_keys), return_inverse=True)
+        level = GeoLevel(codes, np.zeros((len(codes), len(self.measures)), dtype=np.int64))
+        np.add.at(level.values, parent, child.values)
+        child.parent = parent
+        level.child_rows = np.argsort(parent, kind='stable')
+        level.child_offsets = np.concatenate([[0], np.cumsum(np.bincount(parent, minlength=len(codes)))])
+        self.levels[name] = level
+
+    def finer(self, level):
+        """ Name of the next finer level, None for the finest """
+        i = self.order.index(level)
+        return self.order[i - 1] if i > 0 else None
+
+    def coarser(self, level):
+        """ Name of the next coarser level, None for the coarsest """
+        i = self.order.index(level)
+        return self.order[i + 1] if i + 1 < len(self.order) else None
+
+    def column(self, level, measure, rows=slice(None)):
+        """ Values of one measure at a level, for all areas or the given rows """
+        return self.levels[level].values[rows, self.columns[measure]]
+
+    def children(self, level, code):
+        """ Rows of the next finer level inside an area (drill-down) """
+        parent = self.levels[level]
+        i = parent.rows[code]
+        return parent.child_rows[parent.child_offsets[i]:parent.child_offsets[i + 1]]
+
+    def parent_code(self, level, code):
+        """ Code of the enclosing area one level up (roll-up) """
+        child = self.levels[level]
+        return self.levels[self.coarser(level)].codes[child.parent[child.rows[code]]]
+
+    def locations(self, level, rows=slice(None)):
+        """ Choropleth locations of a level's areas: state codes, or county FIPS for geojson maps """
+        codes = self.levels[level].codes[rows]
+        if level == 'state':
+            return np.vectorize(state_name_to_code.get)(codes)
+        return codes
@@ -0,0 +1,16 @@
+import multiprocessing
+import os
+
+# gunicorn settings for wsgi:server, overridable through environment variables
+bind = os.environ.get('ASTHMA_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('ASTHMA_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('ASTHMA_THREADS', 1))
+
+# Import wsgi.py (data loading and figure warm-up) once before forking the workers
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Threads are not inherited from the preloading master, so every worker starts its own data watcher
+    import wsgi
+    wsgi.start_refresh()
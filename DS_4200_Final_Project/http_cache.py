@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import flask
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Content codings the server can produce, preferred first
+ENCODINGS = (['br'] if brotli is not None else []) + ['gzip']
+
+# Bodies smaller than this are sent as they are; compressing them saves less than the header costs
+MIN_COMPRESS_SIZE = 512
+
+
+def _qvalues(accept_encoding):
+    # q-value of each coding listed in an Accept-Encoding header: 1 when not given, 0 when malformed
+    qvalues = {}
+    for item in (accept_encoding or '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    return qvalues
+
+
+def accepts(accept_encoding, coding):
+    """ Whether an Accept-Encoding header allows a coding, by name or through '*' """
+    qvalues = _qvalues(accept_encoding)
+    return qvalues.get(coding, qvalues.get('*', 0.0)) > 0
+
+
+def choose_encoding(accept_encoding, size=MIN_COMPRESS_SIZE):
+    """ Coding in ENCODINGS with the highest q-value the client gives, None to send the body uncompressed
+
+    Ties go to the first in ENCODINGS. When the client accepts none of them the body is sent as it is
+    (identity), even if the header refuses identity too; that is what a 406 would otherwise cost.
+    """
+    if size < MIN_COMPRESS_SIZE:
+        return None
+    qvalues = _qvalues(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = qvalues.get(coding, qvalues.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding):
+    """ Encode a body with 'br', 'gzip' or None (unchanged) """
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and so its ETag, identical for identical input
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+def etag_of(*parts):
+    """ Strong ETag (quoted) from the parts that determine a response """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\0')
+    return '"' + digest.hexdigest()[:32] + '"'
+
+
+def if_none_match(header, etag):
+    """ Whether an If-None-Match header matches etag (weak comparison, as for GET) """
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
+def configure_response_caching(app, deterministic=(), version=None, max_entries=512):
+    """ Compress Dash's layout and callback responses and cache deterministic ones
+
+    _dash-layout and _dash-update-component responses are compressed with the
+    best coding the client accepts. The layout gets an ETag of its body and
+    `no-cache`, so the browser revalidates it and an unchanged layout comes
+    back as a bodiless 304. Browsers never cache POSTs, so callbacks whose
+    output only depends on their inputs (`deterministic`) are cached on the
+    server instead: a repeated selection is answered with the compressed
+    bytes of the first response, before the callback runs.
+
+    Args:
+        app (Dash): Dashboard app
+        deterministic (list): Callback output strings as sent by the renderer,
+            e.g. 'choropleth-map.figure'
+        version (callable): Token of the data the callbacks read (e.g. the
+            snapshot hash), part of every cache key so a refresh invalidates it
+        max_entries (int): Compressed callback responses kept in memory
+    """
+    prefix = app.config.routes_pathname_prefix
+    layout_path, update_path = prefix + '_dash-layout', prefix + '_dash-update-component'
+    deterministic = set(deterministic)
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    def cache_key():
+        # None for requests whose responses must not be reused
+        if flask.request.path != update_path or not deterministic:
+            return None
+        body = flask.request.get_json(silent=True) or {}
+        if body.get('output') not in deterministic:
+            return None
+        encoding = choose_encoding(flask.request.headers.get('Accept-Encoding'))
+        return etag_of(version() if version else '', json.dumps(body, sort_keys=True), encoding)
+
+    @app.server.before_request
+    def serve_cached_callback():
+        key = cache_key()
+        if key is None:
+            return None
+        with lock:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+        if cached is None:
+            flask.g.response_cache_key = key
+            return None
+        content, headers = cached
+        return flask.Response(content, mimetype='application/json', headers=dict(headers, **{'X-Cache': 'hit'}))
+
+    @app.server.after_request
+    def compress_dash_response(response):
+        path = flask.request.path
+        if path not in (layout_path, update_path) or response.status_code != 200 or response.direct_passthrough \
+                or 'Content-Encoding' in response.headers or 'X-Cache' in response.headers:
+            return response
+
+        body = response.get_data()
+        encoding = choose_encoding(flask.request.headers.get('Accept-Encoding'), len(body))
+        # Added to any Vary the callback or another hook already set
+        response.vary.add('Accept-Encoding')
+        if path == layout_path:
+            # Each coding is its own representation with its own ETag
+            etag = etag_of(body, encoding)
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+            if if_none_match(flask.request.headers.get('If-None-Match'), etag):
+                response.status_code = 304
+                response.set_data(b'')
+                return response
+
+        if encoding:
+            response.set_data(compress(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+
+        key = flask.g.pop('response_cache_key', None)
+        if key is not None:
+            headers = {name: value for name, value in response.headers.items()
+                       if name in ('Content-Encoding', 'Vary')}
+            with lock:
+                cache[key] = (response.get_data(), headers)
+                if len(cache) > max_entries:
+                    cache.popitem(last=False)
+            response.headers['X-Cache'] = 'miss'
+        return response
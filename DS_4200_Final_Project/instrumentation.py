@@ -0,0 +1,268 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import config
+
+# Upper bounds (seconds) of the callback latency histogram, Prometheus' defaults
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Per-thread state of the callback being served: exclusive seconds per phase and the open phases
+_local = threading.local()
+
+
+class phase:
+    """ Time a block as one phase of the callback being served, e.g. `with phase('filter'):`
+
+    Phases used by the dashboards: 'load' (reading the data snapshot),
+    'filter' (selecting or computing the rows to draw) and 'build' (figure or
+    component construction). Time is exclusive: a phase nested in another
+    is only counted for the inner one. Outside a callback this is a no-op.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.phases = getattr(_local, 'phases', None)
+        if self.phases is not None:
+            self.nested = 0.0
+            _local.stack.append(self)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.phases is not None:
+            elapsed = time.perf_counter() - self.start
+            _local.stack.pop()
+            self.phases[self.name] += elapsed - self.nested
+            if _local.stack:
+                _local.stack[-1].nested += elapsed
+
+
+class CallbackMetrics:
+    """ Request counts, latency histogram, per-phase seconds and response bytes of every callback """
+
+    def __init__(self):
+        self.requests = Counter()
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.seconds = Counter()
+        self.phase_seconds = Counter()
+        self.response_bytes = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, callback, outcome, seconds, phases, response_bytes=0):
+        """ Add one served callback request
+
+        Args:
+            callback (str): Callback function name
+            outcome (str): 'ok', 'prevented' (PreventUpdate) or 'error'
+            seconds (float): Total time, from the request reaching the app to the serialized response
+            phases (dict): Exclusive seconds per phase, adding up to seconds
+            response_bytes (int): Size of the serialized (uncompressed) response
+        """
+        with self._lock:
+            self.requests[callback, outcome] += 1
+            self.seconds[callback] += seconds
+            counts = self.buckets[callback]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+            for name, phase_seconds in phases.items():
+                self.phase_seconds[callback, name] += phase_seconds
+            self.response_bytes[callback] += response_bytes
+
+    def render(self):
+        """ All metrics in the Prometheus text exposition format """
+        with self._lock:
+            counts = Counter()
+            for (callback, _), n in self.requests.items():
+                counts[callback] += n
+            lines = ['# HELP dash_callback_requests_total Callback requests by outcome',
+                     '# TYPE dash_callback_requests_total counter']
+            lines += [f'dash_callback_requests_total{{callback="{callback}",outcome="{outcome}"}} {n}'
+                      for (callback, outcome), n in sorted(self.requests.items())]
+
+            lines += ['# HELP dash_callback_duration_seconds Time from request to serialized response',
+                      '# TYPE dash_callback_duration_seconds histogram']
+            for callback in sorted(counts):
+                lines += [f'dash_callback_duration_seconds_bucket{{callback="{callback}",le="{bound}"}} {n}'
+                          for bound, n in zip(BUCKETS, self.buckets[callback])]
+                lines += [f'dash_callback_duration_seconds_bucket{{callback="{callback}",le="+Inf"}} {counts[callback]}',
+                          f'dash_callback_duration_seconds_sum{{callback="{callback}"}} {self.seconds[callback]:.6f}',
+                          f'dash_callback_duration_seconds_count{{callback="{callback}"}} {counts[callback]}']
+
+            lines += ['# HELP dash_callback_phase_seconds_total Exclusive time per phase: load, filter, build, '
+                      'other (rest of the callback) and serialize (output validation and JSON encoding)',
+                      '# TYPE dash_callback_phase_seconds_total counter']
+            lines += [f'dash_callback_phase_seconds_total{{callback="{callback}",phase="{name}"}} {seconds:.6f}'
+                      for (callback, name), seconds in sorted(self.phase_seconds.items())]
+
+            lines += ['# HELP dash_callback_response_bytes_total Serialized callback responses, before compression',
+                      '# TYPE dash_callback_response_bytes_total counter']
+            lines += [f'dash_callback_response_bytes_total{{callback="{callback}"}} {n}'
+                      for callback, n in sorted(self.response_bytes.items())]
+        return '\n'.join(lines) + '\n'
+
+
+class StackSampler:
+    """ Sampling profiler of the threads serving a callback
+
+    A daemon thread reads the stack of every thread inside a callback each
+    interval and counts it in the folded format of flamegraph.pl and
+    speedscope (`callback;outer frame;...;inner frame count`). The thread is
+    started on the first sampled callback of each process, so it also runs
+    in workers forked from a preloading master.
+    """
+
+    def __init__(self, interval):
+        """
+        Args:
+            interval (float): Seconds between samples
+        """
+        self.interval = interval
+        self.counts = Counter()
+        self.active = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='stack-sampler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread_id, callback in list(self.active.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                if stack:
+                    self.counts[';'.join([callback] + stack[::-1])] += 1
+
+    def folded(self, reset=False):
+        """ Sampled stacks in folded format, one 'stack count' line each """
+        counts = self.counts
+        if reset:
+            self.counts = Counter()
+        return ''.join(f'{stack} {n}\n' for stack, n in counts.most_common())
+
+
+def _output_key(args, kwargs):
+    # The `output` field the renderer sends for a callback registered with these app.callback arguments:
+    # 'id.prop' for a single Output, '..id.prop...id2.prop..' for a list of them
+    from dash import Output
+
+    first = kwargs.get('output', args[0] if args else None)
+    outputs = list(first) if isinstance(first, (list, tuple)) else [arg for arg in args if isinstance(arg, Output)]
+    if len(outputs) == 1 and not isinstance(first, (list, tuple)):
+        return str(outputs[0])
+    return '..' + '...'.join(str(output) for output in outputs) + '..'
+
+
+def instrument_app(app, metrics=None, profile_interval=None):
+    """ Measure every callback served by the app, and serve the results
+
+    Requests to _dash-update-component are timed from Flask's before_request
+    to after_request hooks, so a callback's time includes Dash's validation
+    and serialization of its output, and are labelled with the callback's
+    function name, looked up by the request's `output` field. app.callback
+    is wrapped to learn those names and to time the function itself as the
+    'other' phase; other phases come from `with phase(...)` blocks.
+
+    Call after the hooks that compress responses (see
+    http_cache.configure_response_caching) and before registering callbacks:
+    after_request hooks run last-registered first, so the bytes counted are
+    the uncompressed response, and responses answered from a cache in an
+    earlier before_request hook are not counted. Adds GET /metrics
+    (Prometheus text format) and, with a profile interval, GET /profile
+    (folded stacks, ?reset=1 to clear).
+
+    Args:
+        app (Dash): App without callbacks yet
+        metrics (CallbackMetrics): Where to record, a new one by default
+        profile_interval (float): Milliseconds between profiler samples,
+            config.PROFILE_INTERVAL by default; 0 disables the profiler
+    Returns:
+        metrics (CallbackMetrics): The recorder behind /metrics
+    """
+    import flask
+
+    metrics = metrics or CallbackMetrics()
+    interval = config.PROFILE_INTERVAL if profile_interval is None else profile_interval
+    sampler = StackSampler(interval / 1000) if interval else None
+    update_path = app.config.routes_pathname_prefix + '_dash-update-component'
+    # Callback output key (as sent by the renderer) -> function name
+    names = {}
+    register = app.callback
+
+    @functools.wraps(register)
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+        key = _output_key(args, kwargs)
+
+        def wrap(func):
+            @functools.wraps(func)
+            def timed(*func_args, **func_kwargs):
+                # Callback time outside its marked phases
+                with phase('other'):
+                    return func(*func_args, **func_kwargs)
+
+            names[key] = func.__name__
+            return decorator(timed)
+        return wrap
+
+    app.callback = callback
+
+    @app.server.before_request
+    def start_callback():
+        if flask.request.path != update_path:
+            return
+        output = (flask.request.get_json(silent=True) or {}).get('output', '')
+        flask.g.callback_timer = names.get(output, output), time.perf_counter()
+        _local.phases, _local.stack = defaultdict(float), []
+        if sampler is not None:
+            sampler.ensure_running()
+            sampler.active[threading.get_ident()] = flask.g.callback_timer[0]
+
+    @app.server.after_request
+    def record_callback(response):
+        timer = flask.g.pop('callback_timer', None)
+        if timer is None:
+            return response
+        name, start = timer
+        seconds = time.perf_counter() - start
+        phases = _local.phases
+        phases['serialize'] = max(0.0, seconds - sum(phases.values()))
+        outcome = {200: 'ok', 204: 'prevented'}.get(response.status_code, 'error')
+        size = 0 if response.direct_passthrough else len(response.get_data())
+        metrics.record(name, outcome, seconds, phases, size)
+        return response
+
+    @app.server.teardown_request
+    def end_callback(exc=None):
+        # Also reached when a callback error skipped record_callback
+        _local.phases = None
+        if sampler is not None:
+            sampler.active.pop(threading.get_ident(), None)
+
+    @app.server.route('/metrics')
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    if sampler is not None:
+        @app.server.route('/profile')
+        def serve_profile():
+            return flask.Response(sampler.folded(reset=flask.request.args.get('reset') == '1'),
+                                  mimetype='text/plain')
+
+    return metrics
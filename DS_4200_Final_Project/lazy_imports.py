@@ -0,0 +1,26 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """ Import a module whose code only runs on first attribute access
+
+    Used for the heavy third-party packages (pandas, numpy, plotly.express)
+    so importing a dashboard or a helper module stays cheap and the cost is
+    paid by the first callback or data load that actually needs them. Later
+    `import <name>` statements anywhere get the same module object.
+
+    Args:
+        name (str): Module name, e.g. 'pandas' or 'plotly.express'
+    Returns:
+        module: The module, loaded already if it was imported before
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,121 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from figure_cache import mask_columns
+
+TAB_OUTPUTS = ['tab-1-content.children', 'tab-2-content.children', 'tab-3-content.children',
+               'tab-1-content.style', 'tab-2-content.style', 'tab-3-content.style', 'rendered-tabs.data']
+
+
+def callback_body(output, inputs, state=()):
+    """ Request body of a Dash callback triggered by its inputs """
+    outputs = output if isinstance(output, list) else [output]
+    specs = [{'id': o.rsplit('.', 1)[0], 'property': o.rsplit('.', 1)[1]} for o in outputs]
+    return {
+        'output': '..' + '...'.join(outputs) + '..' if isinstance(output, list) else output,
+        'outputs': specs if isinstance(output, list) else specs[0],
+        'inputs': [{'id': i.rsplit('.', 1)[0], 'property': i.rsplit('.', 1)[1], 'value': v} for i, v in inputs],
+        'state': [{'id': s.rsplit('.', 1)[0], 'property': s.rsplit('.', 1)[1], 'value': v} for s, v in state],
+        'changedPropIds': [i for i, _ in inputs],
+    }
+
+
+# Randomized request bodies for each 12.02_dash.py callback. A triggered checklist change is answered
+# with a Patch; the initial render (nothing in changedPropIds) with the whole figure
+CALLBACKS = {
+    'update_choropleth': lambda: callback_body(
+        'choropleth-map.figure', [('checkboxes.value', mask_columns(random.randrange(16)))]),
+    'choropleth (load)': lambda: dict(callback_body(
+        'choropleth-map.figure', [('checkboxes.value', mask_columns(random.randrange(16)))]), changedPropIds=[]),
+    'update_chart': lambda: callback_body(
+        'stacked-bar-chart.figure', [('top-n-dropdown.value', random.randrange(5, 55, 5))]),
+    'render_content': lambda: callback_body(
+        TAB_OUTPUTS, [('tabs.value', random.choice(['tab-1', 'tab-2', 'tab-3']))],
+        [('rendered-tabs.data', random.choice([[], ['tab-1'], ['tab-1', 'tab-2']]))]),
+}
+
+
+def start_server(workers, port, response_cache=True):
+    """ Serve wsgi.py with gunicorn; without response_cache, every callback request runs the callback
+
+    The server-side response cache (http_cache.configure_response_caching) is
+    tied to ASTHMA_COMPRESS_RESPONSES, so turning it off also sends callback
+    responses uncompressed.
+    """
+    env = dict(os.environ, ASTHMA_WORKERS=str(workers), ASTHMA_BIND=f'127.0.0.1:{port}',
+               ASTHMA_FIGURE_CACHE='filesystem', ASTHMA_COMPRESS_RESPONSES='1' if response_cache else '0')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:server'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # Wait until the workers answer
+    for _ in range(300):
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/_dash-layout')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('gunicorn did not start')
+
+
+def run_load(port, make_body, requests, concurrency):
+    """ Send requests from concurrent keep-alive clients, return (requests/sec, p95 latency ms) """
+    latencies = []
+    lock = threading.Lock()
+    per_client = requests // concurrency
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        timings = []
+        for _ in range(per_client):
+            body = json.dumps(make_body())
+            start = time.perf_counter()
+            connection.request('POST', '/_dash-update-component', body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            timings.append(time.perf_counter() - start)
+            assert response.status in (200, 204), response.status
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the gunicorn-served dashboard callbacks')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=400, help='requests per callback')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8071)
+    parser.add_argument('--responses', nargs='+', choices=['uncached', 'cached'], default=['uncached', 'cached'],
+                        help='run without and/or with the server-side response cache')
+    args = parser.parse_args()
+
+    print(f'{"workers":>7} {"responses":<9} {"callback":<18} {"req/s":>8} {"p95 (ms)":>9}')
+    for workers in args.workers:
+        for responses in args.responses:
+            server = start_server(workers, args.port, response_cache=responses == 'cached')
+            try:
+                for name, make_body in CALLBACKS.items():
+                    rate, p95 = run_load(args.port, make_body, args.requests, args.concurrency)
+                    print(f'{workers:>7} {responses:<9} {name:<18} {rate:>8.1f} {p95:>9.1f}')
+            finally:
+                server.terminate()
+                server.wait()
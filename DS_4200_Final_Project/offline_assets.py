@@ -0,0 +1,120 @@
+import functools
+import hashlib
+import os
+import re
+
+import flask
+
+import config
+from http_cache import accepts
+
+# Only sent for a URL carrying the current content hash of the file (?v=<hash>, see configure_assets)
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Any other asset URL is revalidated with its ETag/Last-Modified on every use
+STALE_ASSET_CACHE_CONTROL = 'no-cache'
+
+
+def inline_critical_css(app, path='critical.css'):
+    """ Inline the above-the-fold CSS into the page head so first paint does not wait on stylesheets """
+    with open(path) as f:
+        css = f.read().strip()
+    app.index_string = app.index_string.replace('{%css%}', '<style>' + css + '</style>\n        {%css%}')
+
+
+@functools.lru_cache(maxsize=256)
+def _content_hash(path, mtime, size):
+    # Keyed by mtime and size so an edited file is hashed again
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def asset_hash(path):
+    """ Short sha256 of an asset's current contents, None if it does not exist """
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return _content_hash(path, info.st_mtime_ns, info.st_size)
+
+
+def fresh_gzip(path):
+    """ Path of the .gz copy written by bundle_assets.py, None if it is missing or older than the file """
+    try:
+        if os.stat(path + '.gz').st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return path + '.gz'
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def hashed_assets(app):
+    """ URLs of the stylesheets and scripts in assets/, with their content hash (?v=), in Dash's order
+
+    Returns:
+        stylesheets, scripts (list, list): Asset URLs, e.g. '/assets/fonts.css?v=ddf34267b6b76fc3'
+    """
+    ignore = re.compile(app.config.assets_ignore) if app.config.assets_ignore else None
+    stylesheets, scripts = [], []
+    for root, _, files in sorted(os.walk(app.config.assets_folder)):
+        for name in sorted(files):
+            if ignore is not None and ignore.search(name):
+                continue
+            path = os.path.join(root, name)
+            url = app.get_asset_url(os.path.relpath(path, app.config.assets_folder).replace(os.sep, '/'))
+            if name.endswith('.css'):
+                stylesheets.append(f'{url}?v={asset_hash(path)}')
+            elif name.endswith('.js'):
+                scripts.append(f'{url}?v={asset_hash(path)}')
+    return stylesheets, scripts
+
+
+def configure_assets(app):
+    """ Serve assets/ under content-hashed URLs with long-lived cache headers and precompressed .gz copies
+
+    The pinned Bootstrap 4.3.1 stylesheet and the Montserrat font face live
+    in assets/, so pages load without any CDN. The font face uses an
+    installed Montserrat, or the file added by `bundle_assets.py --font`,
+    and falls back to the system sans-serif.
+
+    Dash's own asset links carry the file's mtime (?m=). Here they are turned
+    off (include_assets_files) and the files are linked as external
+    stylesheets and scripts with a hash of their contents (?v=) instead.
+    Only a URL whose hash matches the file is cached as immutable. Call
+    right after creating the app, before its first request.
+    """
+    assets_folder = app.config.assets_folder
+    assets_prefix = app.get_asset_url('')
+
+    stylesheets, scripts = hashed_assets(app)
+    app.config.include_assets_files = False
+    app.config.external_stylesheets = list(app.config.external_stylesheets) + stylesheets
+    app.config.external_scripts = list(app.config.external_scripts) + scripts
+
+    def local_path(url):
+        return os.path.join(assets_folder, url[len(assets_prefix):].split('?', 1)[0])
+
+    @app.server.after_request
+    def cache_assets(response):
+        if not flask.request.path.startswith(assets_prefix) or response.status_code != 200:
+            return response
+        path = local_path(flask.request.path)
+
+        # Swap in the copy compressed by bundle_assets.py when the browser accepts gzip and it is up to date
+        gz_path = fresh_gzip(path)
+        if gz_path is not None and accepts(flask.request.headers.get('Accept-Encoding'), 'gzip'):
+            with open(gz_path, 'rb') as f:
+                compressed = flask.Response(f.read(), mimetype=response.mimetype)
+            compressed.headers['Content-Encoding'] = 'gzip'
+            if response.last_modified:
+                compressed.last_modified = response.last_modified
+            response = compressed
+        if gz_path is not None:
+            response.vary.add('Accept-Encoding')
+
+        current = flask.request.args.get('v') == asset_hash(path)
+        response.headers['Cache-Control'] = ASSET_CACHE_CONTROL if current else STALE_ASSET_CACHE_CONTROL
+        return response
+
+    if config.INLINE_CRITICAL_CSS:
+        inline_critical_css(app)
@@ -1,74 +1,26 @@
-import pandas as pd
+from cleaning import load_source, state_name_to_code
+from coverage_index import PAYER_COLUMNS
 
-# Assuming 'asthma_df' is your pandas DataFrame
-asthma_df = pd.read_csv('population_data_1.csv')
 
+def write_clean_population(path='clean_population_data.csv'):
+    """ Clean the asthma population table (header offsets and number formats are declared in cleaning.SOURCES) """
+    asthma_df = load_source('population')
+    asthma_df['State Code'] = asthma_df['States'].map(state_name_to_code)
+    asthma_df.to_csv(path)
+    return asthma_df
 
-asthma_df = asthma_df.drop(asthma_df.index[0])
 
-new_columns = asthma_df.iloc[0]  # Get the top row
-asthma_df = asthma_df[1:]  # Remove the top row from the DataFrame
-asthma_df.set_axis(new_columns, axis=1, inplace=True)
+def write_clean_coverage(path='coverage_df_clean.csv'):
+    """ Encode the 99454 coverage columns as 0/1 per state """
+    coverage_df = load_source('coverage')
+    coverage_df.insert(1, 'State Code', coverage_df['State'].map(state_name_to_code))
+    coverage_df = coverage_df[['State', 'State Code'] + PAYER_COLUMNS]
+    coverage_df[PAYER_COLUMNS] = coverage_df[PAYER_COLUMNS].astype(int)
+    coverage_df['Sum'] = coverage_df[PAYER_COLUMNS].sum(axis=1)
+    coverage_df.to_csv(path, index=False)
+    return coverage_df
 
-print(asthma_df)
-state_name_to_code = {
-    'Alabama': 'AL',
-    'Alaska': 'AK',
-    'Arizona': 'AZ',
-    'Arkansas': 'AR',
-    'California': 'CA',
-    'Colorado': 'CO',
-    'Connecticut': 'CT',
-    'Delaware': 'DE',
-    'Florida': 'FL',
-    'Georgia': 'GA',
-    'Hawaii': 'HI',
-    'Idaho': 'ID',
-    'Illinois': 'IL',
-    'Indiana': 'IN',
-    'Iowa': 'IA',
-    'Kansas': 'KS',
-    'Kentucky': 'KY',
-    'Louisiana': 'LA',
-    'Maine': 'ME',
-    'Maryland': 'MD',
-    'Massachusetts': 'MA',
-    'Michigan': 'MI',
-    'Minnesota': 'MN',
-    'Mississippi': 'MS',
-    'Missouri': 'MO',
-    'Montana': 'MT',
-    'Nebraska': 'NE',
-    'Nevada': 'NV',
-    'New Hampshire': 'NH',
-    'New Jersey': 'NJ',
-    'New Mexico': 'NM',
-    'New York': 'NY',
-    'North Carolina': 'NC',
-    'North Dakota': 'ND',
-    'Ohio': 'OH',
-    'Oklahoma': 'OK',
-    'Oregon': 'OR',
-    'Pennsylvania': 'PA',
-    'Rhode Island': 'RI',
-    'South Carolina': 'SC',
-    'South Dakota': 'SD',
-    'Tennessee': 'TN',
-    'Texas': 'TX',
-    'Utah': 'UT',
-    'Vermont': 'VT',
-    'Virginia': 'VA',
-    'Washington': 'WA',
-    'West Virginia': 'WV',
-    'Wisconsin': 'WI',
-    'Wyoming': 'WY'
-}
-asthma_df['State Code'] = asthma_df['States'].map(state_name_to_code)
 
-asthma_df = asthma_df.replace(',', '', regex=True)
-
-asthma_df['Population'] = asthma_df['Population'].astype(int)
-asthma_df['Adult Number'] = asthma_df['Adult Number'].astype(int)
-asthma_df['Child Number'] = asthma_df['Child Number'].astype(int)
-
-asthma_df.to_csv('clean_population_data.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    print(write_clean_population())
+    write_clean_coverage()
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from build_artifact import ARTIFACT_PATH, build_artifact
+from cleaning import SOURCES
+from instrumentation import phase
+from lazy_imports import lazy_import
+from population_data_clean import write_clean_coverage, write_clean_population
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, refreshes are still atomic per file
+    fcntl = None
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Source hashes each derived table was last built from
+STATE_PATH = '.refresh_state.json'
+LOCK_PATH = '.refresh.lock'
+
+# Derived table -> (cleaning.SOURCES it is built from, function writing it to a path)
+TARGETS = {
+    'clean_population_data.csv': (['population'], write_clean_population),
+    'coverage_df_clean.csv': (['coverage'], write_clean_coverage),
+    ARTIFACT_PATH: (['population', 'coverage'], build_artifact),
+}
+
+
+def file_hash(path):
+    """ sha256 of a file's contents """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hashes(sources):
+    """ Content hash of each named source CSV """
+    return {source: file_hash(SOURCES[source]['path']) for source in sources}
+
+
+def column_hashes(frame):
+    """ Content hash of every column of a frame, to find which columns a refresh changed """
+    return {column: hashlib.sha256(pd.util.hash_pandas_object(frame[column], index=False).to_numpy()).hexdigest()
+            for column in frame.columns}
+
+
+def _read_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+
+def _replace(path, write):
+    # Build next to the target and rename over it, so readers see the old or the new file, never half of one
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class _RefreshLock:
+    """ Exclusive lock across processes (e.g. gunicorn workers), so one of them rebuilds and the rest wait """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'w')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _newer_than_sources(path, sources):
+    # A derived table with no recorded hashes (e.g. a fresh checkout) is current when no source was modified after it
+    return os.path.exists(path) and all(os.path.getmtime(SOURCES[source]['path']) <= os.path.getmtime(path)
+                                        for source in sources)
+
+
+def refresh_derived(targets=TARGETS, state_path=STATE_PATH):
+    """ Rebuild the derived tables whose source CSVs changed since they were built
+
+    A table without recorded source hashes is only rebuilt when a source is
+    newer than it; otherwise the current hashes are recorded for it.
+
+    Returns:
+        rebuilt (list): Paths of the derived tables that were rewritten
+    """
+    rebuilt = []
+    with _RefreshLock(LOCK_PATH):
+        state = _read_state(state_path)
+        recorded = False
+        for path, (sources, write) in targets.items():
+            hashes = source_hashes(sources)
+            if state.get(path) == hashes and os.path.exists(path):
+                continue
+            if path not in state and _newer_than_sources(path, sources):
+                state[path] = hashes
+                recorded = True
+                continue
+            _replace(path, write)
+            state[path] = hashes
+            rebuilt.append(path)
+
+        if rebuilt or recorded:
+            _replace(state_path, lambda tmp_path: _write_json(tmp_path, state))
+    return rebuilt
+
+
+class DataStore:
+    """ The data snapshot a dashboard's callbacks read, swapped atomically on refresh
+
+    Callbacks take `store.current` once and read everything from it, so a
+    request that started before a refresh finishes on the old snapshot and
+    the next one sees the new snapshot; no request is dropped or sees a mix.
+    Nothing is read until the first access of `current` (or warm()), so
+    creating a store at import time is free. Loading only reads the derived
+    tables; they are rebuilt by refresh() (the watcher) or `python refresh.py`.
+    """
+
+    def __init__(self, load, sources, publish=None):
+        """
+        Args:
+            load (callable): Builds a snapshot from the derived tables
+            sources (list): cleaning.SOURCES names the snapshot is built from
+            publish (callable): Replaces the current snapshot, e.g. to drop stale
+                cached figures at the same time; DataStore.swap by default.
+                Also used for the first snapshot
+        """
+        self.load = load
+        self.sources = sources
+        self.publish = publish or self.swap
+        self.version = None
+        self._current = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        """ The current snapshot, loaded on first access """
+        if self._current is None:
+            self.warm()
+        return self._current
+
+    def warm(self):
+        """ Load the first snapshot from the derived tables as they are, e.g. before workers are forked """
+        with self._lock:
+            if self._current is None:
+                # Counted as the 'load' phase when the first request of a process triggers it
+                with phase('load'):
+                    version = source_hashes(self.sources)
+                    self.publish(self.load())
+                self.version = version
+
+    def swap(self, snapshot):
+        """ Make a new snapshot current (a single reference assignment) """
+        self._current = snapshot
+
+    def refresh(self):
+        """ Rebuild stale derived tables and reload the snapshot if any of its sources changed
+
+        Returns:
+            changed (bool): Whether a new snapshot was published
+        """
+        with self._lock:
+            # Tables left stale before the process started are rebuilt here too, with unchanged sources
+            rebuilt = refresh_derived()
+            version = source_hashes(self.sources)
+            if not rebuilt and version == self.version and self._current is not None:
+                return False
+            self.publish(self.load())
+            self.version = version
+            return True
+
+    def watch(self, interval):
+        """ Check the source CSVs every interval seconds in a daemon thread """
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    # A half-edited CSV must not stop the watcher; keep serving the current snapshot
+                    logger.exception('data refresh failed')
+
+        stop = threading.Event()
+        threading.Thread(target=poll, name='data-refresh', daemon=True).start()
+        return stop
+
+
+if __name__ == '__main__':
+    rebuilt = refresh_derived()
+    print('rebuilt: ' + ', '.join(rebuilt) if rebuilt else 'derived tables are up to date')
@@ -0,0 +1,126 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+from dashboards import load_dashboard
+from static_export import export_views
+
+MANIFEST = '.render_manifest.json'
+
+# README image -> (view id, figure key) of the figure it shows
+README_IMAGES = {
+    'asthma_choropleth.jpg': ('coverage-population', 15),
+    'age_asthma.jpg': ('top-n', 5),
+    'state_asthma.jpg': ('top-n', 50),
+}
+
+
+def render_jobs(image_format, scale, readme=False):
+    """ Build one render job per figure variant of the dashboards
+
+    Args:
+        image_format (str): png, jpg, webp, svg or pdf
+        scale (float): Image scale factor
+        readme (bool): Only the images shown in the top-level README
+    Returns:
+        jobs (list): (file name, figure JSON, render options) tuples
+    """
+    final_dash = load_dashboard('final_dash.py')
+    dash_12_02 = load_dashboard('12.02_dash.py')
+    figures = {(view['id'], key): fig
+               for view in export_views(final_dash, dash_12_02) for key, fig in view['figures'].items()}
+
+    if readme:
+        names = {name: figures[view_key] for name, view_key in README_IMAGES.items()}
+    else:
+        names = {f'{view_id}-{key}.{image_format}': fig for (view_id, key), fig in figures.items()}
+
+    options = {'scale': scale}
+    return [(name, to_json_plotly(fig), options) for name, fig in names.items()]
+
+
+def job_hash(fig_json, options):
+    """ Content hash of everything that ends up in an image """
+    content = fig_json + json.dumps(options, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def start_renderer():
+    """ Process pool initializer: start one headless browser that every image of this worker reuses """
+    import kaleido
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server(silence_warnings=True)
+
+
+def render_chunk(out_dir, jobs):
+    """ Render a chunk of jobs with the worker's warm renderer
+
+    Returns:
+        hashes (dict): Content hash of each image written, keyed by file name
+    """
+    hashes = {}
+    for name, fig_json, options in jobs:
+        pio.write_image(json.loads(fig_json), os.path.join(out_dir, name), **options)
+        hashes[name] = job_hash(fig_json, options)
+    return hashes
+
+
+def chunk(jobs, n_chunks):
+    """ Split jobs round-robin into at most n_chunks non-empty lists """
+    return [jobs[i::n_chunks] for i in range(min(n_chunks, len(jobs)))]
+
+
+def render_all(jobs, out_dir, workers, force=False):
+    """ Render the jobs whose inputs changed since the last run
+
+    The manifest in out_dir records the content hash of every image written.
+    Unchanged images are skipped; the rest are split into one chunk per
+    worker so each process starts the renderer once.
+
+    Returns:
+        rendered (int): Number of images written
+        skipped (int): Number of images that were up to date
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    stale = [job for job in jobs if force
+             or manifest.get(job[0]) != job_hash(job[1], job[2])
+             or not os.path.exists(os.path.join(out_dir, job[0]))]
+
+    if stale:
+        chunks = chunk(stale, workers)
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=start_renderer) as pool:
+            for hashes in pool.map(render_chunk, [out_dir] * len(chunks), chunks):
+                manifest.update(hashes)
+                # Save after every chunk so an interrupted run keeps its finished images
+                with open(manifest_path, 'w') as f:
+                    json.dump(manifest, f, indent=1, sort_keys=True)
+
+    return len(stale), len(jobs) - len(stale)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render every dashboard figure to image files in parallel')
+    parser.add_argument('--out', default='images', help='output directory')
+    parser.add_argument('--format', default='png', help='png, jpg, webp, svg or pdf')
+    parser.add_argument('--scale', type=float, default=1, help='image scale factor')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='renderer processes')
+    parser.add_argument('--readme', action='store_true',
+                        help='only render the README images (into the repository root unless --out is given)')
+    parser.add_argument('--force', action='store_true', help='re-render images that are up to date')
+    args = parser.parse_args()
+
+    out_dir = '..' if args.readme and args.out == 'images' else args.out
+    jobs = render_jobs(args.format, args.scale, readme=args.readme)
+    rendered, skipped = render_all(jobs, out_dir, args.workers, force=args.force)
+    print(f'{rendered} images rendered, {skipped} up to date in {out_dir}')
@@ -0,0 +1,140 @@
+from coverage_index import PAYER_COLUMNS
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Population column of each age group
+AGE_COLUMNS = {'Adult': 'Adult Number', 'Child': 'Child Number'}
+
+# How each payer is described in the generated analysis
+PAYER_NAMES = {
+    '99454 Coverage: Medicare': 'Medicare',
+    '99454 Coverage: Medicaid': 'Medicaid',
+    '99454 Coverage: Top Private Insurance': 'the top private insurer',
+    '99454 Coverage: Second Private Insurance': 'the second private insurer',
+}
+
+
+def format_count(n):
+    """ Short population figure as used in the analysis text, e.g. 777k or 3.31M """
+    if n >= 1_000_000:
+        return f'{n / 1_000_000:.3g}M'
+    if n >= 1_000:
+        return f'{n / 1_000:.0f}k'
+    return f'{n:.0f}'
+
+
+def join_words(words):
+    """ 'a', 'a and b', 'a, b, and c' """
+    if len(words) < 3:
+        return ' and '.join(words)
+    return ', '.join(words[:-1]) + ', and ' + words[-1]
+
+
+class MarketScores:
+    """ Market-entry score of every state as one matrix product
+
+    A payer reaches the asthma patients it insures in states where it covers
+    RPM (CPT 99454), scaled by the share of patients who had an attack.
+    Medicare only reaches the state's asthma patients with Medicare (adults),
+    the other payers any asthma patient. features[s, a * n_payers + p] is the
+    reach of payer p among age group a in state s, so for payer weights w_p
+    and age weights v_a the scores are features @ outer(v, w).ravel().
+    """
+
+    def __init__(self, frame, payers=PAYER_COLUMNS, ages=AGE_COLUMNS):
+        self.frame = frame
+        self.payers = list(payers)
+        self.ages = list(ages)
+        self.states = frame['State'].to_numpy()
+
+        attack_rate = frame['Total Asthma Attacks Percent'].fillna(0).to_numpy() / 100
+        people = np.stack([frame[column].to_numpy() for column in ages.values()], axis=1)
+        covered = frame[self.payers].to_numpy().astype(float)
+
+        # reach[s, a, p]: patients with attacks in age group a that payer p covers in state s
+        reach = np.repeat(people[:, :, None], len(self.payers), axis=2).astype(float)
+        if '99454 Coverage: Medicare' in self.payers:
+            medicare = self.payers.index('99454 Coverage: Medicare')
+            reach[:, :, medicare] = 0
+            reach[:, self.ages.index('Adult'), medicare] = frame['Asthma Patients with Medicare Number'].to_numpy()
+        reach *= attack_rate[:, None, None] * covered[:, None, :]
+        self.features = reach.reshape(len(frame), -1)
+
+    def weight_vector(self, payer_weights=None, age_weights=None):
+        """ Flatten payer and age weights (dicts, missing entries count 1) into one column of weights """
+        payer = np.array([(payer_weights or {}).get(p, 1.0) for p in self.payers])
+        age = np.array([(age_weights or {}).get(a, 1.0) for a in self.ages])
+        return np.outer(age, payer).ravel()
+
+    def scores(self, payer_weights=None, age_weights=None):
+        """ Score of every state, in frame order """
+        return self.features @ self.weight_vector(payer_weights, age_weights)
+
+    def rank(self, payer_weights=None, age_weights=None):
+        """ Row positions of the states, best score first, and the scores """
+        scores = self.scores(payer_weights, age_weights)
+        return np.argsort(-scores, kind='stable'), scores
+
+    def top_table(self, top_n=5, payer_weights=None, age_weights=None):
+        """ Ranked top-N states with their score, asthma population and covering payers
+
+        Returns:
+            rows (list): One dict per state, best first
+        """
+        order, scores = self.rank(payer_weights, age_weights)
+        covered = self.frame[self.payers].to_numpy()
+        population = self.frame['Population'].to_numpy()
+        return [{
+            'Rank': rank + 1,
+            'State': self.states[i],
+            'Score': round(float(scores[i])),
+            'Asthma Population': int(population[i]),
+            'RPM Covered By': [PAYER_NAMES.get(p, p) for p, c in zip(self.payers, covered[i]) if c],
+        } for rank, i in enumerate(order[:top_n])]
+
+    def narrative(self, top_n=4, payer_weights=None, age_weights=None):
+        """ Analysis text describing the top-N states of the current ranking """
+        sentences = ['Basic Analysis: The following states have promising opportunity as a point of entry.']
+        for row in self.top_table(top_n, payer_weights, age_weights):
+            payers = join_words(row['RPM Covered By'])
+            coverage = f'RPM is covered by {payers}' if payers else 'RPM is not covered by any of the payers'
+            sentences.append(f'In {row["State"]} the asthma population is '
+                             f'{format_count(row["Asthma Population"])} and {coverage}.')
+        return ' '.join(sentences)
+
+    def sweep(self, weights, chunk_size=None):
+        """ Rank the states under many weight scenarios at once
+
+        Args:
+            weights (array): (n_scenarios, n_payers + n_ages) payer weights followed by age weights
+            chunk_size (int): Scenarios scored at a time to bound memory, all at once by default
+        Returns:
+            rank_share (df): Share of scenarios in which each state (row) takes each
+                rank (column, 1 = best), ordered by mean rank; column 1 is the win frequency
+        """
+        weights = np.asarray(weights, dtype=float)
+        n_states, n_payers = len(self.states), len(self.payers)
+        rank_counts = np.zeros(n_states * n_states, dtype=np.int64)
+        positions = np.arange(n_states)
+
+        step = chunk_size or max(len(weights), 1)
+        for start in range(0, len(weights), step):
+            chunk = weights[start:start + step]
+            # (n, n_ages, 1) * (n, 1, n_payers) -> one flattened weight vector per scenario
+            vectors = (chunk[:, n_payers:, None] * chunk[:, None, :n_payers]).reshape(len(chunk), -1)
+            scores = vectors @ self.features.T
+            # order[k, r]: state at rank r in scenario k
+            order = np.argsort(-scores, axis=1, kind='stable')
+            rank_counts += np.bincount((order * n_states + positions).ravel(), minlength=n_states * n_states)
+
+        rank_share = pd.DataFrame(rank_counts.reshape(n_states, n_states) / max(len(weights), 1),
+                                  index=pd.Index(self.states, name='State'), columns=positions + 1)
+        mean_rank = rank_share.to_numpy() @ (positions + 1)
+        return rank_share.iloc[np.argsort(mean_rank, kind='stable')]
+
+
+def random_weights(n_scenarios, n_weights=len(PAYER_COLUMNS) + len(AGE_COLUMNS), seed=0):
+    """ Scenarios with every weight drawn uniformly from [0, 1], the range of the weight sliders """
+    return np.random.default_rng(seed).random((n_scenarios, n_weights))
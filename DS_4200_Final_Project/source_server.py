@@ -0,0 +1,93 @@
+import argparse
+import email.utils
+import hashlib
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SourceRequestHandler(SimpleHTTPRequestHandler):
+    """ Static file handler that behaves like the CDC/CMS download servers
+
+    Adds strong ETags and answers If-None-Match / If-Modified-Since with 304,
+    keeps connections alive, and can add latency or fail every n-th request
+    with a 503 so retries can be exercised.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    fail_every = 0
+    requests = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            count = cls.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and count % self.fail_every == 0:
+            self.send_error(503, 'Service Unavailable')
+            return None
+
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        with open(path, 'rb') as f:
+            etag = '"' + hashlib.sha256(f.read()).hexdigest()[:32] + '"'
+        modified = os.stat(path).st_mtime
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        not_modified = (if_none_match == etag if if_none_match is not None else
+                        if_modified_since is not None
+                        and email.utils.parsedate_to_datetime(if_modified_since).timestamp() >= int(modified))
+        if not_modified:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+
+        f = open(path, 'rb')
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+        self.send_header('Last-Modified', self.date_time_string(modified))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        return f
+
+
+def start_server(directory, port=0, latency=0.0, fail_every=0):
+    """ Serve a directory in a background thread
+
+    Returns:
+        server (ThreadingHTTPServer): Call server.shutdown() to stop it;
+            server.server_port is the port picked when port=0
+    """
+    handler = type('Handler', (SourceRequestHandler,), {'latency': latency, 'fail_every': fail_every,
+                                                       'requests': 0, 'lock': threading.Lock()})
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(handler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the CDC/CMS source download servers')
+    parser.add_argument('--directory', default='.', help='directory to serve')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--fail-every', type=int, default=0, help='answer every n-th request with a 503')
+    args = parser.parse_args()
+
+    server = start_server(args.directory, args.port, args.latency, args.fail_every)
+    print(f'serving {os.path.abspath(args.directory)} on http://127.0.0.1:{server.server_port}/')
+    threading.Event().wait()
@@ -0,0 +1,111 @@
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+# Startup phase limits (ms) per dashboard, checked by `python startup_budget.py`
+BUDGET_PATH = 'startup_budget.json'
+
+# Startup phases, in order
+PHASES = ['import', 'create_app', 'warm', 'first_request']
+
+# Runs in a fresh interpreter under -X importtime; phase markers go to stderr between the import lines
+CHILD = '''
+import json, sys, time
+from dashboards import load_dashboard
+
+def phase(name):
+    sys.stderr.write(f'phase: {name}\\n')
+    sys.stderr.flush()
+    return time.perf_counter()
+
+timings = {}
+start = phase('import')
+module = load_dashboard(sys.argv[1])
+start, timings['import'] = phase('create_app'), time.perf_counter() - start
+app = module.get_app()
+start, timings['create_app'] = phase('warm'), time.perf_counter() - start
+if hasattr(module, 'store'):
+    module.store.warm()
+start, timings['warm'] = phase('first_request'), time.perf_counter() - start
+client = app.server.test_client()
+assert client.get('/').status_code == 200 and client.get('/_dash-layout').status_code == 200
+timings['first_request'] = time.perf_counter() - start
+print(json.dumps({name: seconds * 1000 for name, seconds in timings.items()}))
+'''
+
+
+def parse_importtime(stderr):
+    """ Cumulative import time (ms) of each top-level package, per startup phase
+
+    Args:
+        stderr (str): Output of python -X importtime with 'phase: <name>' marker lines
+    Returns:
+        imports (dict): {phase: {package: ms}}; only imports not nested in another
+            one are counted, so the values of a phase add up to its import time
+    """
+    imports = defaultdict(lambda: defaultdict(float))
+    phase = None
+    for line in stderr.splitlines():
+        if line.startswith('phase: '):
+            phase = line[len('phase: '):]
+            continue
+        if not line.startswith('import time:') or phase is None:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  ') or not cumulative.strip().isdigit():
+            # Nested import (indented) or the column header
+            continue
+        imports[phase][name.strip().split('.')[0]] += int(cumulative) / 1000
+    return imports
+
+
+def measure(dashboard):
+    """ Phase timings (ms) and import breakdown of one dashboard's cold start """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, dashboard],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def report(dashboard, timings, imports, budget, top=5):
+    """ Print a dashboard's phases against its budget; returns the phases over budget """
+    over = []
+    print(dashboard)
+    for phase in PHASES:
+        limit = budget.get(f'{phase}_ms')
+        status = '' if limit is None else f'/ {limit:>6,.0f} ms' + (' OVER' if timings[phase] > limit else '')
+        if limit is not None and timings[phase] > limit:
+            over.append(phase)
+        heaviest = sorted(imports[phase].items(), key=lambda item: -item[1])[:top]
+        print(f'  {phase:<14} {timings[phase]:>7,.0f} ms {status:<16} '
+              + ', '.join(f'{package} {ms:,.0f}' for package, ms in heaviest))
+    return over
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold-start phase timings and import breakdown against a budget')
+    parser.add_argument('dashboards', nargs='*', help='dashboards to measure, all in the budget by default')
+    parser.add_argument('--update', action='store_true',
+                        help='write the measured timings with --headroom as the new budget')
+    parser.add_argument('--headroom', type=float, default=2.0)
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as f:
+        budgets = json.load(f)
+
+    over_budget = {}
+    for dashboard in args.dashboards or list(budgets):
+        timings, imports = measure(dashboard)
+        over = report(dashboard, timings, imports, budgets.get(dashboard, {}))
+        if over:
+            over_budget[dashboard] = over
+        if args.update:
+            budgets[dashboard] = {f'{phase}_ms': round(timings[phase] * args.headroom, -1) for phase in PHASES}
+
+    if args.update:
+        with open(BUDGET_PATH, 'w') as f:
+            json.dump(budgets, f, indent=1)
+            f.write('\n')
+    elif over_budget:
+        sys.exit('over the startup budget: ' + '; '.join(f'{d}: {", ".join(p)}' for d, p in over_budget.items()))
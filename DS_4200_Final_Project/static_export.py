@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import shutil
+
+import plotly
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from coverage_index import PAYER_COLUMNS
+from dashboards import load_dashboard
+from figure_cache import mask_columns
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Asthma Prevalence and RPM Insurance Coverage</title>
+    <link rel="stylesheet" href="assets/bootstrap.min.css">
+    <link rel="stylesheet" href="assets/fonts.css">
+    <script src="plotly.min.js"></script>
+    <style>body {{ font-family: Montserrat, sans-serif; margin: 20px 40px; }} label {{ margin-right: 15px; }}</style>
+</head>
+<body>
+<h1>Asthma Prevalence and RPM Insurance Coverage</h1>
+<div id="views"></div>
+<script>
+// Every figure was rendered ahead of time by static_export.py; the controls only pick which one to show
+var views = {views};
+var inlineFigures = {inline_figures};
+
+function figureKey(view) {{
+    var controls = document.querySelectorAll('[name="' + view.id + '"]');
+    if (view.control === 'select') {{
+        return controls[0].value;
+    }}
+    // Checklist selections are keyed by payer bitmask, bit i for the i-th option
+    var mask = 0;
+    controls.forEach(function (box, i) {{ if (box.checked) {{ mask |= 1 << i; }} }});
+    return String(mask);
+}}
+
+function draw(view) {{
+    var name = view.id + '-' + figureKey(view);
+    var figure = inlineFigures ? Promise.resolve(inlineFigures[name])
+                               : fetch('figures/' + name + '.json').then(function (r) {{ return r.json(); }});
+    figure.then(function (fig) {{ Plotly.react(view.id + '-graph', fig.data, fig.layout); }});
+}}
+
+views.forEach(function (view) {{
+    var section = document.createElement('div');
+    var controls = view.options.map(function (option) {{
+        if (view.control === 'select') {{
+            return '<option value="' + option.value + '"' + (option.value === view.value ? ' selected' : '') + '>' + option.label + '</option>';
+        }}
+        return '<label><input type="checkbox" name="' + view.id + '" checked> ' + option.label + '</label>';
+    }}).join('');
+    if (view.control === 'select') {{
+        controls = '<select name="' + view.id + '">' + controls + '</select>';
+    }}
+    section.innerHTML = '<h2>' + view.title + '</h2>' + controls + '<div id="' + view.id + '-graph"></div>';
+    document.getElementById('views').appendChild(section);
+    section.querySelectorAll('[name="' + view.id + '"]').forEach(function (control) {{
+        control.addEventListener('change', function () {{ draw(view); }});
+    }});
+    draw(view);
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def export_views(final_dash, dash_12_02):
+    """ Enumerate every input combination of the dashboards and build its figure
+
+    Returns:
+        views (list): Page sections, each with its control, options and a
+            dict of figures keyed by the control value (payer bitmask for checklists)
+    """
+    payer_options = [{'label': column.split(': ')[1], 'value': column} for column in PAYER_COLUMNS]
+    masks = range(2 ** len(PAYER_COLUMNS))
+    top_n_values = range(5, len(dash_12_02.store.current.df) + 1, 5)
+
+    return [
+        {
+            'id': 'population', 'title': 'Asthma Prevalence in the United States', 'control': 'select',
+            'options': [{'label': label, 'value': value} for value, label in final_dash.populations.items()],
+            'value': 'Population',
+            'figures': {value: final_dash.generate_fig(value) for value in final_dash.populations},
+        },
+        {
+            'id': 'coverage', 'title': 'Remote Patient Monitoring Coverage, CPT: 99454', 'control': 'checklist',
+            'options': payer_options,
+            'figures': {mask: final_dash.generate_coverage_fig(
+                final_dash.store.current.coverage_index.covered_by_all(mask_columns(mask))) for mask in masks},
+        },
+        {
+            'id': 'coverage-population', 'title': 'Asthma Population in States with RPM Coverage',
+            'control': 'checklist', 'options': payer_options,
+            'figures': {mask: dash_12_02.choropleth_cache.get(mask_columns(mask)) for mask in masks},
+        },
+        {
+            'id': 'top-n', 'title': 'Asthma Population by State', 'control': 'select',
+            'options': [{'label': f'Top {n} States', 'value': str(n)} for n in top_n_values],
+            'value': '5',
+            'figures': {n: dash_12_02.update_chart(n) for n in top_n_values},
+        },
+    ]
+
+
+def export_site(out_dir, inline=False, png=False):
+    """ Write a self-contained static version of the dashboards
+
+    Args:
+        out_dir (str): Output directory (index.html, plotly.min.js, assets/, figures/)
+        inline (bool): Embed every figure in index.html so it also works from file://
+        png (bool): Also write a PNG of every figure (needs kaleido)
+    """
+    final_dash = load_dashboard('final_dash.py')
+    dash_12_02 = load_dashboard('12.02_dash.py')
+    views = export_views(final_dash, dash_12_02)
+
+    os.makedirs(os.path.join(out_dir, 'figures'), exist_ok=True)
+    shutil.copytree('assets', os.path.join(out_dir, 'assets'), dirs_exist_ok=True)
+    shutil.copy(os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js'), out_dir)
+
+    inline_figures = {}
+    for view in views:
+        for key, fig in view.pop('figures').items():
+            name = f'{view["id"]}-{key}'
+            fig_json = to_json_plotly(fig)
+            if inline:
+                inline_figures[name] = json.loads(fig_json)
+            else:
+                with open(os.path.join(out_dir, 'figures', name + '.json'), 'w') as f:
+                    f.write(fig_json)
+            if png:
+                go.Figure(fig).write_image(os.path.join(out_dir, 'figures', name + '.png'))
+
+    page = PAGE_TEMPLATE.format(views=json.dumps(views),
+                                inline_figures=to_json_plotly(inline_figures) if inline else 'null')
+    with open(os.path.join(out_dir, 'index.html'), 'w') as f:
+        f.write(page)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-render every dashboard figure into a static site')
+    parser.add_argument('--out', default='static_site', help='output directory')
+    parser.add_argument('--inline', action='store_true', help='embed the figures in index.html')
+    parser.add_argument('--png', action='store_true', help='also write PNG images (requires kaleido)')
+    args = parser.parse_args()
+
+    export_site(args.out, inline=args.inline, png=args.png)
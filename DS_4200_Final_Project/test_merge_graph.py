@@ -1,62 +1,80 @@
-import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
-import pandas as pd
+from types import SimpleNamespace
+
+from build_artifact import load_combined
+from coverage_index import PAYER_COLUMNS, CoverageIndex
+from coverage_tensor import parse_coverage_column
+from dashboards import Dashboard
+from figure_cache import FigureCache, shared_backend
+from figure_templates import FigureTemplate
+from instrumentation import phase
+from lazy_imports import lazy_import
+
+# Heavy modules load on first use, so importing this module (e.g. during test collection) stays cheap
+px = lazy_import('plotly.express')
+
 
 # Load clean data
-asthma_pop_df = pd.read_csv('clean_population_data.csv')
-coverage_df = pd.read_csv('coverage_df_clean.csv')
-combined_df = asthma_pop_df.merge(coverage_df, left_on='States', right_on='State')
-
-# Initialize the Dash app
-app = dash.Dash(__name__,external_stylesheets=[
-    {
-        'href': 'https://fonts.googleapis.com/css?family=Montserrat',  # Link to custom font
-        'rel': 'stylesheet'
-    },
-    {
-        'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css',  # Bootstrap CSS
-        'rel': 'stylesheet'
-    }
-])
+def load_data():
+    # asthma population merged with insurance coverage data
+    return build_snapshot(load_combined())
+
+
+# Coverage lookups over the merged table, indexed on the given payer columns
+def build_snapshot(combined_df, payers=PAYER_COLUMNS):
+    return SimpleNamespace(combined_df=combined_df,
+                           # Per-state payer coverage bitmasks
+                           coverage_index=CoverageIndex(combined_df, payers))
+
+
+# Read on first access, not at import; the app is built by get_app()
+dashboard = Dashboard(__name__, load_data, ['population', 'coverage'])
+store = dashboard.store
+get_app = dashboard.get_app
+
 
 # Define the layout of the app with dropdown and graph
-app.layout = html.Div([
-    html.H1("Asthma Prevalence Dashboard", style={'fontFamily': 'Montserrat', 'fontSize': '36px'}),
-    dcc.Checklist(
-        id='checkboxes',
-        options=[
-            {'label': 'Medicare', 'value': '99454 Coverage: Medicare'},
-            {'label': 'Medicaid', 'value': '99454 Coverage: Medicaid'},
-            {'label': 'Top Private Insurance', 'value': '99454 Coverage: Top Private Insurance'},
-            {'label': 'Second Private Insurance', 'value': '99454 Coverage: Second Private Insurance'},
-        ],
-        value=['99454 Coverage: Medicare',
-               '99454 Coverage: Medicaid',
-               '99454 Coverage: Top Private Insurance',
-               '99454 Coverage: Second Private Insurance'
-        ],
-        style={'width': '150px', 'fontFamily': 'Montserrat'},
-        inline=True,
-    ),
-    dcc.Graph(
-        id='choropleth-map', style={'width': '100vw', 'height': '100vh'}
-    )
-])
+def serve_layout():
+    from dash import dcc, html
+
+    return html.Div([
+        html.H1("Asthma Prevalence Dashboard", style={'fontFamily': 'Montserrat', 'fontSize': '36px'}),
+        dcc.Checklist(
+            id='checkboxes',
+            options=[{'label': parse_coverage_column(column)[1], 'value': column} for column in PAYER_COLUMNS],
+            value=PAYER_COLUMNS,
+            style={'width': '150px', 'fontFamily': 'Montserrat'},
+            inline=True,
+        ),
+        dcc.Graph(
+            id='choropleth-map', style={'width': '100vw', 'height': '100vh'}
+        )
+    ])
 
 
 # Callback to update choropleth map based on checkbox selection
-@app.callback(
-    Output('choropleth-map', 'figure'),
-    [Input('checkboxes', 'value')]
-)
 def update_choropleth(selected_checkboxes):
-    filtered_df = combined_df[combined_df[selected_checkboxes].sum(axis=1) == len(selected_checkboxes)]
+    # Load the data (which binds the cache to it) before asking the cache, so the first figure is kept
+    store.current
+    # Serve the prebuilt figure for this payer combination
+    return choropleth_cache.get(selected_checkboxes)
+
 
-    # Create choropleth map
+def build_choropleth(selected_checkboxes):
+    with phase('filter'):
+        data = store.current
+        filtered_df = data.combined_df[data.coverage_index.covered_by_all(selected_checkboxes)]
+
+    with phase('build'):
+        return choropleth_template.stamp(dict(locations=filtered_df['State Code'].to_numpy(),
+                                              z=filtered_df['Population'].to_numpy(),
+                                              hovertext=filtered_df['State'].to_numpy()))
+
+
+# Create choropleth map with plotly express (the template's sample, and the reference for bench_templates.py)
+def px_choropleth(filtered_df):
     fig = px.choropleth(
         filtered_df,
-        locations='State Code_x',
+        locations='State Code',
         locationmode="USA-states",
         color='Population',
         hover_name='State',
@@ -69,6 +87,29 @@ def update_choropleth(selected_checkboxes):
     return fig
 
 
+# Styling of the map, built once; build_choropleth only stamps in the rows of each selection
+choropleth_template = FigureTemplate(lambda: px_choropleth(store.current.combined_df))
+
+
+# Figures for all 16 payer combinations, built on first use and then served from memory
+# (and from the shared cache when several worker processes serve the app)
+choropleth_cache = dashboard.add_cache(FigureCache(build_choropleth, name='test-merge-choropleth',
+                                                   backend=shared_backend(),
+                                                   data_columns=['State', 'State Code', 'Population']))
+
+
+@dashboard.app_factory
+def create_app():
+    """ Build the Dash app with its routes and callbacks; no data is read until the first request """
+    from dash import Input, Output
+
+    # The snapshot has no coverage tensor for the data API
+    app = dashboard.new_app(data_api=False)
+    app.layout = serve_layout
+    app.callback(Output('choropleth-map', 'figure'), [Input('checkboxes', 'value')])(update_choropleth)
+    return app
+
+
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    dashboard.run()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The dashboard modules are flat files in the project folder, run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from cleaning import FLAG, INT, PERCENT, TEXT, clean_csv, column_kind, iter_clean_csv
+
+# A title row, a header with an embedded newline, unnamed and blank columns, and a row without a state
+RAW = '''Asthma by state,,,,,
+States,"Adult
+Population",Adult Percent,99454 Coverage: Medicare,Notes,
+ Alabama ,"3,313,415",9.3%,Yes (21),  keep  ,
+Alaska,"512,000",Unavailable,No,,
+,"1,000",1.0%,Yes,orphan,
+California,"30,000,000", 8.1 %,BCBS (CA): Yes,x,
+Texas,"21,000,001",,,y,
+'''
+
+# Spreadsheet group header ("99454 Coverage") only filled in its first cell, above the field header
+GROUPED = '''Cross analysis,,,
+,99454 Coverage,,US
+States,Medicare,Medicaid,Population
+Ohio,Yes,No,"11,700,000"
+Utah,No (2),Yes,"3,400,000"
+'''
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    path = tmp_path / 'raw.csv'
+    path.write_text(RAW)
+    return str(path)
+
+
+def test_column_rules():
+    assert column_kind('States') == TEXT
+    assert column_kind('US States') == TEXT
+    assert column_kind('Adult Population') == INT
+    assert column_kind('Medicare Beneficiaries') == INT
+    assert column_kind('Adult Percent') == PERCENT
+    assert column_kind('Top Private Insurance Market Share') == PERCENT
+    assert column_kind('99454 Coverage: Medicare') == FLAG
+    assert column_kind('Medicaid Coverage 99454') == FLAG
+    assert column_kind('Notes') == TEXT
+
+
+def test_coercions_and_missing_values(raw_csv):
+    df = clean_csv(raw_csv, skiprows=1, state_column='States')
+    assert list(df.columns) == ['States', 'Adult Population', 'Adult Percent', '99454 Coverage: Medicare', 'Notes']
+    # The row without a state is dropped
+    assert df['States'].tolist() == ['Alabama', 'Alaska', 'California', 'Texas']
+    assert df['Adult Population'].dtype == 'int64'
+    assert df['Adult Population'].tolist() == [3_313_415, 512_000, 30_000_000, 21_000_001]
+    assert df['Adult Percent'].dtype == 'float64'
+    assert df['Adult Percent'].tolist()[0] == 9.3 and df['Adult Percent'].tolist()[2] == 8.1
+    # Unparseable and empty percents are NaN
+    assert df['Adult Percent'].isna().tolist() == [False, True, False, True]
+    # Any cell containing 'Yes' is covered; 'No' and empty cells are not
+    assert df['99454 Coverage: Medicare'].dtype == bool
+    assert df['99454 Coverage: Medicare'].tolist() == [True, False, True, False]
+    assert df['Notes'].tolist()[0] == 'keep' and pd.isna(df['Notes'].tolist()[1])
+
+
+def test_chunked_matches_whole_file(raw_csv):
+    whole = clean_csv(raw_csv, skiprows=1, state_column='States')
+    for chunksize in (1, 2, 3, 100):
+        chunks = list(iter_clean_csv(raw_csv, skiprows=1, state_column='States', chunksize=chunksize))
+        assert len(chunks) == -(-5 // chunksize)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+
+
+def test_group_header(tmp_path):
+    path = tmp_path / 'grouped.csv'
+    path.write_text(GROUPED)
+    df = clean_csv(str(path), skiprows=1, header_rows=2, state_column='States')
+    assert list(df.columns) == ['States', '99454 Coverage: Medicare', '99454 Coverage: Medicaid', 'Population']
+    assert df['99454 Coverage: Medicare'].tolist() == [True, False]
+    assert df['99454 Coverage: Medicaid'].tolist() == [False, True]
+    assert df['Population'].tolist() == [11_700_000, 3_400_000]
+    chunks = pd.concat(iter_clean_csv(str(path), skiprows=1, header_rows=2, state_column='States', chunksize=1),
+                       ignore_index=True)
+    pd.testing.assert_frame_equal(chunks, df)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coverage_index import PAYER_COLUMNS, CoverageIndex
+
+
+def frame(n_rows, columns=PAYER_COLUMNS, seed=0):
+    """ Random 0/1 coverage, with a few missing cells """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(0, 2, size=(n_rows, len(columns))).astype(float), columns=columns)
+    df.iloc[::7, 1] = np.nan
+    return df
+
+
+def expected(df, selected):
+    # The original dashboards' filters: a row is covered by a column holding 1
+    flags = df[selected] == 1
+    return flags.all(axis=1).tolist(), flags.any(axis=1).tolist(), (~flags.any(axis=1)).tolist()
+
+
+@pytest.mark.parametrize('n_rows', [1, 50, 3000])
+def test_masks_match_pandas(n_rows):
+    df = frame(n_rows)
+    index = CoverageIndex(df, PAYER_COLUMNS)
+    for mask in range(1 << len(PAYER_COLUMNS)):
+        selected = [column for i, column in enumerate(PAYER_COLUMNS) if mask >> i & 1]
+        covered = (index.covered_by_all(selected).tolist(), index.covered_by_any(selected).tolist(),
+                   index.covered_by_none(selected).tolist())
+        assert covered == expected(df, selected)
+
+
+# Masks are packed 64 columns to a uint64 word; selections on both sides of and across the boundary
+@pytest.mark.parametrize('n_columns', [63, 64, 65, 130])
+def test_word_boundary(n_columns):
+    columns = [f'99454 Coverage: Payer {i}' for i in range(n_columns)]
+    df = frame(60, columns, seed=n_columns)
+    index = CoverageIndex(df, columns)
+    assert index.n_words == -(-n_columns // 64)
+    rng = np.random.default_rng(1)
+    picks = [columns[62:], columns[-1:], [columns[0], columns[-1]], columns[:1], [], columns]
+    picks += [list(rng.choice(columns, size=3, replace=False)) for _ in range(20)]
+    for selected in picks:
+        covered = (index.covered_by_all(selected).tolist(), index.covered_by_any(selected).tolist(),
+                   index.covered_by_none(selected).tolist())
+        assert covered == expected(df, selected)
+
+
+def test_subset_of_columns():
+    df = frame(70)
+    index = CoverageIndex(df, PAYER_COLUMNS[1:3])
+    assert index.columns == PAYER_COLUMNS[1:3]
+    assert index.covered_by_all(PAYER_COLUMNS[1:3]).tolist() == expected(df, PAYER_COLUMNS[1:3])[0]
+    with pytest.raises(KeyError):
+        index.covered_by_all(PAYER_COLUMNS[:1])
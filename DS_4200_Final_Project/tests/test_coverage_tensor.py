@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coverage_index import PAYER_COLUMNS, CoverageIndex
+from coverage_tensor import CPT_CODES, CoverageTensor, coverage_column, parse_coverage_column
+from geo_ingest import COVERED_SUFFIX
+
+
+def frame():
+    """ Three states, two payers; 99457 only for Medicare, 99453 and 99458 missing """
+    return pd.DataFrame({
+        'State': ['A', 'B', 'C'],
+        coverage_column('99454', 'Medicare'): [1, 1, 0],
+        coverage_column('99454', 'Medicaid'): [1, 0, 0],
+        coverage_column('99457', 'Medicare'): [1, 0, 1],
+        # geo_ingest rollup sums next to the flags
+        coverage_column('99454', 'Medicare') + COVERED_SUFFIX: [900, 500, 10],
+        coverage_column('99454', 'Medicaid') + COVERED_SUFFIX: [800, 0, 0],
+    })
+
+
+def test_parse_coverage_column():
+    assert parse_coverage_column('99454 Coverage: Medicare') == ('99454', 'Medicare')
+    assert parse_coverage_column('99458 Coverage: Top Private Insurance') == ('99458', 'Top Private Insurance')
+    assert parse_coverage_column('99454 Coverage: Medicare' + COVERED_SUFFIX) is None
+    assert parse_coverage_column('12345 Coverage: Medicare') is None
+    assert parse_coverage_column('99454 Coverage: ') is None
+    assert parse_coverage_column('Population') is None
+
+
+def test_axes_skip_geo_rollup_columns():
+    tensor = CoverageTensor(frame())
+    assert tensor.payers == ['Medicare', 'Medicaid']
+    assert tensor.codes == CPT_CODES
+    assert tensor.available_codes == ['99454', '99457']
+    assert tensor.bits.shape == (3, 1)
+
+
+def test_query_code_and_payer_filters():
+    tensor = CoverageTensor(frame())
+    assert tensor.query(['Medicare'], ['99454']).tolist() == [True, True, False]
+    assert tensor.query(['Medicare'], ['99454', '99457']).tolist() == [True, False, False]
+    assert tensor.query(['Medicare'], ['99454', '99457'], code_match='any').tolist() == [True, True, True]
+    assert tensor.query(['Medicare', 'Medicaid'], ['99454']).tolist() == [True, False, False]
+    assert tensor.query(['Medicare', 'Medicaid'], ['99454'], payer_match='any').tolist() == [True, True, False]
+    assert tensor.query(['Medicare', 'Medicaid'], ['99454'], payer_match='none').tolist() == [False, False, True]
+    # A code without data covers nothing; empty selections follow CoverageIndex
+    assert tensor.query(['Medicare'], ['99458']).tolist() == [False, False, False]
+    assert tensor.query([], ['99454']).tolist() == [True, True, True]
+    assert tensor.query(['Medicare'], [], code_match='any').tolist() == [False, False, False]
+    assert tensor.count(['Medicare', 'Medicaid'], ['99454', '99457']).tolist() == [3, 1, 1]
+    with pytest.raises(KeyError):
+        tensor.query(['Aetna'], ['99454'])
+
+
+def test_query_matches_coverage_index():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.integers(0, 2, size=(40, len(PAYER_COLUMNS))), columns=PAYER_COLUMNS)
+    tensor, index = CoverageTensor(data), CoverageIndex(data, PAYER_COLUMNS)
+    for mask in range(1 << len(PAYER_COLUMNS)):
+        columns = [column for i, column in enumerate(PAYER_COLUMNS) if mask >> i & 1]
+        payers = [parse_coverage_column(column)[1] for column in columns]
+        for match, method in [('all', index.covered_by_all), ('any', index.covered_by_any),
+                              ('none', index.covered_by_none)]:
+            assert (tensor.query(payers, ['99454'], match) == method(columns)).all()
+
+
+def test_selected_slices_match_the_unpacked_tensor():
+    # 5 payers x 4 codes: 20 bits, so selections span byte boundaries
+    rng = np.random.default_rng(1)
+    payers = [f'Payer {i}' for i in range(5)]
+    data = pd.DataFrame({coverage_column(code, payer): rng.integers(0, 2, 30) for payer in payers
+                         for code in CPT_CODES})
+    tensor = CoverageTensor(data)
+    full = tensor.unpack()
+    for selected_payers, codes in [(None, None), (['Payer 4', 'Payer 0'], ['99458', '99453']),
+                                   (['Payer 2'], ['99457']), ([], CPT_CODES), (payers, [])]:
+        payer_rows = range(5) if selected_payers is None else [payers.index(p) for p in selected_payers]
+        code_rows = range(4) if codes is None else [CPT_CODES.index(c) for c in codes]
+        expected = full[:, list(payer_rows)][:, :, list(code_rows)]
+        assert (tensor._select(selected_payers, codes) == expected).all()
+        assert tensor._select(selected_payers, codes).shape == expected.shape
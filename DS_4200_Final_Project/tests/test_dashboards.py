@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import refresh
+from dashboards import Dashboard
+
+
+class Cache:
+    """ Records rebinds like FigureCache.rebind: publish runs inside it """
+
+    def __init__(self, name, log):
+        self.name, self.log = name, log
+
+    def rebind(self, column_hashes, publish=None):
+        self.log.append((self.name, sorted(column_hashes)))
+        publish()
+
+    def stats(self):
+        return {'hits': 0}
+
+
+def snapshot(population):
+    return SimpleNamespace(combined_df=pd.DataFrame({'State': ['A'], 'Population': [population]}))
+
+
+def test_publish_rebinds_every_cache_then_runs_hooks(monkeypatch):
+    monkeypatch.setattr(refresh, 'source_hashes', lambda sources: {})
+    log = []
+    dashboard = Dashboard('test', lambda: snapshot(1), [])
+    dashboard.add_cache(Cache('a', log))
+    dashboard.add_cache(Cache('b', log))
+    dashboard.on_publish.append(lambda: log.append(('hook', dashboard.store.current.combined_df['Population'][0])))
+
+    assert dashboard.store.current.combined_df['Population'][0] == 1
+    dashboard.store.publish(snapshot(2))
+    # The outermost rebind is the last cache added; the hooks see the new snapshot
+    expected = [('b', ['Population', 'State']), ('a', ['Population', 'State']), ('hook', 1),
+                ('b', ['Population', 'State']), ('a', ['Population', 'State']), ('hook', 2)]
+    assert log == expected
+    assert dashboard.cache_stats() == {'a': {'hits': 0}, 'b': {'hits': 0}}
+
+
+def test_get_app_builds_once():
+    dashboard = Dashboard('test', lambda: snapshot(1), [])
+    built = []
+
+    @dashboard.app_factory
+    def create_app():
+        built.append(object())
+        return built[-1]
+
+    assert dashboard.get_app() is dashboard.get_app() is built[0]
+    assert len(built) == 1
+    # create_app itself still builds a new app
+    assert create_app() is not built[0]
@@ -0,0 +1,93 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+import flask
+import pandas as pd
+import pytest
+
+from coverage_tensor import CoverageTensor, coverage_column
+from data_api import register_data_api
+
+
+def snapshot(n_states=40):
+    """ n_states states, Medicare covering every other one, Medicaid every third """
+    frame = pd.DataFrame({
+        'State': [f'State {i}' for i in range(n_states)],
+        'State Code': [f'S{i}' for i in range(n_states)],
+        'Population': range(1000, 1000 + n_states),
+        coverage_column('99454', 'Medicare'): [i % 2 == 0 for i in range(n_states)],
+        coverage_column('99454', 'Medicaid'): [i % 3 == 0 for i in range(n_states)],
+    })
+    return SimpleNamespace(combined_df=frame, coverage_tensor=CoverageTensor(frame))
+
+
+@pytest.fixture
+def client():
+    app = SimpleNamespace(server=flask.Flask(__name__))
+    register_data_api(app, SimpleNamespace(current=snapshot()))
+    return app.server.test_client()
+
+
+@pytest.mark.parametrize('query, message', [
+    ('payers=x', 'integer bitmask'),
+    ('payers=-1', 'bitmask of 2 payers'),
+    ('payers=4', 'bitmask of 2 payers'),
+    ('match=some', 'match must be one of'),
+    ('format=xml', 'format one of'),
+    ('codes=12345', 'codes must be among'),
+    ('code_match=none', 'code_match one of'),
+    ('columns=State,Nope', 'unknown columns'),
+])
+def test_invalid_queries_are_rejected(client, query, message):
+    response = client.get('/api/coverage?' + query)
+    assert response.status_code == 400
+    assert message in response.get_data(as_text=True)
+
+
+def test_payer_and_state_filters(client):
+    # Medicare (bit 0) and Medicaid (bit 1): every sixth state
+    rows = client.get('/api/coverage?payers=3&format=json&columns=State').get_json()
+    assert [row['State'] for row in rows] == [f'State {i}' for i in range(0, 40, 6)]
+    rows = client.get('/api/coverage?payers=1&match=none&states=S1,State 3,S4&format=json').get_json()
+    assert [row['State Code'] for row in rows] == ['S1', 'S3']
+
+
+def test_revalidation_is_a_bodiless_304(client):
+    first = client.get('/api/coverage?payers=1&format=json', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['Vary'] == 'Accept-Encoding'
+    etag = first.headers['ETag']
+    assert len(json.loads(gzip.decompress(first.get_data()))) == 20
+
+    again = client.get('/api/coverage?format=json&payers=1',
+                       headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+
+    # The uncompressed representation has its own ETag, so the gzip one does not match it
+    plain = client.get('/api/coverage?payers=1&format=json', headers={'If-None-Match': etag})
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] != etag
+    assert gzip.decompress(first.get_data()) == plain.get_data()
+
+    # A different query never matches
+    other = client.get('/api/coverage?payers=2&format=json',
+                       headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert other.status_code == 200
+
+
+def test_small_bodies_have_one_representation(client):
+    # Below http_cache.MIN_COMPRESS_SIZE the body is sent as it is whatever the client accepts, under one ETag
+    gzipped = client.get('/api/coverage?payers=3&format=csv&columns=State Code', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/api/coverage?payers=3&format=csv&columns=State Code')
+    assert 'Content-Encoding' not in gzipped.headers
+    assert gzipped.headers['ETag'] == plain.headers['ETag']
+    assert gzipped.get_data() == plain.get_data() == b'State Code\nS0\nS6\nS12\nS18\nS24\nS30\nS36\n'
+
+    revalidated = client.get('/api/coverage?payers=3&format=csv&columns=State Code',
+                             headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert revalidated.status_code == 304
@@ -0,0 +1,86 @@
+import threading
+
+import refresh
+from figure_cache import FigureCache, FileSystemBackend
+from refresh import DataStore
+
+
+class Figure(dict):
+    """ Stand-in for go.Figure: build_fig results only need to_dict() """
+
+    def to_dict(self):
+        return dict(self)
+
+
+def test_first_load_does_not_deadlock(monkeypatch):
+    # No derived tables or source files are read
+    monkeypatch.setattr(refresh, 'refresh_derived', lambda: [])
+    monkeypatch.setattr(refresh, 'source_hashes', lambda sources: {})
+
+    building, loading = threading.Event(), threading.Event()
+
+    def load():
+        loading.set()
+        return {'Population': 'v1'}
+
+    def build_fig(selected):
+        # Read the store while the cache is building, after the other thread took the store lock
+        building.set()
+        loading.wait(timeout=5)
+        return Figure(population=store.current['Population'], selected=selected)
+
+    cache = FigureCache(build_fig, columns=['A', 'B'], data_columns=['Population'])
+    store = DataStore(load, [], publish=lambda data: cache.rebind({'Population': data['Population'], 'A': 'a', 'B': 'b'},
+                                                                   publish=lambda: store.swap(data)))
+    results = {}
+
+    def read_store():
+        building.wait(timeout=5)
+        results['store'] = store.current
+
+    def read_cache():
+        results['figure'] = cache.get(['A'])
+
+    threads = [threading.Thread(target=read_cache, daemon=True), threading.Thread(target=read_store, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in threads), 'store.current and FigureCache.get deadlocked'
+    assert results['store'] == {'Population': 'v1'}
+    assert results['figure'] == {'population': 'v1', 'selected': ['A']}
+
+
+def test_figure_built_during_rebind_is_not_kept():
+    cache = FigureCache(None, columns=['A'], data_columns=['Population'])
+    cache.rebind({'Population': 'v1', 'A': 'a'})
+
+    def build_fig(selected):
+        # New data is published while this figure is being built
+        cache.rebind({'Population': 'v2', 'A': 'a'})
+        return Figure(version='v1')
+
+    cache.build_fig = build_fig
+    assert cache.get(['A']) == {'version': 'v1'}
+    assert cache.figures == {}
+
+    cache.build_fig = lambda selected: Figure(version='v2')
+    assert cache.get(['A']) == {'version': 'v2'}
+    assert cache.get(['A']) == {'version': 'v2'}
+    assert cache.stats()['hits'] == 1
+
+
+def test_clear_drops_shared_figures_and_counters(tmp_path):
+    backend = FileSystemBackend(str(tmp_path))
+    cache = FigureCache(lambda selected: Figure(selected=selected), columns=['A'], backend=backend)
+    cache.get(['A'])
+    cache.get(['A'])
+    assert cache.stats()['size'] == 1 and backend.get(cache._key(1, None)) is not None
+
+    cache.clear()
+    assert cache.stats() | {'pid': 0} == {'hits': 0, 'shared_hits': 0, 'misses': 0, 'size': 0, 'pid': 0}
+    assert backend.get(cache._key(1, None)) is None
+    # Built again, not read back from the backend
+    cache.get(['A'])
+    assert cache.stats()['misses'] == 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo_rollups import GeoRollups, state_name_to_region, summable_measures
+
+PAYERS = ['99454 Coverage: Medicare', '99454 Coverage: Medicaid']
+
+
+@pytest.fixture
+def counties():
+    """ Counties of four states in three regions, with counts and covered populations as from geo_ingest.py """
+    rng = np.random.default_rng(0)
+    states = ['Texas'] * 4 + ['Florida'] * 3 + ['New York'] * 2 + ['California'] * 5
+    population = rng.integers(1_000, 100_000, len(states))
+    return pd.DataFrame({
+        'State': states,
+        'County FIPS': [f'{i:05d}' for i in range(len(states))],
+        'Population': population,
+        'Child Number': population // 4,
+        'Asthma Patients with Medicare Number': population // 10,
+        '99454 Coverage: Medicare Covered Population': np.where(rng.random(len(states)) < 0.5, population, 0),
+        '99454 Coverage: Medicare': rng.random(len(states)) < 0.5,
+    })
+
+
+def test_measures_include_counts_and_covered_populations(counties):
+    frame, measures = summable_measures(counties, PAYERS)
+    # Only counties with a flag and no covered population get one; Medicaid is not in the frame
+    assert frame is counties
+    assert measures == ['Population', 'Child Number', 'Asthma Patients with Medicare Number',
+                        '99454 Coverage: Medicare Covered Population']
+
+
+def test_state_flags_become_covered_populations():
+    states = pd.DataFrame({'State': ['Texas', 'Ohio'], 'Population': [10, 20],
+                           '99454 Coverage: Medicare': [True, False], '99454 Coverage: Medicaid': [True, True]})
+    frame, measures = summable_measures(states, PAYERS)
+    assert measures == ['Population', '99454 Coverage: Medicare Covered Population',
+                        '99454 Coverage: Medicaid Covered Population']
+    assert frame['99454 Coverage: Medicare Covered Population'].tolist() == [10, 0]
+    assert frame['99454 Coverage: Medicaid Covered Population'].tolist() == [10, 20]
+
+
+def test_county_sums_match_state_and_region_totals(counties):
+    frame, measures = summable_measures(counties, PAYERS)
+    rollups = GeoRollups(frame, measures)
+    assert rollups.order == ['county', 'state', 'region']
+
+    states = frame.groupby('State')[measures].sum()
+    regions = frame.groupby(frame['State'].map(state_name_to_region))[measures].sum()
+    for level, expected in (('state', states), ('region', regions)):
+        codes = rollups.levels[level].codes
+        for measure in measures:
+            assert rollups.column(level, measure).tolist() == expected.loc[codes, measure].tolist()
+
+    # Each level also sums the level below it, and the grand total is the same everywhere
+    for level in ('state', 'region'):
+        children = rollups.levels[rollups.finer(level)]
+        for row, code in enumerate(rollups.levels[level].codes):
+            rows = rollups.children(level, code)
+            assert (children.values[rows].sum(axis=0) == rollups.levels[level].values[row]).all()
+    totals = {level: rollups.levels[level].values.sum(axis=0).tolist() for level in rollups.order}
+    assert totals['county'] == totals['state'] == totals['region'] == frame[measures].sum().tolist()
+
+
+def test_drill_down_and_roll_up(counties):
+    rollups = GeoRollups(*summable_measures(counties, PAYERS))
+    texas = rollups.children('state', 'Texas')
+    assert sorted(rollups.levels['county'].codes[texas]) == ['00000', '00001', '00002', '00003']
+    assert rollups.parent_code('county', '00005') == 'Florida'
+    assert rollups.parent_code('state', 'Florida') == 'South'
+    assert sorted(rollups.levels['state'].codes[rollups.children('region', 'South')]) == ['Florida', 'Texas']
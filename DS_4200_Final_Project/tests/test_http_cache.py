@@ -0,0 +1,148 @@
+import gzip
+import json
+
+import flask
+import pytest
+
+import http_cache
+from http_cache import accepts, choose_encoding, configure_response_caching
+
+
+@pytest.fixture
+def both_codings(monkeypatch):
+    # As when brotli is installed, whether or not it is here
+    monkeypatch.setattr(http_cache, 'ENCODINGS', ['br', 'gzip'])
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip;q=1.0, br;q=0.5', 'gzip'),
+    ('br;q=0.5, gzip;q=0.5', 'br'),
+    ('GZIP', 'gzip'),
+    ('gzip; q=0.001', 'gzip'),
+    ('*', 'br'),
+    ('*;q=0.5, br;q=0', 'gzip'),
+    ('br;q=0, gzip;Q=0.000', None),
+    ('gzip;q=oops, br;q=0', None),
+    ('deflate, identity', None),
+    ('identity;q=0, *;q=0', None),
+    ('', None),
+    (None, None),
+])
+def test_choose_encoding_by_q_value(both_codings, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_small_bodies_are_not_compressed(both_codings):
+    assert choose_encoding('gzip', http_cache.MIN_COMPRESS_SIZE - 1) is None
+    assert choose_encoding('gzip', http_cache.MIN_COMPRESS_SIZE) == 'gzip'
+
+
+def test_accepts():
+    assert accepts('gzip', 'gzip')
+    assert accepts('*', 'gzip')
+    assert not accepts('*, gzip;q=0', 'gzip')
+    assert not accepts('br', 'gzip')
+    assert not accepts(None, 'gzip')
+
+
+@pytest.fixture
+def app():
+    """ Dash app with a deterministic and a non-deterministic callback, counting their calls """
+    import dash
+    from dash import Input, Output, dcc, html
+
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='in'), html.Div(id='fixed'), html.Div(id='clock')])
+    app.calls = {'fixed': 0, 'clock': 0}
+
+    @app.callback(Output('fixed', 'children'), Input('in', 'value'))
+    def fixed(value):
+        app.calls['fixed'] += 1
+        if value == 'fail':
+            raise dash.exceptions.PreventUpdate
+        # Large enough to be compressed
+        return f'{value} ' * 400
+
+    @app.callback(Output('clock', 'children'), Input('in', 'value'))
+    def clock(value):
+        app.calls['clock'] += 1
+        return f'{value} {app.calls["clock"]}'
+
+    app.snapshot = 'v1'
+    configure_response_caching(app, deterministic=['fixed.children'], version=lambda: app.snapshot)
+
+    # A hook of its own that varies on something else, run before the compression hook
+    @app.server.after_request
+    def vary_on_cookie(response):
+        if flask.request.path.endswith('_dash-update-component'):
+            response.vary.add('Cookie')
+        return response
+
+    return app
+
+
+def update(client, output, value, encoding='gzip'):
+    component, prop = output.split('.')
+    body = {'output': output, 'outputs': {'id': component, 'property': prop},
+            'inputs': [{'id': 'in', 'property': 'value', 'value': value}], 'changedPropIds': ['in.value'],
+            'state': []}
+    return client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': encoding})
+
+
+def payload(response):
+    data = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        data = gzip.decompress(data)
+    return json.loads(data)['response']
+
+
+def test_deterministic_callbacks_are_answered_from_the_cache(app):
+    client = app.server.test_client()
+    first = update(client, 'fixed.children', 'a')
+    second = update(client, 'fixed.children', 'a')
+    assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('miss', 'hit')
+    assert app.calls['fixed'] == 1
+    assert second.headers['Content-Encoding'] == 'gzip'
+    assert second.get_data() == first.get_data()
+    assert payload(second) == {'fixed': {'children': 'a ' * 400}}
+
+    # Other inputs, another coding or a new snapshot are separate entries
+    assert update(client, 'fixed.children', 'b').headers['X-Cache'] == 'miss'
+    plain = update(client, 'fixed.children', 'a', encoding='identity')
+    assert plain.headers['X-Cache'] == 'miss' and 'Content-Encoding' not in plain.headers
+    app.snapshot = 'v2'
+    assert update(client, 'fixed.children', 'a').headers['X-Cache'] == 'miss'
+    assert app.calls['fixed'] == 4
+
+
+def test_other_callbacks_bypass_the_cache(app):
+    client = app.server.test_client()
+    responses = [update(client, 'clock.children', 'a') for _ in range(3)]
+    assert app.calls['clock'] == 3
+    assert all('X-Cache' not in response.headers for response in responses)
+    assert [payload(response)['clock']['children'] for response in responses] == ['a 1', 'a 2', 'a 3']
+
+
+def test_responses_without_a_body_are_not_cached(app):
+    client = app.server.test_client()
+    # PreventUpdate answers 204; the next identical request runs the callback again
+    assert update(client, 'fixed.children', 'fail').status_code == 204
+    assert update(client, 'fixed.children', 'fail').status_code == 204
+    assert app.calls['fixed'] == 2
+
+
+def test_vary_keeps_other_fields(app):
+    client = app.server.test_client()
+    for response in (update(client, 'fixed.children', 'a'), update(client, 'fixed.children', 'a'),
+                     update(client, 'clock.children', 'a')):
+        assert set(response.vary) == {'Cookie', 'Accept-Encoding'}
+
+
+def test_layout_revalidation(app):
+    client = app.server.test_client()
+    first = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert 'Accept-Encoding' in first.vary
+    again = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.get_data() == b''
@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+from http_cache import configure_response_caching
+from instrumentation import CallbackMetrics, instrument_app, phase
+
+
+@pytest.fixture
+def app():
+    """ Dash app with a single-output, a multi-output and a PreventUpdate callback, compressed and cached """
+    import dash
+    from dash import Input, Output, dcc, html
+
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='in'), html.Div(id='one'), html.Div(id='two'), html.Div(id='three')])
+    configure_response_caching(app, deterministic=['one.children'])
+    app.metrics = instrument_app(app, CallbackMetrics(), profile_interval=0)
+
+    @app.callback(Output('one', 'children'), Input('in', 'value'))
+    def single(value):
+        with phase('build'):
+            return 'x' * 1000
+
+    @app.callback([Output('two', 'children'), Output('three', 'children')], [Input('in', 'value')])
+    def pair(value):
+        if value == 'skip':
+            raise dash.exceptions.PreventUpdate
+        return value, value
+
+    return app
+
+
+def update(client, outputs, value):
+    body = {'output': outputs[0] if len(outputs) == 1 else '..' + '...'.join(outputs) + '..',
+            'outputs': [{'id': o.split('.')[0], 'property': o.split('.')[1]} for o in outputs],
+            'inputs': [{'id': 'in', 'property': 'value', 'value': value}], 'changedPropIds': ['in.value']}
+    if len(outputs) == 1:
+        body['outputs'] = body['outputs'][0]
+    return client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': 'gzip'})
+
+
+def metric(text, name, **labels):
+    label = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{name}{{{re.escape(label)}}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_callbacks_are_labelled_and_timed(app):
+    client = app.server.test_client()
+    first = update(client, ['one.children'], 'a')
+    assert first.headers['Content-Encoding'] == 'gzip'
+    # Answered from the response cache: never reaches the callback, not counted
+    assert update(client, ['one.children'], 'a').headers['X-Cache'] == 'hit'
+    assert update(client, ['two.children', 'three.children'], 'b').status_code == 200
+    assert update(client, ['two.children', 'three.children'], 'skip').status_code == 204
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert metric(text, 'dash_callback_requests_total', callback='single', outcome='ok') == 1
+    assert metric(text, 'dash_callback_requests_total', callback='pair', outcome='ok') == 1
+    assert metric(text, 'dash_callback_requests_total', callback='pair', outcome='prevented') == 1
+    assert metric(text, 'dash_callback_duration_seconds_count', callback='pair') == 2
+
+    # The uncompressed body is counted, not the gzipped one
+    assert metric(text, 'dash_callback_response_bytes_total', callback='single') > 1000 > len(first.get_data())
+
+    # The phases add up to the whole request time
+    total = metric(text, 'dash_callback_duration_seconds_sum', callback='single')
+    phases = [metric(text, 'dash_callback_phase_seconds_total', callback='single', phase=name)
+              for name in ('build', 'other', 'serialize')]
+    assert None not in phases
+    assert sum(phases) == pytest.approx(total, abs=1e-5)
+
+
+def test_other_requests_are_not_counted(app):
+    client = app.server.test_client()
+    assert client.get('/_dash-layout').status_code == 200
+    assert 'dash_callback_requests_total{' not in client.get('/metrics').get_data(as_text=True)
+    # Outside a callback a phase is a no-op
+    with phase('build'):
+        pass
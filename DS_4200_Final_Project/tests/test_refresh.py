@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import refresh
+from refresh import DataStore, refresh_derived
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """ One source CSV and a derived table built from it, in tmp_path """
+    source = tmp_path / 'source.csv'
+    source.write_text('State,Population\nTexas,1\n')
+    monkeypatch.setattr(refresh, 'SOURCES', {'source': {'path': str(source)}})
+    monkeypatch.setattr(refresh, 'LOCK_PATH', str(tmp_path / '.refresh.lock'))
+    return source
+
+
+def make_targets(tmp_path, writes):
+    def write(path):
+        writes.append(path)
+        with open(path, 'w') as f:
+            f.write('derived')
+    return {str(tmp_path / 'derived.csv'): (['source'], write)}
+
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_untracked_table_newer_than_sources_is_kept(tmp_path, sources):
+    writes = []
+    targets = make_targets(tmp_path, writes)
+    target = next(iter(targets))
+    with open(target, 'w') as f:
+        f.write('committed')
+    set_mtime(sources, 1000)
+    set_mtime(target, 2000)
+    state_path = str(tmp_path / 'state.json')
+
+    assert refresh_derived(targets, state_path) == []
+    assert writes == []
+    with open(target) as f:
+        assert f.read() == 'committed'
+    # The hashes are recorded, so a later change of the source rebuilds it
+    assert refresh._read_state(state_path) == {target: refresh.source_hashes(['source'])}
+
+
+def test_untracked_table_older_than_a_source_is_rebuilt(tmp_path, sources):
+    writes = []
+    targets = make_targets(tmp_path, writes)
+    target = next(iter(targets))
+    with open(target, 'w') as f:
+        f.write('committed')
+    set_mtime(target, 1000)
+    set_mtime(sources, 2000)
+
+    assert refresh_derived(targets, str(tmp_path / 'state.json')) == [target]
+    with open(target) as f:
+        assert f.read() == 'derived'
+
+
+def test_changed_source_is_rebuilt_once(tmp_path, sources):
+    writes = []
+    targets = make_targets(tmp_path, writes)
+    target = next(iter(targets))
+    state_path = str(tmp_path / 'state.json')
+
+    assert refresh_derived(targets, state_path) == [target]
+    assert refresh_derived(targets, state_path) == []
+
+    # Edited content is detected by its hash, whatever its mtime
+    sources.write_text('State,Population\nTexas,2\n')
+    set_mtime(sources, 0)
+    assert refresh_derived(targets, state_path) == [target]
+    assert len(writes) == 2
+
+
+def test_warm_only_reads(sources, monkeypatch):
+    def fail():
+        raise AssertionError('warm() rebuilt the derived tables')
+
+    monkeypatch.setattr(refresh, 'refresh_derived', fail)
+    store = DataStore(lambda: {'Population': [1]}, ['source'])
+    store.warm()
+    assert store.current == {'Population': [1]}
+    assert store.version == refresh.source_hashes(['source'])
+
+
+def test_refresh_reloads_after_rebuilding_stale_tables(sources, monkeypatch):
+    loads = []
+    store = DataStore(lambda: loads.append(1) or {'Population': [len(loads)]}, ['source'])
+    monkeypatch.setattr(refresh, 'refresh_derived', lambda: [])
+    store.warm()
+    assert store.refresh() is False
+
+    # Same sources, but a derived table was left stale before the process started
+    monkeypatch.setattr(refresh, 'refresh_derived', lambda: ['derived.csv'])
+    assert store.refresh() is True
+    assert store.current == {'Population': [2]}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import MarketScores, random_weights
+
+PAYERS = ['99454 Coverage: Medicare', '99454 Coverage: Medicaid']
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'State': ['A', 'B', 'C'],
+        'Population': [150, 300, 20],
+        'Adult Number': [100, 200, 10],
+        'Child Number': [50, 100, 10],
+        'Total Asthma Attacks Percent': [10.0, 50.0, np.nan],
+        'Asthma Patients with Medicare Number': [40, 80, 5],
+        '99454 Coverage: Medicare': [True, False, True],
+        '99454 Coverage: Medicaid': [True, True, True],
+    })
+
+
+def row_score(row, payer_weights, age_weights):
+    # The score of one state written out: each covering payer reaches its patients, times the attack rate
+    rate = 0 if pd.isna(row['Total Asthma Attacks Percent']) else row['Total Asthma Attacks Percent'] / 100
+    score = 0.0
+    for payer in PAYERS:
+        if not row[payer]:
+            continue
+        if payer == '99454 Coverage: Medicare':
+            reach = age_weights['Adult'] * row['Asthma Patients with Medicare Number']
+        else:
+            reach = age_weights['Adult'] * row['Adult Number'] + age_weights['Child'] * row['Child Number']
+        score += payer_weights[payer] * rate * reach
+    return score
+
+
+def test_scores_by_hand(frame):
+    market = MarketScores(frame, PAYERS)
+    # A: 0.1 * (40 + 150), B: 0.5 * 300 (no Medicare), C: no attack rate
+    assert market.scores().tolist() == pytest.approx([19, 150, 0])
+
+    payer_weights = {'99454 Coverage: Medicare': 2, '99454 Coverage: Medicaid': 0.5}
+    age_weights = {'Adult': 1, 'Child': 3}
+    # A: 0.1 * (2 * 40 + 0.5 * (100 + 3 * 50)), B: 0.5 * 0.5 * (200 + 3 * 100)
+    assert market.scores(payer_weights, age_weights).tolist() == pytest.approx([20.5, 125, 0])
+
+
+def test_matrix_product_matches_per_row_scores(frame):
+    market = MarketScores(frame, PAYERS)
+    for weights in random_weights(20, len(PAYERS) + 2, seed=1):
+        payer_weights = dict(zip(PAYERS, weights[:2]))
+        age_weights = dict(zip(['Adult', 'Child'], weights[2:]))
+        expected = [row_score(row, payer_weights, age_weights) for _, row in frame.iterrows()]
+        assert market.scores(payer_weights, age_weights).tolist() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7])
+def test_sweep_matches_a_loop_over_scenarios(frame, chunk_size):
+    market = MarketScores(frame, PAYERS)
+    weights = random_weights(50, len(PAYERS) + 2, seed=2)
+
+    counts = pd.DataFrame(0, index=pd.Index(frame['State'], name='State'), columns=[1, 2, 3])
+    for scenario in weights:
+        scores = [row_score(row, dict(zip(PAYERS, scenario[:2])), dict(zip(['Adult', 'Child'], scenario[2:])))
+                  for _, row in frame.iterrows()]
+        for rank, i in enumerate(np.argsort(-np.array(scores), kind='stable')):
+            counts.iloc[i, rank] += 1
+    expected = counts / len(weights)
+    expected = expected.iloc[np.argsort(expected.to_numpy() @ [1, 2, 3], kind='stable')]
+
+    pd.testing.assert_frame_equal(market.sweep(weights, chunk_size), expected)
@@ -0,0 +1,32 @@
+import config
+from dashboards import load_dashboard
+from figure_cache import shared_backend
+
+# Production entry point, e.g.
+#   gunicorn -c gunicorn.conf.py wsgi:server
+# With preload_app the data is loaded and the figures are built once in the master
+# process, and the forked workers share them copy-on-write.
+
+# Start from an empty shared cache so figures from an older data/code version are never served
+backend = shared_backend()
+if backend is not None:
+    backend.clear()
+
+# Load the dashboard module by path (file names like 12.02_dash.py are not importable by name)
+dashboard = load_dashboard(config.DASHBOARD)
+
+# The dashboards build their app in get_app() and read no data at import; 12.01_dash.py builds it at import
+app = dashboard.get_app() if hasattr(dashboard, 'get_app') else dashboard.app
+server = app.server
+
+# Warm-up: load the data and build every cached figure before the workers are forked
+if hasattr(dashboard, 'store'):
+    dashboard.store.warm()
+if hasattr(dashboard, 'choropleth_cache'):
+    dashboard.choropleth_cache.warm()
+
+
+def start_refresh():
+    """ Watch the source CSVs and hot-swap changed data in this process (see gunicorn.conf.py) """
+    if config.REFRESH_INTERVAL and hasattr(dashboard, 'store'):
+        dashboard.store.watch(config.REFRESH_INTERVAL)